@@ -140,6 +140,18 @@ load_dotenv()
 MONGODB_CONNECTION_STRING = os.getenv('MONGODB_URI', 'mongodb://mongodb:27017/')
 MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'alkosto_db')
 
+# Pool del MongoClient compartido por proceso (ver core/mongo/ClientRegistry.py)
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 50))
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', 0))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 60000))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 5000))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', 5000))
+
+# Escrituras en lote de productos
+MONGODB_BULK_CHUNK_SIZE = int(os.getenv('MONGODB_BULK_CHUNK_SIZE', 500))
+MONGODB_BULK_RETRIES = int(os.getenv('MONGODB_BULK_RETRIES', 3))
+
 
 # Configuración del caché usando Redis
 CACHES = {
@@ -161,6 +173,44 @@ SESSION_CACHE_ALIAS = "default"
 SESSION_COOKIE_AGE = 3600  # en segundos
 SESSION_SAVE_EVERY_REQUEST = True
 
+# Historial del chatbot por sesión (ver core/chatbot/ConversationStore.py)
+CHATBOT_SESSION_CACHE_ALIAS = "default"
+CHATBOT_SESSION_TTL = SESSION_COOKIE_AGE
+CHATBOT_SESSION_L1_SIZE = int(os.getenv('CHATBOT_SESSION_L1_SIZE', 1000))  # sesiones en memoria por worker
+CHATBOT_HISTORY_MAX_MESSAGES = 10
+
+# Parámetros de búsqueda de los índices aproximados (ver core/chatbot/IndexFactory.py)
+EMBEDDINGS_HNSW_EF_SEARCH = int(os.getenv('EMBEDDINGS_HNSW_EF_SEARCH', 64))
+EMBEDDINGS_IVF_NPROBE = int(os.getenv('EMBEDDINGS_IVF_NPROBE', 16))
+
+# Caché de embeddings de consultas (ver core/chatbot/QueryEmbeddingCache.py)
+EMBEDDINGS_QUERY_CACHE_SIZE = int(os.getenv('EMBEDDINGS_QUERY_CACHE_SIZE', 2048))  # consultas en memoria por worker
+EMBEDDINGS_QUERY_CACHE_ALIAS = "default"  # None para usar solo la caché en memoria
+EMBEDDINGS_QUERY_CACHE_TTL = 60 * 60 * 24
+EMBEDDINGS_BATCH_MAX_QUERIES = 50  # consultas por petición en /products/search/batch
+EMBEDDINGS_BATCH_MAX_LIMIT = 50  # resultados por consulta en /products/search/batch
+
+# Caché semántica de respuestas del LLM (ver core/chatbot/ResponseCache.py)
+CHATBOT_RESPONSE_CACHE_ENABLED = True
+CHATBOT_RESPONSE_CACHE_SIZE = int(os.getenv('CHATBOT_RESPONSE_CACHE_SIZE', 512))  # grupos (productos) por worker
+CHATBOT_RESPONSE_CACHE_TTL = 60 * 60
+CHATBOT_RESPONSE_CACHE_SIMILARITY = 0.95  # coseno mínimo con la consulta ya respondida
+
+# Presupuesto de tokens del prompt (ver core/chatbot/PromptBudget.py)
+CHATBOT_MAX_PROMPT_TOKENS = int(os.getenv('CHATBOT_MAX_PROMPT_TOKENS', 3000))
+CHATBOT_HISTORY_MESSAGE_TOKENS = 150  # respuestas anteriores del asistente se recortan a esto
+CHATBOT_TOKENIZER = os.getenv('CHATBOT_TOKENIZER')  # tokenizer.json o nombre en el Hub; None = estimación
+
+# Gateway del LLM (ver core/chatbot/LLMGateway.py)
+CHATBOT_LLM_BASE_URL = os.getenv('CHATBOT_LLM_BASE_URL')  # None = API de Groq
+CHATBOT_LLM_TIMEOUT = 10.0  # segundos por intento
+CHATBOT_LLM_DEADLINE = float(os.getenv('CHATBOT_LLM_DEADLINE', 20.0))  # segundos totales, con reintentos
+CHATBOT_LLM_MAX_RETRIES = 2
+CHATBOT_LLM_RETRY_BACKOFF = 0.5
+CHATBOT_LLM_MAX_CONCURRENCY = int(os.getenv('CHATBOT_LLM_MAX_CONCURRENCY', 8))  # llamadas en vuelo por worker
+CHATBOT_LLM_BREAKER_FAILURES = 5
+CHATBOT_LLM_BREAKER_RESET = 30.0
+
 # ============================================
 # CORS (ya lo tienes activo, pero validamos)
 # ============================================
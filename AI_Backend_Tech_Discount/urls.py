@@ -21,4 +21,6 @@ from core import views
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('chat/nologin', views.chatWithChatbotWithoutLogin, name='chatWithChabotWithoutLogin'),
+    path('chat/nologin/stream', views.chatWithChatbotStreamWithoutLogin, name='chatWithChatbotStreamWithoutLogin'),
+    path('products/search/batch', views.searchProductsBatch, name='searchProductsBatch'),
 ]
@@ -0,0 +1,119 @@
+import json
+import logging
+import uuid
+import zlib
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .LRUCache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """
+    Almacena el historial de conversación de cada sesión en la caché de Django (Redis)
+
+    - L2 (Redis): compartido entre todos los workers, con TTL = SESSION_COOKIE_AGE.
+      La expulsión LRU la hace Redis (maxmemory-policy allkeys-lru).
+    - L1 (memoria del proceso): LRU acotado que evita transferir y deserializar el
+      historial cuando la revisión guardada en Redis no ha cambiado.
+    """
+
+    KEY_PREFIX = "chatbot:history"
+
+    def __init__(self, cache_alias: str = None, ttl: int = None, l1_size: int = None,
+                 max_messages: int = None):
+        self.cache_alias = cache_alias or getattr(settings, 'CHATBOT_SESSION_CACHE_ALIAS', 'default')
+        self.ttl = ttl or getattr(settings, 'CHATBOT_SESSION_TTL', settings.SESSION_COOKIE_AGE)
+        self.max_messages = max_messages or getattr(settings, 'CHATBOT_HISTORY_MAX_MESSAGES', 10)
+        self._l1 = LRUCache(
+            max_size=l1_size or getattr(settings, 'CHATBOT_SESSION_L1_SIZE', 1000),
+            ttl=self.ttl
+        )
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _data_key(self, session_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{session_id}"
+
+    def _rev_key(self, session_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{session_id}:rev"
+
+    @staticmethod
+    def _serialize(history: List[Dict]) -> bytes:
+        """Serializa el historial como tuplas compactas comprimidas con zlib"""
+        rows = []
+        for msg in history:
+            if msg.get("type") == "user":
+                rows.append(["u", msg.get("content", ""), msg.get("products_found", 0)])
+            else:
+                rows.append(["a", msg.get("content", "")])
+
+        payload = json.dumps(rows, ensure_ascii=False, separators=(',', ':'))
+        return zlib.compress(payload.encode('utf-8'), 6)
+
+    @staticmethod
+    def _deserialize(blob: bytes) -> List[Dict]:
+        """Reconstruye el historial con el mismo formato que usa TechChatbot"""
+        rows = json.loads(zlib.decompress(blob).decode('utf-8'))
+        history = []
+        for row in rows:
+            if row[0] == "u":
+                history.append({"type": "user", "content": row[1], "products_found": row[2]})
+            else:
+                history.append({"type": "assistant", "content": row[1]})
+        return history
+
+    def load(self, session_id: str) -> List[Dict]:
+        """Obtiene el historial de una sesión (lista vacía si no existe o expiró)"""
+        cached = self._l1.get(session_id)
+
+        try:
+            revision = self.cache.get(self._rev_key(session_id))
+            if revision is None:
+                self._l1.delete(session_id)
+                return []
+
+            # La revisión coincide: otro worker no ha modificado la sesión
+            if cached is not None and cached[0] == revision:
+                return list(cached[1])
+
+            blob = self.cache.get(self._data_key(session_id))
+            if blob is None:
+                return []
+
+            history = self._deserialize(blob)
+            self._l1.set(session_id, (revision, history))
+            return list(history)
+
+        except Exception as e:
+            logger.warning(f"⚠️ Caché de sesiones no disponible, usando memoria local: {e}")
+            return list(cached[1]) if cached is not None else []
+
+    def save(self, session_id: str, history: List[Dict]):
+        """Guarda el historial (recortado a max_messages) en L1 y en Redis"""
+        history = history[-self.max_messages:]
+        revision = uuid.uuid4().hex[:12]
+        self._l1.set(session_id, (revision, list(history)))
+
+        try:
+            self.cache.set_many({
+                self._data_key(session_id): self._serialize(history),
+                self._rev_key(session_id): revision,
+            }, timeout=self.ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar la sesión {session_id} en caché: {e}")
+
+    def clear(self, session_id: str):
+        """Elimina el historial de una sesión"""
+        self._l1.delete(session_id)
+
+        try:
+            self.cache.delete_many([self._data_key(session_id), self._rev_key(session_id)])
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo limpiar la sesión {session_id} en caché: {e}")
@@ -1,33 +1,82 @@
 import os
-import json
-import pickle
+import hashlib
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Tuple, Optional
+from typing import Iterator, List, Dict, Tuple, Optional
 import logging
 import re
+import threading
+import time
+from django.conf import settings
 from core.mongo.MongoManager import MongoManager
+from .MetadataStore import MetadataStore, MetadataStoreWriter, convert_json_metadata
+from .EncodingPool import EncodingPool
+from .QueryEmbeddingCache import QueryEmbeddingCache
+from .FilterIndex import FilterIndex
+from .IndexFactory import (
+    RecallEstimator, create_index, describe_index, filtered_search, resolve_ivf_params, set_search_params,
+    supports_removal
+)
 
 logger = logging.getLogger(__name__)
 
+# Instancia compartida por proceso (ver get_embedding_manager)
+_shared_manager = None
+_shared_manager_lock = threading.Lock()
+
+
+def get_embedding_manager() -> "EmbeddingManager":
+    """
+    Devuelve el EmbeddingManager compartido del proceso.
+
+    El modelo y el índice FAISS se cargan una sola vez por worker y todas las
+    sesiones de chat los reutilizan en modo solo lectura.
+    """
+    global _shared_manager
+
+    if _shared_manager is None:
+        with _shared_manager_lock:
+            if _shared_manager is None:
+                _shared_manager = EmbeddingManager()
+                logger.info("✅ EmbeddingManager compartido inicializado")
+
+    return _shared_manager
+
 
 class EmbeddingManager:
     """Maneja la creación y búsqueda de embeddings para productos"""
 
-    def __init__(self, model_name: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"):
+    def __init__(self, model_name: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                 ef_search: int = None, nprobe: int = None):
         self.model_name = model_name
+        # Modelo realmente cargado (puede ser el fallback); lo usan los workers del pool
+        self.active_model_name = model_name
         self.model = None
         self.index = None
         self.product_metadata = []
+        # Cambia cada vez que se carga o reconstruye el índice (invalida la caché de respuestas)
+        self.index_version = 0
+        # Índices de filtrado (categoría, marca, precio), construidos en la primera búsqueda con filtros
+        self._filter_index = None
         self.embeddings_path = "data/embeddings/"
 
+        # Parámetros de búsqueda de los índices aproximados (se ignoran en el índice exacto)
+        self.ef_search = ef_search or getattr(settings, 'EMBEDDINGS_HNSW_EF_SEARCH', 64)
+        self.nprobe = nprobe or getattr(settings, 'EMBEDDINGS_IVF_NPROBE', 16)
+        # Último reporte de recall frente a la búsqueda exacta (ver create_embeddings_from_db)
+        self.last_recall_report = None
+
         # Crear directorio si no existe
         os.makedirs(self.embeddings_path, exist_ok=True)
 
         self.index_file = os.path.join(self.embeddings_path, "product_index.faiss")
-        self.metadata_file = os.path.join(self.embeddings_path, "product_metadata.json")
-        self.embeddings_file = os.path.join(self.embeddings_path, "product_embeddings.pkl")
+        self.metadata_file = os.path.join(self.embeddings_path, "product_metadata.bin")
+        # Formato anterior (JSON); se convierte automáticamente al cargar
+        self.legacy_metadata_file = os.path.join(self.embeddings_path, "product_metadata.json")
+
+        # El tokenizer del modelo no admite llamadas concurrentes desde varios hilos
+        self._encode_lock = threading.Lock()
 
         # Mapa de categorías mejorado y completo
         self.category_map = {
@@ -71,6 +120,8 @@ class EmbeddingManager:
         self.stopwords = {'busca', 'un', 'una', 'el', 'la', 'los', 'las', 'de', 'en', 'y', 'con', 'para'}
 
         self._load_model()
+        # Vectores de consultas repetidas (la clave incluye el modelo realmente cargado)
+        self.query_cache = QueryEmbeddingCache(self.active_model_name)
         self._load_or_create_index()
 
     def _load_model(self):
@@ -82,7 +133,8 @@ class EmbeddingManager:
         except Exception as e:
             logger.error(f"❌ Error cargando modelo: {e}")
             # Fallback a modelo más pequeño si el principal falla
-            self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+            self.active_model_name = "sentence-transformers/all-MiniLM-L6-v2"
+            self.model = SentenceTransformer(self.active_model_name)
             logger.info("✅ Modelo fallback cargado correctamente")
 
     def _normalize_category(self, category: str) -> str:
@@ -182,107 +234,452 @@ class EmbeddingManager:
             logger.error(f"Error creando texto para producto: {e}")
             return product.get('name', 'Producto sin nombre')
 
-    def create_embeddings_from_db(self, batch_size: int = 50) -> bool:
-        """Crea embeddings para todos los productos en la base de datos"""
+    @staticmethod
+    def _content_hash(text: str) -> str:
+        """Hash del texto de embedding: si no cambia, el vector tampoco"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _build_metadata_row(self, product: Dict) -> Dict:
+        """Construye la fila de metadata que se guarda junto al índice"""
+        category = self._normalize_category(product.get('category', ''))
+        return {
+            'id': str(product.get('_id')),
+            'name': product.get('name', ''),
+            'brand': product.get('brand', ''),
+            'category': category,
+            'price': product.get('discount_price_num', product.get('original_price_num', 0)),
+            'discount_percent': product.get('discount_percent', '0%'),
+            'product_url': product.get('product_url', ''),
+            'image_url': product.get('image_url', ''),
+            'availability': product.get('availability', 'Disponible'),
+            'specifications': product.get('specifications', {}),
+            'source': product.get('source', 'alkosto'),
+            'is_main_product': self._is_main_product_category(category)
+        }
+
+    # Campos de MongoDB que usan _create_product_text y _build_metadata_row
+    EMBEDDING_PROJECTION = {
+        'name': 1, 'brand': 1, 'category': 1, 'discount_price_num': 1, 'original_price_num': 1,
+        'discount_percent': 1, 'product_url': 1, 'image_url': 1, 'availability': 1,
+        'specifications': 1, 'source': 1,
+    }
+
+    def _iter_product_batches(self, mongo: MongoManager, batch_size: int) -> Iterator[List[Dict]]:
+        """
+        Etapa 1: lee el cursor de MongoDB en lotes
+
+        Los productos se guardan con upsert por product_url, así que las URLs ya
+        son únicas; solo se descartan repetidas dentro del mismo lote para que la
+        memoria no crezca con el tamaño del catálogo.
+        """
+        batch_urls = set()
+        batch = []
+
+        for product in mongo.iter_products(projection=self.EMBEDDING_PROJECTION, batch_size=batch_size):
+            url = product.get('product_url', '')
+            if url in batch_urls:
+                continue
+            batch_urls.add(url)
+
+            batch.append(product)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+                batch_urls = set()
+
+        if batch:
+            yield batch
+
+    def _iter_text_batches(self, product_batches: Iterator[List[Dict]]) -> Iterator[Tuple[List[Dict], List[str]]]:
+        """Etapa 2: construye el texto de embedding de cada producto"""
+        for products in product_batches:
+            yield products, [self._create_product_text(product) for product in products]
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Codifica textos de productos en vectores normalizados"""
+        return self.model.encode(
+            texts,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+
+    def _iter_encoded_batches(self, text_batches,
+                              pool: EncodingPool = None) -> Iterator[Tuple[List[Dict], List[str], np.ndarray]]:
+        """Etapa 3: codifica cada lote de textos (en paralelo y en orden si hay pool)"""
+        if pool is None:
+            for products, texts in text_batches:
+                yield products, texts, self._encode_texts(texts)
+            return
+
+        payloads = (((products, texts), texts) for products, texts in text_batches)
+        for (products, texts), vectors in pool.imap(payloads):
+            yield products, texts, vectors
+
+    def _start_encoding_pool(self, workers: int, torch_threads: int = None) -> Optional[EncodingPool]:
+        """Crea el pool de procesos si se pidió más de un worker"""
+        if workers <= 1:
+            return None
+        return EncodingPool(self.active_model_name, workers, torch_threads)
+
+    # Consultas representativas para medir el recall de los índices aproximados
+    RECALL_QUERIES = [
+        "portátil gamer", "celulares samsung", "iphone", "computadores en oferta", "audífonos bluetooth",
+        "televisor 55 pulgadas", "smart tv lg", "tablet para estudiar", "monitor gamer 144hz",
+        "consola playstation", "xbox series", "portátil hp victus", "celular xiaomi económico",
+        "audífonos inalámbricos sony", "proyector", "computador de escritorio all in one",
+        "cargador usb c", "teclado mecánico", "mouse inalámbrico", "casa inteligente alexa",
+    ]
+
+    def create_embeddings_from_db(self, batch_size: int = 50, workers: int = 1,
+                                  torch_threads: int = None, index_type: str = 'flat',
+                                  hnsw_m: int = 32, ef_construction: int = 80,
+                                  nlist: int = None, pq_m: int = 16, train_size: int = None,
+                                  recall_k: int = 10) -> bool:
+        """
+        Crea embeddings para todos los productos en la base de datos
+
+        Los productos fluyen por un pipeline de generadores (cursor -> texto ->
+        embedding -> índice + metadata), así que la memoria depende del tamaño de
+        lote y no del tamaño del catálogo.
+
+        Args:
+            batch_size: Productos por lote
+            workers: Procesos de codificación en paralelo (1 = en el proceso actual)
+            torch_threads: Hilos de torch por worker (por defecto núcleos / workers)
+            index_type: 'flat' (exacto), 'hnsw' o 'ivfpq' (aproximados)
+            hnsw_m: Vecinos por nodo del grafo HNSW
+            ef_construction: Amplitud de búsqueda al construir el grafo HNSW
+            nlist: Listas invertidas de IVF-PQ (por defecto ~4 * sqrt(productos))
+            pq_m: Subcuantizadores de PQ (bytes por vector)
+            train_size: Vectores usados para entrenar IVF-PQ
+            recall_k: k con el que se mide el recall frente a la búsqueda exacta
+        """
+        writer = None
+        pool = None
         try:
-            logger.info("🔄 Iniciando creación de embeddings...")
+            logger.info(f"🔄 Iniciando creación de embeddings (índice {index_type})...")
 
-            # Obtener productos de MongoDB
             mongo = MongoManager()
-            products = mongo.get_all_products()
+            total = mongo.get_product_count()
 
-            if not products:
+            if not total:
                 logger.warning("⚠️ No hay productos en la base de datos")
                 return False
 
-            logger.info(f"📦 Procesando {len(products)} productos...")
-
-            # Crear textos para embedding
-            product_texts = []
-            metadata = []
-
-            for product in products:
-                text = self._create_product_text(product)
-                product_texts.append(text)
-
-                # Guardar metadata importante
-                metadata.append({
-                    'id': str(product.get('_id')),
-                    'name': product.get('name', ''),
-                    'brand': product.get('brand', ''),
-                    'category': self._normalize_category(product.get('category', '')),
-                    'price': product.get('discount_price_num', product.get('original_price_num', 0)),
-                    'discount_percent': product.get('discount_percent', '0%'),
-                    'product_url': product.get('product_url', ''),
-                    'image_url': product.get('image_url', ''),
-                    'availability': product.get('availability', 'Disponible'),
-                    'specifications': product.get('specifications', {}),
-                    'source': product.get('source', 'alkosto'),
-                    'is_main_product': self._is_main_product_category(
-                        self._normalize_category(product.get('category', ''))
-                    )
-                })
-
-            # Crear embeddings en lotes más pequeños para mejor manejo
-            all_embeddings = []
-            for i in range(0, len(product_texts), batch_size):
-                batch = product_texts[i:i + batch_size]
-                logger.info(f"Procesando lote {i // batch_size + 1}/{(len(product_texts) - 1) // batch_size + 1}")
-
-                batch_embeddings = self.model.encode(
-                    batch,
-                    show_progress_bar=True,
-                    convert_to_numpy=True,
-                    normalize_embeddings=True
-                )
-                all_embeddings.append(batch_embeddings)
-
-            # Concatenar todos los embeddings
-            embeddings = np.vstack(all_embeddings)
-
-            # Crear índice FAISS con métrica de similitud coseno
-            dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatIP(dimension)
-
-            # Los embeddings ya están normalizados
-            self.index.add(embeddings)
+            if index_type == 'ivfpq' and total < 256:
+                logger.warning(f"⚠️ {total} productos no alcanzan para entrenar IVF-PQ, se usa índice exacto")
+                index_type = 'flat'
+
+            total_batches = (total - 1) // batch_size + 1
+            logger.info(f"📦 Procesando {total} productos en lotes de {batch_size}...")
+
+            writer = MetadataStoreWriter(self.metadata_file, extra={'index_type': index_type})
+            pool = self._start_encoding_pool(workers, torch_threads)
+            estimator = self._build_recall_estimator(recall_k)
+            index = None
+            next_id = 0
+
+            # IVF-PQ se entrena con los primeros vectores; mientras tanto se acumulan aquí
+            train_vectors = []
+            train_ids = []
+            min_train = 0
+
+            batches = self._iter_text_batches(self._iter_product_batches(mongo, batch_size))
+            for batch_number, (products, texts, vectors) in enumerate(self._iter_encoded_batches(batches, pool), 1):
+                logger.info(f"Procesando lote {batch_number}/{total_batches}")
+
+                # Crear índice FAISS con métrica de similitud coseno. Los índices con
+                # IDs explícitos permiten actualizar y eliminar vectores por ID
+                if index is None:
+                    dimension = vectors.shape[1]
+                    if index_type == 'ivfpq':
+                        ivf = resolve_ivf_params(total, nlist, pq_m, dimension)
+                        min_train = min(total, max(train_size or 0, ivf['min_train'], 39 * 256))
+                        index = create_index('ivfpq', dimension, nlist=ivf['nlist'], pq_m=ivf['pq_m'])
+                        logger.info(f"🧮 IVF-PQ con nlist={ivf['nlist']}, m={ivf['pq_m']}; "
+                                    f"entrenamiento con {min_train} vectores")
+                    else:
+                        index = create_index(index_type, dimension, hnsw_m=hnsw_m,
+                                             ef_construction=ef_construction)
+
+                # Los embeddings ya están normalizados
+                ids = np.arange(next_id, next_id + len(vectors), dtype='int64')
+                next_id += len(vectors)
+
+                if estimator is not None:
+                    estimator.observe(vectors, ids)
+
+                if index.is_trained:
+                    index.add_with_ids(vectors, ids)
+                else:
+                    train_vectors.append(vectors)
+                    train_ids.append(ids)
+                    if sum(len(chunk) for chunk in train_vectors) >= min_train:
+                        self._train_and_add(index, train_vectors, train_ids)
+
+                for product, text, vector_id in zip(products, texts, ids):
+                    row = self._build_metadata_row(product)
+                    row['vector_id'] = int(vector_id)
+                    row['content_hash'] = self._content_hash(text)
+                    writer.append(row)
+
+            if index is None:
+                logger.warning("⚠️ No hay productos en la base de datos")
+                writer.abort()
+                return False
 
-            # Guardar índice y metadata
-            faiss.write_index(self.index, self.index_file)
+            # Menos productos de los estimados (URLs duplicadas): entrenar con lo acumulado
+            if not index.is_trained:
+                self._train_and_add(index, train_vectors, train_ids)
+
+            if estimator is not None:
+                self.last_recall_report = self._recall_report(index, estimator)
 
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            set_search_params(index, ef_search=self.ef_search, nprobe=self.nprobe)
 
-            with open(self.embeddings_file, 'wb') as f:
-                pickle.dump(embeddings, f)
+            # Guardar índice y metadata
+            self._write_index_atomic(index)
+            writer.close()
 
-            self.product_metadata = metadata
+            self.index = index
+            self.product_metadata = MetadataStore(self.metadata_file)
+            self.index_version += 1
 
-            logger.info(f"✅ Embeddings creados correctamente: {embeddings.shape}")
+            logger.info(f"✅ Embeddings creados correctamente: {index.ntotal} vectores de dimensión {index.d}")
             logger.info(f"💾 Índice guardado en: {self.index_file}")
 
             return True
 
         except Exception as e:
             logger.error(f"❌ Error creando embeddings: {e}")
+            if writer is not None:
+                writer.abort()
             import traceback
             traceback.print_exc()
             return False
 
+        finally:
+            if pool is not None:
+                pool.close()
+
+    @staticmethod
+    def _train_and_add(index, train_vectors: List[np.ndarray], train_ids: List[np.ndarray]):
+        """Entrena el índice con los vectores acumulados y luego los agrega"""
+        vectors = np.vstack(train_vectors)
+        ids = np.concatenate(train_ids)
+
+        logger.info(f"🏋️ Entrenando índice con {len(vectors)} vectores...")
+        index.train(vectors)
+        index.add_with_ids(vectors, ids)
+
+        train_vectors.clear()
+        train_ids.clear()
+
+    def _build_recall_estimator(self, k: int) -> Optional[RecallEstimator]:
+        """Codifica las consultas de referencia para medir el recall"""
+        if not k:
+            return None
+
+        queries = [self._clean_query(query) for query in self.RECALL_QUERIES]
+        with self._encode_lock:
+            vectors = self.model.encode(queries, normalize_embeddings=True)
+        return RecallEstimator(np.asarray(vectors, dtype='float32'), k)
+
+    def _recall_report(self, index, estimator: RecallEstimator) -> Dict:
+        """Recall@k del índice (con los parámetros configurados y en barrido) frente a la búsqueda exacta"""
+        sweep = estimator.report(index)
+
+        set_search_params(index, ef_search=self.ef_search, nprobe=self.nprobe)
+        start = time.perf_counter()
+        recall = estimator.recall(index)
+        latency_ms = (time.perf_counter() - start) * 1000 / len(estimator.queries)
+
+        index_type = describe_index(index)
+        logger.info(f"🎯 Recall@{estimator.k} ({index_type}) frente a búsqueda exacta: {recall:.3f}")
+
+        return {
+            'index_type': index_type,
+            'k': estimator.k,
+            'ef_search': self.ef_search if index_type == 'hnsw' else None,
+            'nprobe': self.nprobe if index_type == 'ivfpq' else None,
+            'recall': recall,
+            'latency_ms': latency_ms,
+            'sweep': sweep,
+        }
+
+    def _write_index_atomic(self, index):
+        """Escribe el índice FAISS en un archivo temporal y lo publica con os.replace"""
+        tmp_file = f"{self.index_file}.tmp"
+        faiss.write_index(index, tmp_file)
+        os.replace(tmp_file, self.index_file)
+
+    def update_embeddings_from_db(self, batch_size: int = 50, workers: int = 1,
+                                  torch_threads: int = None) -> Optional[Dict]:
+        """
+        Actualiza el índice de forma incremental usando product_url como clave.
+
+        Solo se codifican los productos nuevos o cuyo texto de embedding cambió
+        (comparando el hash de _create_product_text). Los productos eliminados de
+        la base de datos se quitan del índice. Los vectores nuevos reciben IDs
+        nuevos, así que una metadata y un índice de distintas versiones nunca
+        devuelven un producto equivocado.
+
+        Args:
+            batch_size: Productos por lote
+            workers: Procesos de codificación en paralelo (1 = en el proceso actual)
+            torch_threads: Hilos de torch por worker (por defecto núcleos / workers)
+
+        Returns:
+            Dict con el resumen (added, updated, removed, unchanged) o None si falla
+        """
+        if not os.path.exists(self.index_file) or not os.path.exists(self.metadata_file):
+            logger.info("⚠️ No hay índice previo, se crea desde cero")
+            return self._full_rebuild_summary(batch_size, workers, torch_threads)
+
+        writer = None
+        pool = None
+        previous = None
+        try:
+            index = faiss.read_index(self.index_file)
+            previous = MetadataStore(self.metadata_file)
+
+            if not supports_removal(index) or not previous.has_column('content_hash'):
+                logger.info("⚠️ El índice actual no admite actualizaciones incrementales, se recrea completo")
+                index_type = previous.extra.get('index_type', 'flat')
+                # Soltar el mmap antes de que la reconstrucción reemplace el archivo
+                previous.close()
+                previous = None
+                return self._full_rebuild_summary(batch_size, workers, torch_threads, index_type=index_type)
+
+            # product_url -> (vector_id, hash) del índice actual
+            previous_ids = previous.numeric('vector_id')
+            existing = {}
+            for position, (url, content_hash) in enumerate(zip(previous.strings('product_url'),
+                                                               previous.strings('content_hash'))):
+                existing[url] = (int(previous_ids[position]), content_hash)
+            next_id = int(previous_ids.max()) + 1 if len(previous) else 0
+
+            mongo = MongoManager()
+            # Conservar el tipo de índice para una futura reconstrucción completa
+            writer = MetadataStoreWriter(self.metadata_file, extra=previous.extra)
+            pool = self._start_encoding_pool(workers, torch_threads)
+            stale_ids = []
+            pending_ids = []
+            pending_texts = []
+            seen_urls = set()
+            summary = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+
+            def encode_pending():
+                if not pending_texts:
+                    return
+                vectors = pool.encode(pending_texts) if pool else self._encode_texts(pending_texts)
+                index.add_with_ids(vectors, np.asarray(pending_ids, dtype='int64'))
+                pending_ids.clear()
+                pending_texts.clear()
+
+            for products, texts in self._iter_text_batches(self._iter_product_batches(mongo, batch_size)):
+                for product, text in zip(products, texts):
+                    url = product.get('product_url', '')
+                    seen_urls.add(url)
+
+                    row = self._build_metadata_row(product)
+                    row['content_hash'] = self._content_hash(text)
+
+                    current = existing.get(url)
+                    if current is not None and current[1] == row['content_hash']:
+                        row['vector_id'] = current[0]
+                        summary['unchanged'] += 1
+                    else:
+                        if current is not None:
+                            stale_ids.append(current[0])
+                            summary['updated'] += 1
+                        else:
+                            summary['added'] += 1
+
+                        row['vector_id'] = next_id
+                        pending_ids.append(next_id)
+                        pending_texts.append(text)
+                        next_id += 1
+
+                        if len(pending_texts) >= batch_size:
+                            encode_pending()
+
+                    writer.append(row)
+
+            if not seen_urls:
+                logger.warning("⚠️ No hay productos en la base de datos")
+                writer.abort()
+                return None
+
+            encode_pending()
+
+            # Productos que ya no existen en la base de datos
+            for url, (vector_id, _) in existing.items():
+                if url not in seen_urls:
+                    stale_ids.append(vector_id)
+                    summary['removed'] += 1
+
+            if stale_ids:
+                index.remove_ids(np.asarray(stale_ids, dtype='int64'))
+
+            # Publicar ambos archivos; como los IDs no se reutilizan, un lector que
+            # combine versiones distintas solo pierde resultados momentáneamente
+            self._write_index_atomic(index)
+            writer.close()
+
+            self.index = index
+            self.product_metadata = MetadataStore(self.metadata_file)
+            self.index_version += 1
+
+            logger.info(
+                f"✅ Índice actualizado: {summary['added']} nuevos, {summary['updated']} modificados, "
+                f"{summary['removed']} eliminados, {summary['unchanged']} sin cambios"
+            )
+            return summary
+
+        except Exception as e:
+            logger.error(f"❌ Error actualizando embeddings: {e}")
+            if writer is not None:
+                writer.abort()
+            import traceback
+            traceback.print_exc()
+            return None
+
+        finally:
+            if previous is not None:
+                previous.close()
+            if pool is not None:
+                pool.close()
+
+    def _full_rebuild_summary(self, batch_size: int, workers: int = 1,
+                              torch_threads: int = None, index_type: str = 'flat') -> Optional[Dict]:
+        """Recrea el índice completo y lo reporta con el mismo formato incremental"""
+        if not self.create_embeddings_from_db(batch_size=batch_size, workers=workers,
+                                              torch_threads=torch_threads, index_type=index_type):
+            return None
+        return {'added': len(self.product_metadata), 'updated': 0, 'removed': 0, 'unchanged': 0}
+
     def _load_or_create_index(self):
         """Carga el índice existente o solicita crearlo"""
         try:
+            # Migrar metadata JSON del formato anterior si es necesario
+            if not os.path.exists(self.metadata_file) and os.path.exists(self.legacy_metadata_file):
+                logger.info("🔄 Convirtiendo product_metadata.json a formato columnar...")
+                converted = convert_json_metadata(self.legacy_metadata_file, self.metadata_file)
+                logger.info(f"✅ Metadata convertida: {converted} productos")
+
             if (os.path.exists(self.index_file) and
                     os.path.exists(self.metadata_file) and
                     os.path.getsize(self.index_file) > 0):
 
                 logger.info("📂 Cargando índice existente...")
                 self.index = faiss.read_index(self.index_file)
+                set_search_params(self.index, ef_search=self.ef_search, nprobe=self.nprobe)
+                self.product_metadata = MetadataStore(self.metadata_file)
+                self.index_version += 1
 
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    self.product_metadata = json.load(f)
-
-                logger.info(f"✅ Índice cargado: {self.index.ntotal} productos")
+                logger.info(f"✅ Índice cargado: {self.index.ntotal} productos ({describe_index(self.index)})")
             else:
                 logger.info("⚠️ No se encontró índice existente. Use create_embeddings_from_db() para crearlo")
 
@@ -330,6 +727,26 @@ class EmbeddingManager:
 
         return expanded_query.strip()
 
+    def _encode_query(self, cleaned_query: str) -> np.ndarray:
+        """Embedding (1, d) de una consulta ya limpia; las consultas repetidas no pasan por el modelo"""
+        def encode(text):
+            with self._encode_lock:
+                return self.model.encode([text], normalize_embeddings=True)
+
+        return self.query_cache.get_or_encode(cleaned_query, encode)
+
+    def _encode_queries(self, cleaned_queries: List[str]) -> np.ndarray:
+        """Embeddings (n, d) de varias consultas limpias; las que no están en caché van en un solo forward"""
+        def encode_many(texts):
+            with self._encode_lock:
+                return self.model.encode(texts, normalize_embeddings=True)
+
+        return self.query_cache.get_or_encode_many(cleaned_queries, encode_many)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """Embedding normalizado (1, d) de una consulta, el mismo que usa search_products"""
+        return self._encode_query(self._clean_query(query))
+
     def search_products(self, query: str, top_k: int = 10, threshold: float = 0.4) -> List[Dict]:
         """Busca productos similares a la consulta con mejoras"""
         try:
@@ -337,110 +754,170 @@ class EmbeddingManager:
                 logger.error("❌ Índice no cargado. Ejecute create_embeddings_from_db() primero")
                 return []
 
-            # Limpiar y mejorar la consulta
-            cleaned_query = self._clean_query(query)
-
-            # Para búsquedas específicas de portátiles, ajustar el threshold
-            adjusted_threshold = threshold
-            if any(word in query.lower() for word in ['portatil', 'portátil', 'laptop', 'notebook']):
-                adjusted_threshold = max(threshold, 0.45)  # Threshold más alto para portátiles
-
-            # Crear embedding de la consulta
-            query_embedding = self.model.encode([cleaned_query], normalize_embeddings=True)
+            # Crear embedding de la consulta limpia (o reutilizarlo de la caché)
+            query_embedding = self._encode_query(self._clean_query(query))
 
             # Buscar más resultados para luego filtrar
             scores, indices = self.index.search(query_embedding, min(top_k * 3, self.index.ntotal))
 
-            results = []
-            seen_products = set()
-            main_products = []
-            accessory_products = []
-
-            for score, idx in zip(scores[0], indices[0]):
-                if idx >= len(self.product_metadata) or idx < 0 or score < adjusted_threshold:
-                    continue
+            results = self._rank_results(query, scores[0], indices[0], top_k, threshold)
 
-                product = self.product_metadata[idx].copy()
-                product['similarity_score'] = float(score)
+            logger.info(f"🔍 Encontrados {len(results)} productos para: '{query}'")
+            return results
 
-                # Evitar duplicados por nombre similar
-                product_name = product['name'].lower()
-                if product_name in seen_products:
-                    continue
+        except Exception as e:
+            logger.error(f"❌ Error en búsqueda: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
 
-                seen_products.add(product_name)
+    def search_products_batch(self, queries: List[str], top_k: int = 10,
+                              threshold: float = 0.4) -> List[List[Dict]]:
+        """
+        Busca varias consultas a la vez con el mismo ranking que search_products
 
-                # Para búsquedas de portátiles, penalizar All-in-One
-                if any(word in query.lower() for word in ['portatil', 'portátil', 'laptop', 'notebook']):
-                    category = product.get('category', '').lower()
-                    if 'escritorio' in category or 'all-in-one' in product_name:
-                        # Reducir score para All-in-One en búsquedas de portátiles
-                        product['similarity_score'] *= 0.7
+        Codifica todas las consultas en un solo forward del modelo y hace una única
+        búsqueda multi-consulta en FAISS; luego aplica a cada una el umbral, la
+        eliminación de duplicados y la prioridad de productos principales.
 
-                # Separar productos principales de accesorios
-                if product.get('is_main_product', False):
-                    main_products.append(product)
-                else:
-                    accessory_products.append(product)
+        Returns:
+            Una lista de productos por consulta, en el mismo orden que queries
+        """
+        if not queries:
+            return []
 
-            # Priorizar productos principales
-            results = main_products[:top_k]
+        try:
+            if self.index is None or not self.product_metadata:
+                logger.error("❌ Índice no cargado. Ejecute create_embeddings_from_db() primero")
+                return [[] for _ in queries]
 
-            # Si no hay suficientes productos principales, agregar accesorios
-            if len(results) < top_k:
-                results.extend(accessory_products[:top_k - len(results)])
+            query_embeddings = self._encode_queries([self._clean_query(query) for query in queries])
+            scores, indices = self.index.search(query_embeddings, min(top_k * 3, self.index.ntotal))
 
-            # Ordenar por score descendente
-            results.sort(key=lambda x: x['similarity_score'], reverse=True)
+            results = [
+                self._rank_results(query, scores[i], indices[i], top_k, threshold)
+                for i, query in enumerate(queries)
+            ]
 
-            logger.info(f"🔍 Encontrados {len(results)} productos para: '{query}'")
+            logger.info(f"🔍 Búsqueda por lotes: {len(queries)} consultas, "
+                        f"{sum(len(products) for products in results)} productos")
             return results
 
         except Exception as e:
-            logger.error(f"❌ Error en búsqueda: {e}")
+            logger.error(f"❌ Error en búsqueda por lotes: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return [[] for _ in queries]
+
+    def _rank_results(self, query: str, scores: np.ndarray, indices: np.ndarray,
+                      top_k: int, threshold: float) -> List[Dict]:
+        """Convierte los resultados de FAISS en productos: umbral, duplicados y prioridad a productos principales"""
+        is_laptop_query = any(word in query.lower() for word in ['portatil', 'portátil', 'laptop', 'notebook'])
+
+        # Para búsquedas específicas de portátiles, ajustar el threshold
+        adjusted_threshold = threshold
+        if is_laptop_query:
+            adjusted_threshold = max(threshold, 0.45)  # Threshold más alto para portátiles
+
+        seen_products = set()
+        main_products = []
+        accessory_products = []
+
+        for score, idx in zip(scores, indices):
+            if idx < 0 or score < adjusted_threshold:
+                continue
+
+            # Traducir el ID del vector a la fila de metadata
+            position = self.product_metadata.position_of(idx)
+            if position < 0:
+                continue
+
+            product = self.product_metadata[position]
+            product['similarity_score'] = float(score)
+
+            # Evitar duplicados por nombre similar
+            product_name = product['name'].lower()
+            if product_name in seen_products:
+                continue
+
+            seen_products.add(product_name)
+
+            # Para búsquedas de portátiles, penalizar All-in-One
+            if is_laptop_query:
+                category = product.get('category', '').lower()
+                if 'escritorio' in category or 'all-in-one' in product_name:
+                    # Reducir score para All-in-One en búsquedas de portátiles
+                    product['similarity_score'] *= 0.7
+
+            # Separar productos principales de accesorios
+            if product.get('is_main_product', False):
+                main_products.append(product)
+            else:
+                accessory_products.append(product)
+
+        # Priorizar productos principales
+        results = main_products[:top_k]
+
+        # Si no hay suficientes productos principales, agregar accesorios
+        if len(results) < top_k:
+            results.extend(accessory_products[:top_k - len(results)])
+
+        # Ordenar por score descendente
+        results.sort(key=lambda x: x['similarity_score'], reverse=True)
+        return results
+
+    def _get_filter_index(self) -> FilterIndex:
+        """Índices de filtrado de la metadata actual (se reconstruyen si cambia el índice)"""
+        filter_index = self._filter_index
+        if filter_index is None or filter_index.store is not self.product_metadata:
+            filter_index = FilterIndex(self.product_metadata)
+            self._filter_index = filter_index
+        return filter_index
 
     def search_by_filters(self, query: str = None, category: str = None,
                           min_price: float = None, max_price: float = None,
                           brand: str = None, with_discount: bool = False,
                           top_k: int = 10, threshold: float = 0.4) -> List[Dict]:
-        """Búsqueda avanzada con filtros y embeddings combinados"""
-        try:
-            if query:
-                # Búsqueda semántica primero
-                semantic_results = self.search_products(query, top_k * 2, threshold)
-            else:
-                # Sin query, usar todos los productos
-                semantic_results = [{'id': i, **meta} for i, meta in enumerate(self.product_metadata)]
-                semantic_results = semantic_results[:top_k * 3]
-
-            filtered_results = []
-
-            for product in semantic_results:
-                # Aplicar filtros
-                if category and category.lower() not in product.get('category', '').lower():
-                    continue
+        """
+        Búsqueda avanzada con filtros y embeddings combinados
 
-                if brand and brand.lower() not in product.get('brand', '').lower():
-                    continue
-
-                price = product.get('price', 0)
-                if min_price is not None and price < min_price:
-                    continue
-                if max_price is not None and price > max_price:
-                    continue
+        Los filtros se aplican antes de buscar: FAISS solo considera los vectores
+        elegibles, así que los filtros selectivos no dejan resultados por fuera.
+        """
+        try:
+            if self.index is None or not self.product_metadata:
+                logger.error("❌ Índice no cargado. Ejecute create_embeddings_from_db() primero")
+                return []
 
-                if with_discount and product.get('discount_percent', '0%') in ['0%', '0', 'Sin descuento']:
-                    continue
+            filter_index = self._get_filter_index()
+            mask = filter_index.mask(category=category, brand=brand, min_price=min_price,
+                                     max_price=max_price, with_discount=with_discount)
 
-                filtered_results.append(product)
+            if mask is None:
+                if query:
+                    return self.search_products(query, top_k, threshold)
+                mask = np.ones(len(self.product_metadata), dtype=bool)
 
-                if len(filtered_results) >= top_k:
-                    break
+            positions = np.flatnonzero(mask)
+            if not len(positions):
+                return []
 
-            return filtered_results
+            if not query:
+                # Sin query: productos elegibles, primero los principales
+                main_first = positions[np.argsort(~filter_index.is_main_product[positions], kind='stable')]
+                return self.product_metadata.rows(main_first[:top_k].tolist())
+
+            eligible_ids = filter_index.vector_ids[positions]
+            query_embedding = self._encode_query(self._clean_query(query))
+            scores, indices = filtered_search(
+                self.index, query_embedding, top_k * 3, filter_index.selector(mask), eligible_ids,
+                ef_search=self.ef_search, nprobe=self.nprobe
+            )
+
+            results = self._rank_results(query, scores[0], indices[0], top_k, threshold)
+            logger.info(f"🔍 Encontrados {len(results)} productos con filtros para: '{query}' "
+                        f"({len(positions)} elegibles)")
+            return results
 
         except Exception as e:
             logger.error(f"❌ Error en búsqueda avanzada: {e}")
@@ -451,55 +928,53 @@ class EmbeddingManager:
         if not self.product_metadata:
             return {}
 
+        store = self.product_metadata
         categories = {}
         brands = {}
-        price_ranges = {"0-100k": 0, "100k-500k": 0, "500k-1M": 0, "1M-2M": 0, "2M+": 0}
         with_discount = 0
 
-        for product in self.product_metadata:
-            # Contar categorías
-            cat = product['category']
+        # Se recorren solo las columnas necesarias, sin construir filas completas
+        for cat in store.strings('category'):
             categories[cat] = categories.get(cat, 0) + 1
 
-            # Contar marcas
-            brand = product['brand']
+        for brand in store.strings('brand'):
             if brand:  # Solo contar si tiene marca
                 brands[brand] = brands.get(brand, 0) + 1
 
-            # Rangos de precio
-            price = product['price']
-            if price < 100000:
-                price_ranges["0-100k"] += 1
-            elif price < 500000:
-                price_ranges["100k-500k"] += 1
-            elif price < 1000000:
-                price_ranges["500k-1M"] += 1
-            elif price < 2000000:
-                price_ranges["1M-2M"] += 1
-            else:
-                price_ranges["2M+"] += 1
-
-            # Productos con descuento
-            discount = product.get('discount_percent', '0%')
+        for discount in store.strings('discount_percent'):
             if discount not in ['0%', '0', 'Sin descuento']:
                 with_discount += 1
 
+        # Rangos de precio
+        prices = store.numeric('price')
+        bins = np.digitize(prices, [100000, 500000, 1000000, 2000000])
+        counts = np.bincount(bins, minlength=5)
+        price_ranges = dict(zip(["0-100k", "100k-500k", "500k-1M", "1M-2M", "2M+"], map(int, counts)))
+
         return {
-            'total_products': len(self.product_metadata),
+            'total_products': len(store),
             'categories': dict(sorted(categories.items(), key=lambda x: x[1], reverse=True)[:10]),
             'top_brands': dict(sorted(brands.items(), key=lambda x: x[1], reverse=True)[:10]),
             'price_ranges': price_ranges,
             'products_with_discount': with_discount,
-            'discount_percentage': f"{(with_discount / len(self.product_metadata) * 100):.1f}%" if self.product_metadata else "0%"
+            'discount_percentage': f"{(with_discount / len(store) * 100):.1f}%",
+            'index_version': self.index_version,
+            'query_cache': self.query_cache.stats()
         }
 
+    def get_available_sources(self) -> List[str]:
+        """Tiendas presentes en el índice (lee solo la columna 'source')"""
+        if not self.product_metadata:
+            return []
+        return sorted({source.strip().lower() for source in self.product_metadata.strings('source') if source.strip()})
+
     def get_all_products_from_index(self) -> List[Dict]:
         """Obtiene todos los productos del índice (sin búsqueda)"""
         try:
             if not self.product_metadata:
                 logger.warning("No hay metadata de productos disponible")
                 return []
-            return self.product_metadata.copy()  # Devolver copia para no modificar el original
+            return list(self.product_metadata)  # Cada fila es un dict nuevo
         except Exception as e:
             logger.error(f"Error obteniendo todos los productos: {e}")
             return []
\ No newline at end of file
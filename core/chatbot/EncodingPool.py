@@ -0,0 +1,99 @@
+import logging
+import multiprocessing
+import os
+from collections import deque
+from typing import Any, Iterator, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Modelo cargado en cada proceso worker (ver _init_worker)
+_worker_model = None
+
+
+def _init_worker(model_name: str, torch_threads: int):
+    """Inicializa un worker: limita los hilos de torch y carga el modelo una sola vez"""
+    global _worker_model
+
+    # Debe hacerse antes de importar torch para que OpenMP/MKL respeten el límite
+    os.environ['OMP_NUM_THREADS'] = str(torch_threads)
+    os.environ['MKL_NUM_THREADS'] = str(torch_threads)
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(torch_threads)
+    _worker_model = SentenceTransformer(model_name, device='cpu')
+
+
+def _encode_chunk(texts: List[str]) -> np.ndarray:
+    """Codifica un bloque de textos en el worker actual"""
+    return _worker_model.encode(
+        texts,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+
+
+class EncodingPool:
+    """
+    Pool de procesos para codificar textos en CPU en paralelo.
+
+    Cada worker carga su propia copia del modelo y usa torch_threads hilos. Los
+    resultados se devuelven siempre en el mismo orden en que se enviaron.
+    """
+
+    def __init__(self, model_name: str, workers: int, torch_threads: int = None, max_pending: int = None):
+        self.workers = workers
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        # Lotes en vuelo: suficiente para mantener ocupados los workers sin acumular memoria
+        self.max_pending = max_pending or workers * 2
+
+        logger.info(f"🚀 Iniciando pool de {workers} workers ({self.torch_threads} hilos de torch cada uno)...")
+        context = multiprocessing.get_context('spawn')
+        self._pool = context.Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(model_name, self.torch_threads)
+        )
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Codifica una lista de textos repartiéndola entre todos los workers"""
+        if not texts:
+            return np.zeros((0, 0), dtype='float32')
+
+        chunk_size = -(-len(texts) // self.workers)
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        return np.vstack(self._pool.map(_encode_chunk, chunks))
+
+    def imap(self, batches: Iterator[Tuple[Any, List[str]]]) -> Iterator[Tuple[Any, np.ndarray]]:
+        """
+        Codifica un flujo de lotes (payload, textos) y devuelve (payload, vectores)
+        en el orden original, con como máximo max_pending lotes en vuelo.
+        """
+        pending = deque()
+
+        for payload, texts in batches:
+            pending.append((payload, self._pool.apply_async(_encode_chunk, (texts,))))
+
+            if len(pending) >= self.max_pending:
+                done_payload, result = pending.popleft()
+                yield done_payload, result.get()
+
+        while pending:
+            done_payload, result = pending.popleft()
+            yield done_payload, result.get()
+
+    def close(self):
+        """Detiene los workers"""
+        self._pool.terminate()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,98 @@
+import logging
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from .MetadataStore import MetadataStore
+
+logger = logging.getLogger(__name__)
+
+# Valores de discount_percent que significan "sin descuento"
+NO_DISCOUNT_VALUES = ('0%', '0', 'Sin descuento')
+
+
+class FilterIndex:
+    """
+    Índices de filtrado sobre la metadata de productos
+
+    - categoría y marca: columnas codificadas por diccionario (un código por fila).
+      El bitmap de un filtro es la unión de los valores que contienen el texto
+      buscado, igual que la comparación por subcadena anterior.
+    - precio: arreglo de precios ordenado; un rango se resuelve con searchsorted.
+    - descuento: bitmap precalculado.
+
+    Los filtros se combinan en una máscara por fila, que se traduce a un
+    IDSelectorBitmap sobre los vector_id del índice FAISS.
+    """
+
+    def __init__(self, store: MetadataStore):
+        self.store = store
+        self.count = len(store)
+        self.vector_ids = np.asarray(store.numeric('vector_id'))
+
+        self._categories, self._category_codes = self._encode_column('category')
+        self._brands, self._brand_codes = self._encode_column('brand')
+
+        prices = np.asarray(store.numeric('price'))
+        self._price_order = np.argsort(prices, kind='stable')
+        self._sorted_prices = prices[self._price_order]
+
+        self._with_discount = np.fromiter(
+            (value not in NO_DISCOUNT_VALUES for value in store.strings('discount_percent')),
+            dtype=bool, count=self.count
+        )
+        self.is_main_product = np.asarray(store.numeric('is_main_product'), dtype=bool)
+
+        # Bitmap de vector_ids (1 bit por ID posible) reutilizado en cada consulta
+        self._id_space = int(self.vector_ids.max()) + 1 if self.count else 0
+
+    def _encode_column(self, column: str):
+        """Valores distintos (en minúsculas) y código de cada fila"""
+        values = np.fromiter((value.lower() for value in self.store.strings(column)),
+                             dtype=object, count=self.count)
+        if not self.count:
+            return np.array([], dtype=object), np.array([], dtype='int32')
+        uniques, codes = np.unique(values, return_inverse=True)
+        return uniques, codes.astype('int32')
+
+    @staticmethod
+    def _substring_mask(uniques: np.ndarray, codes: np.ndarray, text: str) -> np.ndarray:
+        matching = [code for code, value in enumerate(uniques) if text in value]
+        return np.isin(codes, matching)
+
+    def mask(self, category: str = None, brand: str = None, min_price: float = None,
+             max_price: float = None, with_discount: bool = False) -> Optional[np.ndarray]:
+        """Máscara booleana de filas que cumplen todos los filtros (None si no hay filtros)"""
+        result = None
+
+        def combine(current, new):
+            return new if current is None else current & new
+
+        if category:
+            result = combine(result, self._substring_mask(self._categories, self._category_codes, category.lower()))
+
+        if brand:
+            result = combine(result, self._substring_mask(self._brands, self._brand_codes, brand.lower()))
+
+        if min_price is not None or max_price is not None:
+            start = 0 if min_price is None else np.searchsorted(self._sorted_prices, min_price, side='left')
+            end = self.count if max_price is None else np.searchsorted(self._sorted_prices, max_price, side='right')
+            price_mask = np.zeros(self.count, dtype=bool)
+            price_mask[self._price_order[start:end]] = True
+            result = combine(result, price_mask)
+
+        if with_discount:
+            result = combine(result, self._with_discount)
+
+        return result
+
+    def selector(self, mask: np.ndarray) -> faiss.IDSelector:
+        """IDSelectorBitmap con los vector_id de las filas seleccionadas"""
+        id_mask = np.zeros(self._id_space, dtype=bool)
+        id_mask[self.vector_ids[mask]] = True
+        bitmap = np.packbits(id_mask, bitorder='little')
+        selector = faiss.IDSelectorBitmap(bitmap)
+        # El selector no copia el bitmap: se mantiene vivo junto al selector
+        selector.referenced_bitmap = bitmap
+        return selector
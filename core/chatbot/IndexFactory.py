@@ -0,0 +1,197 @@
+import logging
+import math
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tipos de índice soportados para la búsqueda de productos
+INDEX_TYPES = ('flat', 'hnsw', 'ivfpq')
+
+# Valores de parámetros de búsqueda que se evalúan al reportar el recall
+EF_SEARCH_SWEEP = [16, 32, 64, 128, 256]
+NPROBE_SWEEP = [1, 4, 8, 16, 32, 64]
+
+
+def resolve_ivf_params(total: int, nlist: Optional[int] = None, pq_m: int = 16,
+                       dimension: Optional[int] = None) -> Dict:
+    """
+    Ajusta nlist/pq_m al tamaño del catálogo.
+
+    FAISS recomienda ~39 vectores de entrenamiento por centroide y 256 por
+    subcuantizador de PQ (códigos de 8 bits).
+    """
+    if nlist is None:
+        nlist = int(4 * math.sqrt(max(total, 1)))
+    nlist = max(1, min(nlist, total // 39))
+
+    if dimension is not None and dimension % pq_m != 0:
+        divisors = [m for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1) if dimension % m == 0 and m <= pq_m]
+        pq_m = divisors[0]
+
+    return {'nlist': nlist, 'pq_m': pq_m, 'min_train': max(39 * nlist, 256)}
+
+
+def create_index(index_type: str, dimension: int, hnsw_m: int = 32, ef_construction: int = 80,
+                 nlist: int = 1024, pq_m: int = 16) -> faiss.Index:
+    """
+    Crea un índice vacío con producto interno (similitud coseno sobre vectores normalizados)
+
+    - flat: búsqueda exacta (fuerza bruta), vectores float32 completos
+    - hnsw: grafo HNSW, búsqueda aproximada rápida; no admite eliminar vectores
+    - ivfpq: lista invertida + product quantization, mucho menos memoria; requiere entrenamiento
+    """
+    if index_type == 'flat':
+        return faiss.index_factory(dimension, "IDMap2,Flat", faiss.METRIC_INNER_PRODUCT)
+
+    if index_type == 'hnsw':
+        index = faiss.index_factory(dimension, f"IDMap2,HNSW{hnsw_m}", faiss.METRIC_INNER_PRODUCT)
+        faiss.downcast_index(index.index).hnsw.efConstruction = ef_construction
+        return index
+
+    if index_type == 'ivfpq':
+        return faiss.index_factory(dimension, f"IVF{nlist},PQ{pq_m}", faiss.METRIC_INNER_PRODUCT)
+
+    raise ValueError(f"Tipo de índice no soportado: {index_type}. Opciones: {', '.join(INDEX_TYPES)}")
+
+
+def describe_index(index: faiss.Index) -> str:
+    """Nombre corto del tipo de índice ('flat', 'hnsw', 'ivfpq' u otro)"""
+    if faiss.try_extract_index_ivf(index) is not None:
+        return 'ivfpq'
+
+    inner = faiss.downcast_index(index.index) if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(inner, faiss.IndexFlat):
+        return 'flat'
+    return type(inner).__name__
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """Indica si el índice permite eliminar/reemplazar vectores por ID"""
+    return describe_index(index) in ('flat', 'ivfpq') and (
+        isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) or faiss.try_extract_index_ivf(index) is not None
+    )
+
+
+def set_search_params(index: faiss.Index, ef_search: Optional[int] = None, nprobe: Optional[int] = None):
+    """Aplica los parámetros de búsqueda del tipo de índice (los demás se ignoran)"""
+    kind = describe_index(index)
+    parameter_space = faiss.ParameterSpace()
+
+    if kind == 'hnsw' and ef_search:
+        parameter_space.set_index_parameter(index, 'efSearch', ef_search)
+    elif kind == 'ivfpq' and nprobe:
+        parameter_space.set_index_parameter(index, 'nprobe', nprobe)
+
+
+class RecallEstimator:
+    """
+    Calcula el top-k exacto (como un IndexFlatIP) de un conjunto de consultas
+    mientras los vectores pasan por el pipeline, sin guardarlos todos en memoria.
+    """
+
+    def __init__(self, queries: np.ndarray, k: int = 10):
+        self.queries = np.ascontiguousarray(queries, dtype='float32')
+        self.k = k
+        self.best_scores = np.full((len(queries), k), -np.inf, dtype='float32')
+        self.best_ids = np.full((len(queries), k), -1, dtype='int64')
+
+    def observe(self, vectors: np.ndarray, ids: np.ndarray):
+        """Incorpora un lote de vectores al top-k exacto"""
+        scores = self.queries @ vectors.T
+        all_scores = np.hstack([self.best_scores, scores])
+        all_ids = np.hstack([self.best_ids, np.broadcast_to(ids, scores.shape)])
+
+        top = np.argsort(-all_scores, axis=1, kind='stable')[:, :self.k]
+        self.best_scores = np.take_along_axis(all_scores, top, axis=1)
+        self.best_ids = np.take_along_axis(all_ids, top, axis=1)
+
+    def recall(self, index: faiss.Index) -> float:
+        """Recall@k del índice frente al top-k exacto"""
+        _, ids = index.search(self.queries, self.k)
+        hits = 0
+        expected = 0
+        for exact, found in zip(self.best_ids, ids):
+            exact = set(exact[exact >= 0])
+            hits += len(exact & set(found[found >= 0]))
+            expected += len(exact)
+        return hits / expected if expected else 1.0
+
+    def report(self, index: faiss.Index) -> List[Dict]:
+        """
+        Recall@k y latencia media por consulta para distintos valores de
+        efSearch/nprobe (una sola fila para el índice exacto)
+        """
+        kind = describe_index(index)
+        if kind == 'hnsw':
+            sweep = [('efSearch', value) for value in EF_SEARCH_SWEEP]
+        elif kind == 'ivfpq':
+            nlist = faiss.extract_index_ivf(index).nlist
+            sweep = [('nprobe', value) for value in NPROBE_SWEEP if value <= nlist]
+        else:
+            sweep = [(None, None)]
+
+        rows = []
+        parameter_space = faiss.ParameterSpace()
+        for name, value in sweep:
+            if name:
+                parameter_space.set_index_parameter(index, name, value)
+
+            start = time.perf_counter()
+            recall = self.recall(index)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(self.queries), 1)
+            rows.append({'param': name, 'value': value, 'recall': recall, 'latency_ms': elapsed_ms})
+
+        return rows
+
+
+# Con pocos candidatos es más rápido (y exacto) puntuarlos directamente
+EXACT_SCAN_LIMIT = 4096
+
+
+def _exact_scan(index: faiss.Index, query: np.ndarray, k: int, eligible_ids: np.ndarray):
+    """Puntúa por fuerza bruta solo los vectores elegibles"""
+    vectors = index.reconstruct_batch(eligible_ids)
+    scores = vectors @ query[0]
+    top = np.argsort(-scores, kind='stable')[:k]
+    return scores[top][None, :].astype('float32'), eligible_ids[top][None, :]
+
+
+def filtered_search(index: faiss.Index, query: np.ndarray, k: int, selector: faiss.IDSelector,
+                    eligible_ids: np.ndarray, ef_search: int = 64, nprobe: int = 16):
+    """
+    Búsqueda restringida a los IDs del selector que devuelve min(k, elegibles) resultados
+
+    Los índices aproximados pueden quedarse cortos con filtros muy selectivos (el
+    grafo HNSW o las listas IVF visitadas casi no tienen candidatos); en ese caso
+    se amplía la búsqueda hasta completar k.
+    """
+    k = min(k, len(eligible_ids))
+    if k == 0:
+        return np.zeros((1, 0), dtype='float32'), np.zeros((1, 0), dtype='int64')
+
+    kind = describe_index(index)
+
+    if kind == 'hnsw':
+        if len(eligible_ids) <= EXACT_SCAN_LIMIT:
+            return _exact_scan(index, query, k, eligible_ids)
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(ef_search, 2 * k))
+        scores, ids = index.search(query, k, params=params)
+        if (ids[0] >= 0).sum() < k:
+            return _exact_scan(index, query, k, eligible_ids)
+        return scores, ids
+
+    if kind == 'ivfpq':
+        nlist = faiss.extract_index_ivf(index).nlist
+        scores, ids = index.search(query, k, params=faiss.SearchParametersIVF(sel=selector, nprobe=nprobe))
+        if (ids[0] >= 0).sum() < k and nprobe < nlist:
+            # Recorrer todas las listas garantiza encontrar todos los elegibles
+            scores, ids = index.search(query, k, params=faiss.SearchParametersIVF(sel=selector, nprobe=nlist))
+        return scores, ids
+
+    return index.search(query, k, params=faiss.SearchParameters(sel=selector))
@@ -0,0 +1,186 @@
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, NamedTuple
+
+# Listas de palabras clave por etiqueta; la coincidencia es por subcadena sobre el
+# mensaje en minúsculas (igual que los antiguos `any(k in input_lower ...)`)
+KEYWORDS: Dict[str, tuple] = {
+    # Consultas específicas sobre tiendas
+    'store_specific': (
+        'de que tiendas', 'que tiendas', 'qué tiendas', 'tiendas tienes',
+        'tiendas tiene', 'tiendas hay', 'tiendas disponibles', 'tiendas trabajas',
+        'tiendas manejas', 'en qué almacenes', 'qué empresas'
+    ),
+    # Indicadores generales de tienda (solo cuentan en consultas cortas)
+    'store_general': ('tienda', 'store', 'almacén', 'empresa'),
+    # Conversación general (solo cuenta en consultas cortas)
+    'conversation': (
+        'cómo estás', 'qué tal', 'cómo te va', 'gracias', 'hola', 'buenos días',
+        'buenas tardes', 'buenas noches', 'adiós', 'chao', 'bye'
+    ),
+    # Intención de búsqueda
+    'search_intent': (
+        'buscar', 'busco', 'encontrar', 'encuentra', 'quiero', 'necesito',
+        'recomienda', 'muestra', 'muéstrame', 'dime', 'ayuda', 'ayúdame',
+        'producto', 'productos', 'oferta', 'ofertas', 'descuento', 'comprar',
+        'laptop', 'celular', 'tablet', 'televisor', 'monitor', 'audífonos',
+        'precio', 'cuesta', 'valor', 'costó', 'disponible', 'tienes'
+    ),
+    # Categorías y marcas comunes
+    'tech': (
+        'samsung', 'apple', 'iphone', 'lenovo', 'hp', 'dell', 'asus', 'acer',
+        'portátil', 'portatil', 'laptop', 'notebook', 'smartphone', 'celular',
+        'tablet', 'ipad', 'tv', 'televisor', 'monitor', 'proyector', 'consola',
+        'playstation', 'xbox', 'nintendo', 'audífonos', 'headphones', 'impresora'
+    ),
+    # Saludo + búsqueda → umbral medio
+    'mixed': (
+        'hola me podrías ayudar', 'buenos días quiero', 'hola busco',
+        'hola necesito', 'hola quiero', 'buenas tardes me recomiendas'
+    ),
+    # Consultas técnicas específicas → umbral bajo
+    'tech_specific': (
+        'ram', 'procesador', 'almacenamiento', 'pantalla',
+        'gb', 'tb', 'intel', 'amd', 'ryzen', 'core', 'nvidia'
+    ),
+}
+
+# Mensajes que son EXACTAMENTE conversación normal → no buscar productos
+CONVERSATION_PHRASES = frozenset((
+    'hola', 'hello', 'hi', 'buenos días', 'buenas tardes', 'buenas noches',
+    'qué tal', 'cómo estás', 'cómo te va', 'qué hay', 'qué onda',
+    'gracias', 'thanks', 'thank you', 'adiós', 'chao', 'bye',
+    'saludos', 'ok', 'vale', 'entendido', 'de nada', 'perdón', 'disculpa',
+    'cómo estás hoy', 'qué cuentas', 'cómo ha estado', 'qué me cuentas'
+))
+
+# Consultas de hasta este número de palabras se consideran "cortas"
+SHORT_QUERY_WORDS = 4
+
+THRESHOLD_MIXED = 0.4
+THRESHOLD_TECH_SPECIFIC = 0.35
+THRESHOLD_DEFAULT = 0.45
+
+
+class KeywordAutomaton:
+    """
+    Autómata Aho–Corasick sobre las palabras clave de cada etiqueta
+
+    Se construye una vez y encuentra en una sola pasada por el texto todas las
+    etiquetas cuyas palabras aparecen como subcadena, incluidas las solapadas
+    ('que tiendas' y 'tienda' en el mismo mensaje).
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [frozenset()]
+
+        outputs = [set()]
+        for label, words in keywords.items():
+            for word in words:
+                state = 0
+                for char in word:
+                    nxt = self._goto[state].get(char)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[state][char] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        outputs.append(set())
+                    state = nxt
+                outputs[state].add(label)
+
+        # Enlaces de fallo en anchura: cada estado hereda las etiquetas de su sufijo
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                outputs[nxt] |= outputs[self._fail[nxt]]
+
+        self._out = [frozenset(labels) for labels in outputs]
+
+    def labels(self, text: str) -> FrozenSet[str]:
+        """Etiquetas con al menos una palabra clave contenida en text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return frozenset(found)
+
+
+# Construido una sola vez al importar el módulo
+AUTOMATON = KeywordAutomaton(KEYWORDS)
+
+
+class Intent(NamedTuple):
+    """Resultado del enrutado de un mensaje"""
+    kind: str                 # 'store', 'conversational' o 'product'
+    is_store: bool
+    is_product: bool
+    threshold: float
+    flags: FrozenSet[str]     # etiquetas de KEYWORDS encontradas en el mensaje
+    word_count: int
+    elapsed_us: float         # coste del enrutado (sin contar aciertos de la memo)
+
+
+@lru_cache(maxsize=4096)
+def route(user_input: str) -> Intent:
+    """
+    Clasifica un mensaje en una sola pasada: intención, umbral dinámico y etiquetas
+
+    Reproduce las reglas de TechChatbot (tienda → conversación → búsqueda) y se
+    memoiza por mensaje, así que reintentos y llamadas repetidas durante el mismo
+    turno no vuelven a recorrer el texto.
+    """
+    start = time.perf_counter()
+    text = user_input.lower().strip()
+    flags = AUTOMATON.labels(text)
+    word_count = len(text.split())
+    short = word_count <= SHORT_QUERY_WORDS
+
+    is_store = 'store_specific' in flags or ('store_general' in flags and short)
+
+    if text in CONVERSATION_PHRASES:
+        is_product = False
+    elif 'conversation' in flags and short:
+        is_product = False
+    elif 'search_intent' in flags or 'tech' in flags:
+        is_product = True
+    else:
+        # Consultas muy cortas sin contexto no buscan; el resto sí, por si acaso
+        is_product = word_count > 2
+
+    if 'mixed' in flags:
+        threshold = THRESHOLD_MIXED
+    elif 'tech_specific' in flags:
+        threshold = THRESHOLD_TECH_SPECIFIC
+    else:
+        threshold = THRESHOLD_DEFAULT
+
+    if is_store:
+        kind = 'store'
+    elif is_product:
+        kind = 'product'
+    else:
+        kind = 'conversational'
+
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    return Intent(kind, is_store, is_product, threshold, flags, word_count, elapsed_us)
+
+
+def router_stats() -> Dict:
+    """Aciertos y fallos de la memo del router"""
+    info = route.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': info.maxsize}
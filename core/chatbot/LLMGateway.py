@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from functools import lru_cache
+from typing import AsyncIterator, List, Dict
+
+import httpx
+from django.conf import settings
+from groq import (
+    APIConnectionError, AsyncGroq, DefaultAsyncHttpxClient, DefaultHttpxClient, Groq, InternalServerError,
+    RateLimitError
+)
+
+logger = logging.getLogger(__name__)
+
+# Errores transitorios del proveedor: se reintentan y cuentan para el circuito
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
+# Timeout mínimo de un intento: el semáforo puede consumir casi todo el deadline
+MIN_ATTEMPT_TIMEOUT = 0.05
+
+
+class LLMUnavailableError(Exception):
+    """No se pudo obtener respuesta del LLM dentro del presupuesto de la llamada"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """El circuito está abierto: se responde sin llamar al proveedor"""
+
+
+class CircuitBreaker:
+    """
+    Circuito de tres estados para el proveedor del LLM
+
+    - cerrado: las llamadas pasan; `failure_threshold` fallos seguidos lo abren.
+    - abierto: las llamadas fallan al instante durante `reset_timeout` segundos.
+    - semiabierto: pasado ese tiempo se deja pasar una sola llamada de prueba; si
+      funciona se cierra y si falla se vuelve a abrir.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return 'open'
+            return 'half_open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release_probe(self):
+        """Libera la llamada de prueba sin veredicto (no llegó a consultar al proveedor o se canceló)"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probing:
+                    logger.warning(f"🔌 Circuito del LLM abierto por {self.reset_timeout:.0f}s "
+                                   f"tras {self.failures} fallos")
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class LLMGateway:
+    """
+    Acceso compartido al LLM (Groq) con tiempos acotados
+
+    - Un cliente HTTP con pool de conexiones por proceso (y uno asíncrono por event loop).
+    - `deadline`: segundos totales de la llamada, incluidos reintentos y espera
+      por el semáforo; cada intento usa min(timeout, tiempo restante).
+    - Reintentos con backoff exponencial y jitter completo solo para errores
+      transitorios (conexión, timeout, 429 y 5xx).
+    - Circuito: con el proveedor caído las llamadas fallan al instante con
+      CircuitOpenError y el chatbot pasa directo a su respuesta de respaldo.
+    - Semáforo: como máximo `max_concurrency` llamadas en vuelo por proceso (por
+      event loop en las llamadas asíncronas).
+    """
+
+    def __init__(self, api_key: str, base_url: str = None, timeout: float = None, deadline: float = None,
+                 max_retries: int = None, retry_backoff: float = None, max_concurrency: int = None,
+                 breaker: CircuitBreaker = None, client: Groq = None, async_client: AsyncGroq = None):
+        self.api_key = api_key
+        self.base_url = base_url or getattr(settings, 'CHATBOT_LLM_BASE_URL', None)
+        self.timeout = timeout or getattr(settings, 'CHATBOT_LLM_TIMEOUT', 10.0)
+        self.deadline = deadline or getattr(settings, 'CHATBOT_LLM_DEADLINE', 20.0)
+        self.max_retries = getattr(settings, 'CHATBOT_LLM_MAX_RETRIES', 2) if max_retries is None else max_retries
+        self.retry_backoff = retry_backoff or getattr(settings, 'CHATBOT_LLM_RETRY_BACKOFF', 0.5)
+        self.max_concurrency = max_concurrency or getattr(settings, 'CHATBOT_LLM_MAX_CONCURRENCY', 8)
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=getattr(settings, 'CHATBOT_LLM_BREAKER_FAILURES', 5),
+            reset_timeout=getattr(settings, 'CHATBOT_LLM_BREAKER_RESET', 30.0)
+        )
+
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._async_client = async_client
+        # Cliente y semáforo asíncronos por event loop: su pool queda ligado al loop que lo crea
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+
+    @property
+    def client(self) -> Groq:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # Los reintentos los maneja el gateway, no el SDK
+                    self._client = Groq(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                        timeout=self.timeout, http_client=DefaultHttpxClient(limits=self._limits()))
+        return self._client
+
+    def _get_async_client(self) -> AsyncGroq:
+        if self._async_client is not None:
+            return self._async_client
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            self._async_clients[loop] = AsyncGroq(
+                api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout,
+                http_client=DefaultAsyncHttpxClient(limits=self._limits())
+            )
+        return self._async_clients[loop]
+
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_semaphores:
+            self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._async_semaphores[loop]
+
+    def _before_attempt(self, end: float) -> float:
+        """Tiempo restante de la llamada; falla al instante si el circuito está abierto o no queda tiempo"""
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise LLMUnavailableError("Se agotó el tiempo de la llamada al LLM")
+        if not self.breaker.allow():
+            raise CircuitOpenError("Circuito del LLM abierto")
+        return remaining
+
+    def _attempt_timeout(self, end: float) -> float:
+        """Timeout de un intento: min(timeout, tiempo restante), nunca cero ni negativo"""
+        return max(MIN_ATTEMPT_TIMEOUT, min(self.timeout, end - time.monotonic()))
+
+    def _after_error(self, error: Exception, attempt: int, end: float) -> float:
+        """Registra el fallo y devuelve la espera antes del siguiente intento, o relanza el error"""
+        if not isinstance(error, RETRYABLE_ERRORS + (LLMUnavailableError,)):
+            # El proveedor respondió (p. ej. 400): no es un problema de disponibilidad
+            self.breaker.record_success()
+            raise error
+
+        self.breaker.record_failure()
+        delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+        if attempt >= self.max_retries or time.monotonic() + delay >= end:
+            raise error
+        logger.warning(f"🔁 Reintento {attempt + 1}/{self.max_retries} del LLM en {delay:.2f}s: {error}")
+        return delay
+
+    def complete(self, messages: List[Dict], deadline: float = None, **options):
+        """chat.completions.create con deadline total, reintentos, circuito y límite de concurrencia"""
+        end = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            remaining = self._before_attempt(end)
+            if not self._semaphore.acquire(timeout=remaining):
+                self.breaker.release_probe()
+                raise LLMUnavailableError("Demasiadas llamadas al LLM en curso")
+            try:
+                result = self.client.chat.completions.create(
+                    messages=messages, timeout=self._attempt_timeout(end), **options
+                )
+            except Exception as e:
+                error = e
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                self._semaphore.release()
+
+            time.sleep(self._after_error(error, attempt, end))
+            attempt += 1
+
+    async def stream(self, messages: List[Dict], deadline: float = None, **options) -> AsyncIterator[str]:
+        """
+        Fragmentos de texto de una respuesta en streaming
+
+        Solo se reintenta mientras no se haya emitido ningún fragmento; un corte a
+        mitad de respuesta se propaga al llamador.
+        """
+        end = time.monotonic() + (deadline or self.deadline)
+        semaphore = self._get_async_semaphore()
+        attempt = 0
+        while True:
+            remaining = self._before_attempt(end)
+            try:
+                await asyncio.wait_for(semaphore.acquire(), remaining)
+            except BaseException as e:
+                # Sin intento no hay veredicto: la prueba del circuito semiabierto queda libre
+                self.breaker.release_probe()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise LLMUnavailableError("Demasiadas llamadas al LLM en curso") from None
+                raise
+
+            emitted = False
+            try:
+                stream = await self._get_async_client().chat.completions.create(
+                    messages=messages, stream=True, timeout=self._attempt_timeout(end), **options
+                )
+                async for chunk in stream:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        emitted = True
+                        yield text
+                    if time.monotonic() > end:
+                        raise LLMUnavailableError("Se agotó el tiempo de la respuesta del LLM")
+            except Exception as e:
+                error = e
+            except BaseException:
+                # El cliente se desconectó (GeneratorExit) o la tarea se canceló
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return
+            finally:
+                semaphore.release()
+
+            if emitted:
+                self.breaker.record_failure()
+                raise error
+            await asyncio.sleep(self._after_error(error, attempt, end))
+            attempt += 1
+
+
+@lru_cache(maxsize=8)
+def get_llm_gateway(api_key: str) -> LLMGateway:
+    """Gateway compartido por todas las instancias que usan la misma API key"""
+    return LLMGateway(api_key)
@@ -0,0 +1,321 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Formato binario de metadata de productos (un solo archivo):
+#   MAGIC (8 bytes) | longitud del header (uint64 LE) | header JSON | secciones
+# Cada columna numérica es un arreglo NumPy contiguo; cada columna de texto es un
+# arreglo de offsets int64 (n + 1) más un blob UTF-8. Las secciones se leen con
+# mmap, así que varios workers comparten las mismas páginas del page cache.
+MAGIC = b"PMETA\x00\x01\x00"
+ALIGNMENT = 64
+
+NUMERIC_COLUMNS = {
+    'vector_id': '<i8',
+    'price': '<f8',
+    'is_main_product': '|u1',
+}
+
+STRING_COLUMNS = [
+    'id', 'name', 'brand', 'category', 'discount_percent', 'product_url',
+    'image_url', 'availability', 'source', 'specifications', 'content_hash',
+]
+
+# Columnas de uso interno que no se incluyen en las filas devueltas
+INTERNAL_COLUMNS = {'content_hash'}
+
+# Columnas de texto que se guardan como JSON (se decodifican al construir la fila)
+JSON_COLUMNS = {'specifications'}
+
+
+def _pad(offset: int) -> int:
+    """Bytes de relleno para alinear una sección"""
+    return (-offset) % ALIGNMENT
+
+
+class MetadataStoreWriter:
+    """
+    Escribe la metadata de productos fila a fila en formato columnar.
+
+    Las filas se acumulan en archivos temporales por columna, así que la memoria
+    no depende del número de productos. close() ensambla el archivo final y lo
+    reemplaza de forma atómica.
+    """
+
+    def __init__(self, path: str, flush_every: int = 1024, extra: Optional[Dict] = None):
+        self.path = path
+        self.flush_every = flush_every
+        self.extra = extra or {}
+        self.count = 0
+
+        self._tmp_dir = tempfile.mkdtemp(prefix=".metadata-", dir=os.path.dirname(path) or ".")
+        self._buffers = {name: [] for name in list(NUMERIC_COLUMNS) + STRING_COLUMNS}
+        self._files = {}
+        self._string_sizes = {name: 0 for name in STRING_COLUMNS}
+
+        for name in NUMERIC_COLUMNS:
+            self._files[name] = open(os.path.join(self._tmp_dir, f"{name}.num"), 'wb')
+        for name in STRING_COLUMNS:
+            self._files[f"{name}.off"] = open(os.path.join(self._tmp_dir, f"{name}.off"), 'wb')
+            self._files[f"{name}.str"] = open(os.path.join(self._tmp_dir, f"{name}.str"), 'wb')
+            # Offset inicial de cada columna de texto
+            self._files[f"{name}.off"].write(np.zeros(1, dtype='<i8').tobytes())
+
+    def append(self, row: Dict):
+        """Agrega una fila (mismo formato que la metadata JSON anterior)"""
+        self._buffers['vector_id'].append(row.get('vector_id', self.count))
+        self._buffers['price'].append(row.get('price') or 0)
+        self._buffers['is_main_product'].append(1 if row.get('is_main_product') else 0)
+
+        for name in STRING_COLUMNS:
+            value = row.get(name)
+            if name in JSON_COLUMNS:
+                value = json.dumps(value or {}, ensure_ascii=False, separators=(',', ':'))
+            self._buffers[name].append('' if value is None else str(value))
+
+        self.count += 1
+        if len(self._buffers['price']) >= self.flush_every:
+            self._flush()
+
+    def _flush(self):
+        """Vuelca los buffers en memoria a los archivos temporales"""
+        for name, dtype in NUMERIC_COLUMNS.items():
+            if self._buffers[name]:
+                self._files[name].write(np.asarray(self._buffers[name], dtype=dtype).tobytes())
+                self._buffers[name] = []
+
+        for name in STRING_COLUMNS:
+            values = self._buffers[name]
+            if not values:
+                continue
+
+            encoded = [value.encode('utf-8') for value in values]
+            lengths = np.fromiter((len(value) for value in encoded), dtype='<i8', count=len(encoded))
+            offsets = self._string_sizes[name] + np.cumsum(lengths)
+
+            self._files[f"{name}.str"].write(b''.join(encoded))
+            self._files[f"{name}.off"].write(offsets.astype('<i8').tobytes())
+            self._string_sizes[name] = int(offsets[-1])
+            self._buffers[name] = []
+
+    def close(self) -> str:
+        """Ensambla el archivo final y lo publica atómicamente. Devuelve su build_id"""
+        self._flush()
+        for handle in self._files.values():
+            handle.close()
+
+        sections = []
+        columns = {}
+        position = 0
+
+        def add_section(filename):
+            nonlocal position
+            size = os.path.getsize(os.path.join(self._tmp_dir, filename))
+            sections.append((filename, size))
+            section_offset = position
+            position += size + _pad(size)
+            return section_offset, size
+
+        for name, dtype in NUMERIC_COLUMNS.items():
+            offset, nbytes = add_section(f"{name}.num")
+            columns[name] = {'kind': 'numeric', 'dtype': dtype, 'offset': offset, 'nbytes': nbytes}
+
+        for name in STRING_COLUMNS:
+            offsets_offset, _ = add_section(f"{name}.off")
+            data_offset, data_nbytes = add_section(f"{name}.str")
+            columns[name] = {'kind': 'string', 'offsets': offsets_offset,
+                             'data': data_offset, 'nbytes': data_nbytes}
+
+        build_id = uuid.uuid4().hex
+        header = json.dumps({
+            'version': 1,
+            'count': self.count,
+            'build_id': build_id,
+            'created_at': datetime.now().isoformat(),
+            'columns': columns,
+            'extra': self.extra,
+        }).encode('utf-8')
+
+        prefix_size = len(MAGIC) + 8 + len(header)
+        tmp_path = f"{self.path}.tmp"
+
+        try:
+            with open(tmp_path, 'wb') as out:
+                out.write(MAGIC)
+                out.write(struct.pack('<Q', len(header)))
+                out.write(header)
+                out.write(b'\x00' * _pad(prefix_size))
+
+                for filename, size in sections:
+                    with open(os.path.join(self._tmp_dir, filename), 'rb') as section:
+                        shutil.copyfileobj(section, out, 1024 * 1024)
+                    out.write(b'\x00' * _pad(size))
+
+                out.flush()
+                os.fsync(out.fileno())
+
+            os.replace(tmp_path, self.path)
+        finally:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return build_id
+
+    def abort(self):
+        """Descarta lo escrito sin tocar el archivo final"""
+        for handle in self._files.values():
+            handle.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+class MetadataStore:
+    """
+    Lectura memory-mapped de la metadata de productos.
+
+    Se comporta como una secuencia de solo lectura: store[i] construye el dict de
+    la fila i (solo para las filas que realmente se usan).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Archivo de metadata vacío: {path}")
+
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Archivo de metadata con formato desconocido: {path}")
+
+        header_size = struct.unpack_from('<Q', self._mm, len(MAGIC))[0]
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(self._mm[header_start:header_start + header_size].decode('utf-8'))
+
+        self.count = self.header['count']
+        self.build_id = self.header.get('build_id')
+        self.extra = self.header.get('extra', {})
+
+        data_start = header_start + header_size
+        data_start += _pad(data_start)
+
+        self._numeric = {}
+        self._offsets = {}
+        self._data_offsets = {}
+
+        for name, info in self.header['columns'].items():
+            if info['kind'] == 'numeric':
+                self._numeric[name] = np.frombuffer(
+                    self._mm, dtype=info['dtype'], count=self.count, offset=data_start + info['offset']
+                )
+            else:
+                self._offsets[name] = np.frombuffer(
+                    self._mm, dtype='<i8', count=self.count + 1, offset=data_start + info['offsets']
+                )
+                self._data_offsets[name] = data_start + info['data']
+
+        # Posición de cada vector_id (identidad si los IDs son 0..n-1)
+        vector_ids = self._numeric['vector_id']
+        self._identity_ids = bool(
+            self.count == 0 or (vector_ids[0] == 0 and vector_ids[-1] == self.count - 1
+                                and np.all(np.diff(vector_ids) == 1))
+        )
+        self._id_order = None if self._identity_ids else np.argsort(vector_ids, kind='stable')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+    def __getitem__(self, position: int) -> Dict:
+        if position < 0:
+            position += self.count
+        if position < 0 or position >= self.count:
+            raise IndexError(position)
+        return self._build_row(position)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for position in range(self.count):
+            yield self._build_row(position)
+
+    def get_string(self, column: str, position: int) -> str:
+        """Devuelve el texto de una columna para una fila"""
+        offsets = self._offsets[column]
+        start = self._data_offsets[column] + int(offsets[position])
+        end = self._data_offsets[column] + int(offsets[position + 1])
+        return self._mm[start:end].decode('utf-8')
+
+    def strings(self, column: str) -> Iterator[str]:
+        """Itera los valores de una columna de texto sin construir filas completas"""
+        for position in range(self.count):
+            yield self.get_string(column, position)
+
+    def numeric(self, column: str) -> np.ndarray:
+        """Arreglo NumPy (solo lectura, memory-mapped) de una columna numérica"""
+        return self._numeric[column]
+
+    def position_of(self, vector_id: int) -> int:
+        """Fila correspondiente a un ID del índice FAISS (-1 si no existe)"""
+        if self._identity_ids:
+            return int(vector_id) if 0 <= vector_id < self.count else -1
+
+        vector_ids = self._numeric['vector_id']
+        index = np.searchsorted(vector_ids, vector_id, sorter=self._id_order)
+        if index < self.count and vector_ids[self._id_order[index]] == vector_id:
+            return int(self._id_order[index])
+        return -1
+
+    def has_column(self, column: str) -> bool:
+        """Indica si el archivo incluye una columna (archivos antiguos pueden no tenerla)"""
+        return column in self._numeric or column in self._offsets
+
+    def _build_row(self, position: int) -> Dict:
+        row = {}
+        for name in STRING_COLUMNS:
+            if name in INTERNAL_COLUMNS or name not in self._offsets:
+                continue
+            value = self.get_string(name, position)
+            row[name] = json.loads(value) if name in JSON_COLUMNS else value
+
+        row['price'] = float(self._numeric['price'][position])
+        row['is_main_product'] = bool(self._numeric['is_main_product'][position])
+        return row
+
+    def rows(self, positions: List[int]) -> List[Dict]:
+        """Construye las filas indicadas"""
+        return [self._build_row(position) for position in positions]
+
+    def close(self):
+        """Libera el mapeo de memoria"""
+        # Las vistas NumPy mantienen referencias al mmap; se sueltan antes de cerrarlo
+        self._numeric = {}
+        self._offsets = {}
+        try:
+            self._mm.close()
+        except (BufferError, ValueError):
+            pass
+        self._file.close()
+
+
+def convert_json_metadata(json_path: str, store_path: str) -> int:
+    """Convierte un product_metadata.json (formato anterior) al formato binario"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+
+    writer = MetadataStoreWriter(store_path)
+    for row in rows:
+        writer.append(row)
+    writer.close()
+    return len(rows)
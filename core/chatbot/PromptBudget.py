@@ -0,0 +1,127 @@
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Tokens extra por mensaje del formato de chat (rol y delimitadores)
+MESSAGE_OVERHEAD = 4
+
+# Palabras, números y signos sueltos: aproximación del tokenizer cuando no hay uno local
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+class TokenCounter:
+    """
+    Cuenta tokens localmente, sin llamar a la API
+
+    Usa el tokenizer de `tokenizer` (ruta a un tokenizer.json o nombre en el Hub
+    de Hugging Face, p. ej. el del modelo Llama que sirve Groq). Si no se puede
+    cargar, estima: cada palabra o signo cuenta 1 token y las palabras largas
+    uno más cada 5 caracteres, lo que para español queda cerca del BPE de Llama 3.
+    """
+
+    def __init__(self, tokenizer: str = None):
+        self.tokenizer = None
+        if tokenizer:
+            try:
+                from tokenizers import Tokenizer
+                if os.path.exists(tokenizer):
+                    self.tokenizer = Tokenizer.from_file(tokenizer)
+                else:
+                    self.tokenizer = Tokenizer.from_pretrained(tokenizer)
+            except Exception as e:
+                logger.warning(f"⚠️ Tokenizer {tokenizer} no disponible, se estiman los tokens: {e}")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        return sum(1 + (len(piece) - 1) // 5 for piece in _PIECES.findall(text))
+
+    def count_messages(self, messages: List[Dict]) -> int:
+        return sum(self.count(message["content"]) + MESSAGE_OVERHEAD for message in messages)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Recorta text a unos max_tokens tokens, cortando en el último espacio"""
+        if self.count(text) <= max_tokens:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count(text[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        cut = text[:low]
+        if ' ' in cut:
+            cut = cut[:cut.rindex(' ')]
+        return cut.rstrip() + "…"
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> TokenCounter:
+    """Contador compartido por proceso (el tokenizer se carga una sola vez)"""
+    return TokenCounter(getattr(settings, 'CHATBOT_TOKENIZER', None))
+
+
+class PromptBudget:
+    """
+    Ajusta el historial de conversación a un presupuesto de tokens del prompt
+
+    - Las respuestas anteriores del asistente se recortan a `message_tokens`
+      (salvo la última, que suele ser la que el usuario está comentando).
+    - Si aún no cabe, se descartan los turnos más antiguos y sus preguntas se
+      resumen en una sola línea ("Antes el usuario preguntó por: ...").
+    """
+
+    def __init__(self, counter: TokenCounter = None, max_prompt_tokens: int = None,
+                 message_tokens: int = None, history_messages: int = 6):
+        self.counter = counter or get_token_counter()
+        self.max_prompt_tokens = max_prompt_tokens or getattr(settings, 'CHATBOT_MAX_PROMPT_TOKENS', 3000)
+        self.message_tokens = message_tokens or getattr(settings, 'CHATBOT_HISTORY_MESSAGE_TOKENS', 150)
+        self.history_messages = history_messages
+
+    def fit_history(self, history: List[Dict], reserved_tokens: int) -> List[Dict]:
+        """
+        Mensajes de chat (role/content) del historial que caben junto a reserved_tokens
+
+        Args:
+            history: historial del chatbot ({"type": "user"|"assistant", "content": ...})
+            reserved_tokens: tokens del resto del prompt (sistema, productos y mensaje actual)
+        """
+        recent = history[-self.history_messages:]
+        last_assistant = max((i for i, msg in enumerate(recent) if msg["type"] != "user"), default=None)
+
+        messages = []
+        for i, msg in enumerate(recent):
+            content = msg["content"]
+            if msg["type"] != "user" and i != last_assistant:
+                content = self.counter.truncate(content, self.message_tokens)
+            messages.append({"role": "user" if msg["type"] == "user" else "assistant", "content": content})
+
+        available = self.max_prompt_tokens - reserved_tokens
+        dropped = []
+        while messages and self.counter.count_messages(messages) > available:
+            # Se descarta el turno completo (pregunta y respuesta) más antiguo
+            message = messages.pop(0)
+            if message["role"] == "user":
+                dropped.append(message["content"])
+            if messages and messages[0]["role"] == "assistant":
+                messages.pop(0)
+
+        if dropped:
+            summary = {
+                "role": "system",
+                "content": self.counter.truncate("Antes el usuario preguntó por: " + "; ".join(dropped),
+                                                 self.message_tokens)
+            }
+            if self.counter.count_messages(messages + [summary]) <= available:
+                messages.insert(0, summary)
+
+        return messages
@@ -0,0 +1,140 @@
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+from .LRUCache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """
+    Caché de embeddings de consultas, indexada por la consulta ya limpia (_clean_query)
+
+    - L1 (memoria del proceso): LRU acotado con los vectores float32 del modelo.
+    - L2 (Redis, opcional): compartido entre workers; guarda los vectores como
+      bytes float16 (la mitad de tamaño, error despreciable para similitud coseno).
+
+    Las claves incluyen el nombre del modelo para no mezclar vectores de modelos distintos.
+    """
+
+    KEY_PREFIX = "chatbot:qemb"
+
+    def __init__(self, model_name: str, max_size: int = None, cache_alias: str = None, ttl: int = None):
+        self.model_name = model_name
+        self.cache_alias = cache_alias or getattr(settings, 'EMBEDDINGS_QUERY_CACHE_ALIAS', None)
+        self.ttl = ttl or getattr(settings, 'EMBEDDINGS_QUERY_CACHE_TTL', 86400)
+        self._l1 = LRUCache(max_size=max_size or getattr(settings, 'EMBEDDINGS_QUERY_CACHE_SIZE', 2048))
+
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    def _key(self, query: str) -> str:
+        digest = hashlib.blake2b(f"{self.model_name}\x00{query}".encode('utf-8'), digest_size=16).hexdigest()
+        return f"{self.KEY_PREFIX}:{digest}"
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _l2_get(self, key: str) -> Optional[np.ndarray]:
+        if not self.cache_alias:
+            return None
+        try:
+            blob = caches[self.cache_alias].get(key)
+        except Exception as e:
+            logger.warning(f"⚠️ Caché de embeddings en Redis no disponible: {e}")
+            return None
+        if blob is None:
+            return None
+        return np.frombuffer(blob, dtype='<f2').astype('float32').reshape(1, -1)
+
+    def _l2_set(self, key: str, vector: np.ndarray):
+        if not self.cache_alias:
+            return
+        try:
+            caches[self.cache_alias].set(key, vector.astype('<f2').tobytes(), timeout=self.ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar el embedding en Redis: {e}")
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        """Vector en L1 o L2 (contando aciertos y fallos), o None"""
+        vector = self._l1.get(key)
+        if vector is not None:
+            self._count('hits')
+            return vector
+
+        vector = self._l2_get(key)
+        if vector is not None:
+            self._count('hits')
+            self._count('l2_hits')
+            vector.setflags(write=False)
+            self._l1.set(key, vector)
+        else:
+            self._count('misses')
+        return vector
+
+    def _remember(self, key: str, vector: np.ndarray) -> np.ndarray:
+        vector = np.ascontiguousarray(vector, dtype='float32').reshape(1, -1)
+        self._l2_set(key, vector)
+        vector.setflags(write=False)
+        self._l1.set(key, vector)
+        return vector
+
+    def get_or_encode(self, query: str, encode: Callable[[str], np.ndarray]) -> np.ndarray:
+        """
+        Devuelve el embedding (1, d) de la consulta; solo llama a encode si no está en caché.
+
+        El arreglo devuelto es compartido y de solo lectura.
+        """
+        key = self._key(query)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._remember(key, encode(query))
+        return vector
+
+    def get_or_encode_many(self, queries: List[str],
+                           encode_many: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings (n, d) de varias consultas; las que no están en caché se codifican
+        juntas en una sola llamada a encode_many (un único forward del modelo)
+        """
+        keys = [self._key(query) for query in queries]
+        vectors = [self._lookup(key) for key in keys]
+
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(queries[i], []).append(i)
+
+        if missing:
+            encoded = encode_many(list(missing))
+            for row, positions in zip(encoded, missing.values()):
+                vector = self._remember(keys[positions[0]], row)
+                for i in positions:
+                    vectors[i] = vector
+
+        return np.vstack(vectors)
+
+    def clear(self):
+        """Vacía la caché local (las entradas de Redis expiran por TTL)"""
+        self._l1.clear()
+
+    def stats(self) -> Dict:
+        """Contadores de aciertos y fallos"""
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'l2_hits': self.l2_hits,
+                'misses': self.misses,
+                'size': len(self._l1),
+                'hit_rate': self.hits / total if total else 0.0,
+            }
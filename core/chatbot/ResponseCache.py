@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .LRUCache import LRUCache
+
+# Instancia compartida por proceso (ver get_response_cache)
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> "ResponseCache":
+    """Caché de respuestas compartida por todas las sesiones del proceso"""
+    global _shared_cache
+
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = ResponseCache()
+
+    return _shared_cache
+
+
+class ResponseCache:
+    """
+    Caché semántica de respuestas del LLM para preguntas repetidas
+
+    Una respuesta se reutiliza solo si:
+    - el índice FAISS es la misma versión con la que se generó,
+    - la búsqueda devolvió exactamente el mismo conjunto de productos, y
+    - la consulta más parecida ya respondida supera `similarity` (coseno entre
+      embeddings normalizados).
+
+    Las entradas se agrupan por (versión, productos) en un LRU con TTL; dentro de
+    cada grupo se guardan hasta `per_key` consultas con su vector. Cuando cambia la
+    versión del índice la caché se vacía entera.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None, similarity: float = None, per_key: int = 8):
+        self.ttl = ttl or getattr(settings, 'CHATBOT_RESPONSE_CACHE_TTL', 3600)
+        self.similarity = similarity or getattr(settings, 'CHATBOT_RESPONSE_CACHE_SIMILARITY', 0.95)
+        self.per_key = per_key
+        self._groups = LRUCache(max_size=max_size or getattr(settings, 'CHATBOT_RESPONSE_CACHE_SIZE', 512),
+                                ttl=self.ttl)
+        self._version = None
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _group_key(product_ids: Iterable[Hashable], index_version) -> Tuple:
+        return index_version, frozenset(product_ids)
+
+    def _check_version(self, index_version):
+        """Vacía la caché si el índice se reconstruyó desde la última consulta"""
+        with self._lock:
+            if index_version == self._version:
+                return
+            if self._version is not None:
+                self.invalidations += 1
+            self._version = index_version
+        self._groups.clear()
+
+    def get(self, query_vector: np.ndarray, product_ids: Iterable[Hashable], index_version) -> Optional[str]:
+        """Respuesta de la consulta más parecida con los mismos productos, o None"""
+        self._check_version(index_version)
+        vector = np.asarray(query_vector, dtype='float32').ravel()
+        now = time.monotonic()
+
+        best, best_score = None, self.similarity
+        for cached_vector, response, expires_at in self._groups.get(self._group_key(product_ids, index_version), ()):
+            if expires_at <= now:
+                continue
+            score = float(np.dot(cached_vector, vector))
+            if score >= best_score:
+                best, best_score = response, score
+
+        with self._lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best
+
+    def set(self, query_vector: np.ndarray, product_ids: Iterable[Hashable], index_version, response: str):
+        """Guarda la respuesta validada para la consulta y el conjunto de productos"""
+        self._check_version(index_version)
+        key = self._group_key(product_ids, index_version)
+        now = time.monotonic()
+
+        entries = [entry for entry in self._groups.get(key, ()) if entry[2] > now]
+        entries.append((np.asarray(query_vector, dtype='float32').ravel(), response, now + self.ttl))
+        self._groups.set(key, entries[-self.per_key:])
+
+    def clear(self):
+        self._groups.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'groups': len(self._groups),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'invalidations': self.invalidations,
+            }
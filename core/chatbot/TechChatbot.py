@@ -1,41 +1,86 @@
 import os
 import logging
-from typing import List, Dict
-from groq import Groq
-from .EmbeddingManager import EmbeddingManager
+from typing import AsyncIterator, List, Dict, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .EmbeddingManager import EmbeddingManager, get_embedding_manager
+from .IntentRouter import route
+from .LLMGateway import CircuitOpenError, LLMGateway, get_llm_gateway
+from .PromptBudget import PromptBudget
+from .ResponseCache import ResponseCache, get_response_cache
 
 logger = logging.getLogger(__name__)
 
 
+# Prompt de sistema fijo: no cambia entre peticiones para que el proveedor pueda
+# cachear el prefijo; lo que depende de la búsqueda va en un mensaje aparte
+SYSTEM_PROMPT = """Eres un asistente especializado en buscar productos tecnológicos en descuento. \
+Trabajas EXCLUSIVAMENTE con la información del contexto.
+
+REGLAS ABSOLUTAS:
+1. Menciona SOLO productos y tiendas del contexto, con el nombre TAL CUAL aparece, marca y modelo
+2. NUNCA inventes productos, precios, descuentos, especificaciones, tiendas ni enlaces
+3. SIEMPRE incluye el enlace (URL) del producto cuando esté disponible
+4. SIEMPRE termina ofreciendo ayuda adicional, de forma amable y proactiva
+
+ESTRUCTURA:
+1. 🎯 Saludo breve y confirmación de lo encontrado
+2. 📋 Hasta 5 productos: **Nombre Producto** - Marca | Precio: $X | Descuento: Y% | [Ver Producto](URL)
+3. ❓ Ayuda adicional: comparar modelos, más información, otras características, disponibilidad o envío
+
+EJEMPLO:
+"¡Claro que sí! 💻 En Alkosto encontré portátiles gamer que podrían interesarte:
+
+**Computador Portátil Gamer HP Victus 15.6\"** - HP | Precio: $5,399,000 | Descuento: 33% OFF | [Ver Producto](https://www.alkosto.com/producto)
+
+¿Te gustaría que te ayude a comparar modelos o que busque opciones con otro presupuesto? 🚀\""""
+
+
 class TechChatbot:
     """Chatbot especializado en buscar productos tecnológicos en descuento"""
 
-    def __init__(self, groq_api_key: str = None):
+    def __init__(self, groq_api_key: str = None, embedding_manager: EmbeddingManager = None,
+                 conversation_history: List[Dict] = None, response_cache: ResponseCache = None,
+                 llm: LLMGateway = None):
         self.groq_api_key = groq_api_key or os.getenv("GROQ_API_KEY")
-        self.embedding_manager = EmbeddingManager()
-        self.conversation_history = []
-
-        if not self.groq_api_key:
+        # El motor de búsqueda es compartido por todas las sesiones del proceso;
+        # lo único propio de cada instancia es el historial de conversación
+        self.embedding_manager = embedding_manager or get_embedding_manager()
+        self.conversation_history = conversation_history or []
+        self.prompt_budget = PromptBudget()
+        # Respuestas a preguntas repetidas, compartidas entre sesiones (None = desactivada)
+        if response_cache is None and getattr(settings, 'CHATBOT_RESPONSE_CACHE_ENABLED', True):
+            response_cache = get_response_cache()
+        self.response_cache = response_cache
+
+        # Gateway compartido por proceso: pool HTTP, deadlines, reintentos y circuito
+        if llm is None and not self.groq_api_key:
             logger.warning("⚠️ GROQ_API_KEY no encontrada. Usa environment variable o pásala al constructor.")
-            self.client = None
-        else:
-            self.client = Groq(api_key=self.groq_api_key)
+        elif llm is None:
+            llm = get_llm_gateway(self.groq_api_key)
+        self.llm = llm
 
     def generate_response(self, user_input: str, product_info: List[Dict] = None) -> str:
         """Genera respuesta usando Groq SDK con contexto de productos VALIDADOS"""
         try:
-            if not self.client:
+            if not self.llm:
                 return self._fallback_response(user_input, product_info)
 
             # ✅ VALIDACIÓN CRÍTICA: Si no hay productos relevantes, forzar respuesta de "no encontrado"
             if not self._has_relevant_products(user_input, product_info):
                 return self._no_products_response(user_input)
 
+            # Pregunta equivalente ya respondida con los mismos productos
+            cache_key = self._response_cache_key(user_input, product_info)
+            cached = self._cached_response(cache_key)
+            if cached is not None:
+                return cached
+
             # Construir el mensaje con contexto
             messages = self._build_messages(user_input, product_info)
 
-            chat_completion = self.client.chat.completions.create(
-                messages=messages,
+            chat_completion = self.llm.complete(
+                messages,
                 model="llama-3.3-70b-versatile",
                 temperature=0.5,
                 max_tokens=1200,
@@ -43,86 +88,87 @@ class TechChatbot:
             )
 
             response = chat_completion.choices[0].message.content
+            self._log_tokens(messages, response, getattr(chat_completion, 'usage', None))
 
             # ✅ VALIDACIÓN POST-RESPUESTA: Asegurar que solo menciona productos del contexto
-            return self._validate_response(response, product_info)
+            response = self._validate_response(response, product_info)
+            if cache_key is not None:
+                self.response_cache.set(*cache_key, response)
+            return response
+
+        except CircuitOpenError:
+            logger.warning("🔌 LLM no disponible (circuito abierto), respuesta de respaldo")
+            return self._fallback_response(user_input, product_info)
 
         except Exception as e:
             logger.error(f"❌ Error con Groq API: {e}")
             return self._fallback_response(user_input, product_info)
 
+    def _response_cache_key(self, user_input: str, product_info: List[Dict] = None):
+        """(embedding, IDs de productos, versión del índice) del turno, o None si no se puede cachear"""
+        # La respuesta también depende del historial: solo se cachean primeros turnos
+        if self.response_cache is None or self.conversation_history or not product_info:
+            return None
+        try:
+            vector = self.embedding_manager.encode_query(user_input)
+            index_version = self.embedding_manager.index_version
+        except Exception as e:
+            logger.warning(f"⚠️ Caché de respuestas no disponible: {e}")
+            return None
+        product_ids = [product.get('id') or product.get('product_url') for product in product_info]
+        return vector, product_ids, index_version
+
+    def _cached_response(self, cache_key) -> Optional[str]:
+        if cache_key is None:
+            return None
+        response = self.response_cache.get(*cache_key)
+        if response is not None:
+            logger.info("⚡ Respuesta reutilizada de la caché semántica (sin llamar al LLM)")
+        return response
+
     def _build_messages(self, user_input: str, product_info: List[Dict] = None) -> List[Dict]:
-        """Construye los mensajes para la API de Groq"""
+        """
+        Construye los mensajes para la API de Groq
 
+        Orden: prompt de sistema fijo (prefijo cacheable por el proveedor), historial
+        ajustado al presupuesto de tokens, contexto de esta búsqueda y mensaje actual.
+        """
         available_stores = self._get_available_stores(product_info)
         stores_text = ", ".join(
             [store.capitalize() for store in available_stores]) if available_stores else "las tiendas disponibles"
 
-        system_prompt = f"""Eres un asistente especializado en buscar productos tecnológicos en descuento. 
-        Trabajas EXCLUSIVAMENTE con la información proporcionada en el contexto.
-
-        REGLAS ABSOLUTAS (NO VIOLAR):
-        1. SOLO menciona productos que estén en el contexto proporcionado
-        2. SOLO menciona tiendas que estén en el contexto proporcionado  
-        3. NUNCA inventes productos, precios, descuentos, especificaciones o tiendas
-        4. Menciona los nombres de productos TAL CUAL aparecen en el contexto
-        5. Incluye siempre la marca y modelo específico del producto
-        6. **SIEMPRE incluye el enlace (URL) del producto cuando esté disponible**
-        7. Los enlaces y disponibilidad deben ser EXACTAMENTE los del contexto
-        8. **SIEMPRE ofrece ayuda adicional al final de tu respuesta**
-        9. Sé proactivo y amigable, como un buen asistente
-
-        INFORMACIÓN DISPONIBLE ACTUALMENTE:
-        - Tiendas: {stores_text}
-        - Productos encontrados: {len(product_info) if product_info else 0}
-
-        ESTRUCTURA OBLIGATORIA de tu respuesta:
-        1. 🎯 Saludo amable y confirmación de lo encontrado
-        2. 📋 Lista de productos (hasta 5) con formato:
-           **Nombre Producto** - Marca | Precio: $X | Descuento: Y% | [Ver Producto](URL)
-        3. ❓ OFRECER AYUDA adicional con preguntas específicas como:
-           - "¿Te gustaría que te ayude a comparar estos modelos?"
-           - "¿Necesitas más información sobre alguno en particular?"
-           - "¿Quieres que busque opciones con características específicas?"
-           - "¿Te interesa saber sobre disponibilidad o envío?"
-
-        EJEMPLO CORRECTO COMPLETO:
-        "¡Claro que sí! 💻 En Alkosto encontré varios portátiles gamer que podrían interesarte:
-
-        **Computador Portátil Gamer HP Victus 15.6"** - HP | Precio: $5,399,000 | Descuento: 33% OFF | [Ver Producto](https://www.alkosto.com/producto)
-        **Computador Portátil Gamer HP Victus 15"** - HP | Precio: $3,699,000 | Descuento: 32% OFF | [Ver Producto](https://www.alkosto.com/producto)
-
-        ¿Te gustaría que te ayude a comparar estos modelos o necesitas más información sobre especificaciones técnicas? También puedo buscarte opciones con diferentes presupuestos. ¡Estoy aquí para ayudarte! 🚀"
-
-        EJEMPLO INCORRECTO (sin ayuda final):
-        "En Alkosto: Producto A $X, Producto B $Y"
-        """
-
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-
-        # Agregar historial de conversación (últimos 3 mensajes)
-        for msg in self.conversation_history[-6:]:  # 3 interacciones
-            messages.append({
-                "role": "user" if msg["type"] == "user" else "assistant",
-                "content": msg["content"]
-            })
+        context = (f"INFORMACIÓN DISPONIBLE ACTUALMENTE:\n"
+                   f"- Tiendas: {stores_text}\n"
+                   f"- Productos encontrados: {len(product_info) if product_info else 0}")
 
         # Agregar contexto de productos si existe y es relevante
         if product_info and self._is_product_related_query(user_input):
             product_context = self._format_products_for_prompt(product_info)
-            messages.append({
-                "role": "system",
-                "content": f"PRODUCTOS ENCONTRADOS EN TIENDAS:\n{product_context}\n\n"
-                           f"IMPORTANTE: Menciona siempre la tienda de origen, destaca los descuentos, "
-                           f"y al final ofrece ayuda para elegir o comparar productos."
-            })
+            context += (f"\n\nPRODUCTOS ENCONTRADOS EN TIENDAS:\n{product_context}\n\n"
+                        f"IMPORTANTE: Menciona siempre la tienda de origen, destaca los descuentos, "
+                        f"y al final ofrece ayuda para elegir o comparar productos.")
+
+        system = {"role": "system", "content": SYSTEM_PROMPT}
+        tail = [
+            {"role": "system", "content": context},
+            {"role": "user", "content": user_input}
+        ]
 
-        # Agregar el mensaje actual del usuario
-        messages.append({"role": "user", "content": user_input})
+        # Historial recortado para que el prompt no crezca con cada turno
+        reserved = self.prompt_budget.counter.count_messages([system] + tail)
+        history = self.prompt_budget.fit_history(self.conversation_history, reserved)
 
-        return messages
+        return [system] + history + tail
+
+    def _log_tokens(self, messages: List[Dict], response: str, usage=None):
+        """Registra tokens de prompt y de respuesta (los de la API si vienen en la respuesta)"""
+        counter = self.prompt_budget.counter
+        if usage is not None:
+            logger.info(f"🧮 Tokens: prompt {usage.prompt_tokens} | respuesta {usage.completion_tokens} "
+                        f"(estimado local: {counter.count_messages(messages)})")
+        else:
+            logger.info(f"🧮 Tokens (estimados): prompt {counter.count_messages(messages)} | "
+                        f"respuesta {counter.count(response)}")
 
     def _format_products_for_prompt(self, products: List[Dict]) -> str:
         """Formatea productos para el prompt INCLUYENDO URLs"""
@@ -165,30 +211,11 @@ class TechChatbot:
     def _get_available_stores_info(self) -> str:
         """Obtiene información de las tiendas disponibles en la base de datos"""
         try:
-            # Intentar obtener productos del índice
-            if hasattr(self.embedding_manager, 'get_all_products_from_index'):
-                all_products = self.embedding_manager.get_all_products_from_index()
-            else:
-                # Fallback: usar los productos del historial de búsqueda reciente
-                all_products = []
-                for msg in self.conversation_history:
-                    if msg.get("products_found", 0) > 0:
-                        # Aquí necesitarías una manera de obtener los productos reales
-                        pass
-                return "Actualmente trabajo con varias tiendas de tecnología. ¿Te interesa buscar algún producto específico?"
-
-            if not all_products:
-                return "Actualmente no tengo información de productos en mi base de datos."
-
-            # Extraer tiendas únicas
-            stores = set()
-            for product in all_products:
-                store = product.get('source', '').strip().lower()
-                if store:
-                    stores.add(store)
+            # Leer solo la columna de tiendas del índice (sin construir todos los productos)
+            stores = self.embedding_manager.get_available_sources()
 
             if not stores:
-                return "Tengo productos de varias tiendas tecnológicas. ¿Qué producto estás buscando?"
+                return "Actualmente no tengo información de productos en mi base de datos."
 
             # Formatear respuesta
             store_list = [store.capitalize() for store in stores]
@@ -206,34 +233,7 @@ class TechChatbot:
 
     def _is_store_related_query(self, user_input: str) -> bool:
         """Determina si la consulta es sobre tiendas disponibles"""
-        input_lower = user_input.lower().strip()
-
-        store_keywords = [
-            'tiendas', 'tienda', 'store', 'stores', 'dónde', 'donde',
-            'qué tiendas', 'que tiendas', 'de qué tiendas', 'de que tiendas',
-            'en qué tiendas', 'en que tiendas', 'qué almacenes', 'que almacenes',
-            'dónde buscar', 'donde buscar', 'qué empresas', 'que empresas',
-            'qué marcas', 'que marcas', 'qué sitios', 'que sitios', 'dónde comprar', 'donde comprar'
-        ]
-
-        # Consultas específicas sobre tiendas
-        specific_store_queries = [
-            'de que tiendas', 'que tiendas', 'qué tiendas', 'tiendas tienes',
-            'tiendas tiene', 'tiendas hay', 'tiendas disponibles', 'tiendas trabajas',
-            'tiendas manejas', 'en qué almacenes', 'qué empresas'
-        ]
-
-        # Si contiene palabras clave específicas de tiendas
-        if any(keyword in input_lower for keyword in specific_store_queries):
-            return True
-
-        # Si es una consulta muy general que podría ser sobre tiendas
-        general_store_indicators = ['tienda', 'store', 'almacén', 'empresa']
-        if (any(word in input_lower for word in general_store_indicators) and
-                len(input_lower.split()) <= 4):  # Consultas cortas
-            return True
-
-        return False
+        return route(user_input).is_store
 
     def _validate_response(self, response: str, product_info: List[Dict] = None) -> str:
         """Valida que la respuesta solo mencione productos de la base de datos ACTUAL"""
@@ -348,83 +348,11 @@ class TechChatbot:
 
     def _is_product_related_query(self, user_input: str) -> bool:
         """Determina si la consulta está relacionada con productos de manera inteligente"""
-        input_lower = user_input.lower().strip()
-
-        # Palabras que indican claramente NO es búsqueda de productos (conversación normal)
-        conversation_phrases = [
-            'hola', 'hello', 'hi', 'buenos días', 'buenas tardes', 'buenas noches',
-            'qué tal', 'cómo estás', 'cómo te va', 'qué hay', 'qué onda',
-            'gracias', 'thanks', 'thank you', 'adiós', 'chao', 'bye',
-            'saludos', 'ok', 'vale', 'entendido', 'de nada', 'perdón', 'disculpa',
-            'cómo estás hoy', 'qué cuentas', 'cómo ha estado', 'qué me cuentas'
-        ]
-
-        # 1. Si es EXACTAMENTE una frase de conversación → NO buscar productos
-        if any(input_lower == phrase for phrase in conversation_phrases):
-            return False
-
-        # 2. Si contiene palabras de conversación general (aunque tenga otras palabras)
-        general_conversation_words = [
-            'cómo estás', 'qué tal', 'cómo te va', 'gracias', 'hola', 'buenos días',
-            'buenas tardes', 'buenas noches', 'adiós', 'chao', 'bye'
-        ]
-
-        # Si contiene palabras de conversación y es una frase corta
-        if (any(phrase in input_lower for phrase in general_conversation_words) and
-                len(input_lower.split()) <= 4):
-            return False
-
-        # 3. Si contiene palabras de intención de búsqueda → SÍ buscar
-        search_intent_words = [
-            'buscar', 'busco', 'encontrar', 'encuentra', 'quiero', 'necesito',
-            'recomienda', 'muestra', 'muéstrame', 'dime', 'ayuda', 'ayúdame',
-            'producto', 'productos', 'oferta', 'ofertas', 'descuento', 'comprar',
-            'laptop', 'celular', 'tablet', 'televisor', 'monitor', 'audífonos',
-            'precio', 'cuesta', 'valor', 'costó', 'disponible', 'tienes'
-        ]
-
-        if any(word in input_lower for word in search_intent_words):
-            return True
-
-        # 4. Si contiene nombres de categorías/marcas comunes → SÍ buscar
-        tech_keywords = [
-            'samsung', 'apple', 'iphone', 'lenovo', 'hp', 'dell', 'asus', 'acer',
-            'portátil', 'portatil', 'laptop', 'notebook', 'smartphone', 'celular',
-            'tablet', 'ipad', 'tv', 'televisor', 'monitor', 'proyector', 'consola',
-            'playstation', 'xbox', 'nintendo', 'audífonos', 'headphones', 'impresora'
-        ]
-
-        if any(keyword in input_lower for keyword in tech_keywords):
-            return True
-
-        # 5. Consultas muy cortas sin contexto → NO buscar
-        if len(input_lower.split()) <= 2 and not any(word in input_lower for word in tech_keywords):
-            return False
-
-        # 6. Default: buscar por si acaso
-        return True
+        return route(user_input).is_product
 
     def _calculate_dynamic_threshold(self, user_input: str) -> float:
         """Calcula threshold dinámico basado en la consulta"""
-        input_lower = user_input.lower()
-
-        # Consultas que mezclan saludo + búsqueda → threshold medio
-        mixed_phrases = [
-            'hola me podrías ayudar', 'buenos días quiero', 'hola busco',
-            'hola necesito', 'hola quiero', 'buenas tardes me recomiendas'
-        ]
-
-        if any(phrase in input_lower for phrase in mixed_phrases):
-            return 0.4  # Threshold medio para consultas mixtas
-
-        # Consultas técnicas específicas → threshold bajo
-        tech_specific = ['ram', 'procesador', 'almacenamiento', 'pantalla',
-                         'gb', 'tb', 'intel', 'amd', 'ryzen', 'core', 'nvidia']
-        if any(word in input_lower for word in tech_specific):
-            return 0.35
-
-        # Consultas generales de producto → threshold medio
-        return 0.45
+        return route(user_input).threshold
 
     def _fallback_response(self, user_input: str, product_info: List[Dict] = None) -> str:
         """Respuesta de fallback si la API falla"""
@@ -439,82 +367,187 @@ class TechChatbot:
         else:
             return "¡Hola! 👋 Soy tu buscador de ofertas tech. ¿Qué producto necesitas encontrar?"
 
+    def _plan_turn(self, user_input: str) -> Dict:
+        """
+        Decide cómo responder un mensaje (parte síncrona y sin LLM del flujo de chat)
+
+        Returns:
+            Dict con 'kind' ('store', 'conversational', 'no_products' o 'products'),
+            'products' y 'products_found'; en 'store' y 'no_products' incluye 'response'
+        """
+        # Una sola pasada (memoizada) decide tienda / conversación / búsqueda y el umbral
+        intent = route(user_input)
+        logger.info(f"🧭 Intención: {intent.kind} | umbral {intent.threshold} | "
+                    f"{intent.elapsed_us:.0f} µs")
+
+        # 1. ✅ PRIMERO: Verificar si es consulta sobre tiendas
+        if intent.is_store:
+            store_info = self._get_available_stores_info()
+            return {
+                "kind": "store",
+                "products": [],
+                "products_found": 0,
+                "response": f"🏪 {store_info} ¿Te interesa buscar algún producto en particular?"
+            }
+
+        # 2. Determinar si buscar productos
+        products = []
+        should_search = intent.is_product
+
+        if should_search:
+            products = self.embedding_manager.search_products(
+                user_input,
+                top_k=5,
+                threshold=0.3
+            )
+
+            # Filtrar por relevancia
+            products = [p for p in products if p.get('similarity_score', 0) >= 0.4]
+            logger.info(f"🔍 Productos después de filtrado: {len(products)}")
+
+            for i, product in enumerate(products):
+                logger.info(
+                    f"   {i + 1}. {product.get('name')} - Score: {product.get('similarity_score', 0):.3f} - Tienda: {product.get('source')}")
+
+        # 3. Tipo de respuesta apropiada
+        plan = {"products": products, "products_found": len(products) if should_search else 0}
+        if not should_search:
+            # Es conversación normal, usar Groq para respuesta natural
+            plan["kind"] = "conversational"
+        elif not self._has_relevant_products(user_input, products):
+            # Búsqueda sin resultados relevantes
+            plan["kind"] = "no_products"
+            plan["response"] = self._no_products_response(user_input)
+        else:
+            # Búsqueda con resultados, generar respuesta con productos
+            plan["kind"] = "products"
+        return plan
+
+    def _record_turn(self, user_input: str, response: str, products_found: int):
+        """Guarda el intercambio en el historial"""
+        self.conversation_history.append({
+            "type": "user",
+            "content": user_input,
+            "products_found": products_found
+        })
+        self.conversation_history.append({
+            "type": "assistant",
+            "content": response
+        })
+
+        # Limitar historial para no exceder contexto
+        self.conversation_history = self.conversation_history[-10:]
+
+        logger.info(f"🤖 Asistente: {response}")
+
     def chat(self, user_input: str) -> str:
         """Flujo completo de chat con embeddings + Groq"""
         try:
             logger.info(f"👤 Usuario: {user_input}")
 
-            # 1. ✅ PRIMERO: Verificar si es consulta sobre tiendas
-            if self._is_store_related_query(user_input):
-                store_info = self._get_available_stores_info()
-                response = f"🏪 {store_info} ¿Te interesa buscar algún producto en particular?"
-
-                # Guardar en historial
-                self.conversation_history.append({
-                    "type": "user",
-                    "content": user_input,
-                    "products_found": 0
-                })
-                self.conversation_history.append({
-                    "type": "assistant",
-                    "content": response
-                })
-
-                logger.info(f"🤖 Asistente: {response}")
-                return response
-
-            # 2. Determinar si buscar productos
-            products = []
-            should_search = self._is_product_related_query(user_input)
-
-            if should_search:
-                threshold = self._calculate_dynamic_threshold(user_input)
-                products = self.embedding_manager.search_products(
-                    user_input,
-                    top_k=5,
-                    threshold=0.3
-                )
-
-                # Filtrar por relevancia
-                products = [p for p in products if p.get('similarity_score', 0) >= 0.4]
-                logger.info(f"🔍 Productos después de filtrado: {len(products)}")
-
-                for i, product in enumerate(products):
-                    logger.info(
-                        f"   {i + 1}. {product.get('name')} - Score: {product.get('similarity_score', 0):.3f} - Tienda: {product.get('source')}")
-
-            # 3. Generar respuesta apropiada
-            if not should_search:
-                # Es conversación normal, usar Groq para respuesta natural
+            plan = self._plan_turn(user_input)
+
+            if plan["kind"] == "conversational":
                 response = self._generate_conversational_response(user_input)
-            elif not self._has_relevant_products(user_input, products):
-                # Búsqueda sin resultados relevantes
-                response = self._no_products_response(user_input)
+            elif plan["kind"] == "products":
+                response = self.generate_response(user_input, plan["products"])
             else:
-                # Búsqueda con resultados, generar respuesta con productos
-                response = self.generate_response(user_input, products)
+                response = plan["response"]
 
             # 4. Guardar en historial
-            self.conversation_history.append({
-                "type": "user",
-                "content": user_input,
-                "products_found": len(products) if should_search else 0
-            })
-            self.conversation_history.append({
-                "type": "assistant",
-                "content": response
-            })
-
-            # Limitar historial para no exceder contexto
-            self.conversation_history = self.conversation_history[-10:]
-
-            logger.info(f"🤖 Asistente: {response}")
+            self._record_turn(user_input, response, plan["products_found"])
             return response
 
         except Exception as e:
             logger.error(f"❌ Error en chat: {e}")
             return "¡Disculpa! Estoy teniendo problemas técnicos. ¿Podrías intentarlo de nuevo?"
 
+    async def chat_stream(self, user_input: str) -> AsyncIterator[Dict]:
+        """
+        Versión asíncrona de chat() que emite la respuesta a medida que se genera
+
+        La búsqueda de productos corre en un hilo aparte para no bloquear el event
+        loop, y la respuesta de Groq se emite token a token. Eventos emitidos:
+            {"type": "products", "products": [...]}  apenas termina la búsqueda
+            {"type": "token", "text": "..."}         fragmentos de la respuesta
+            {"type": "replace", "text": "..."}       la validación final reemplazó la respuesta
+            {"type": "done", "response": "..."}      respuesta final (ya guardada en el historial)
+        """
+        logger.info(f"👤 Usuario (stream): {user_input}")
+
+        try:
+            plan = await sync_to_async(self._plan_turn, thread_sensitive=False)(user_input)
+        except Exception as e:
+            logger.error(f"❌ Error en chat: {e}")
+            response = "¡Disculpa! Estoy teniendo problemas técnicos. ¿Podrías intentarlo de nuevo?"
+            yield {"type": "token", "text": response}
+            yield {"type": "done", "response": response}
+            return
+
+        products = plan["products"]
+        yield {"type": "products", "products": products if plan["kind"] == "products" else []}
+
+        cache_key, cached = None, None
+        if self.llm is not None and plan["kind"] == "products":
+            # encode_query puede correr el modelo (con su lock): fuera del event loop
+            cache_key = await sync_to_async(self._response_cache_key, thread_sensitive=False)(user_input, products)
+            cached = self._cached_response(cache_key)
+
+        if plan["kind"] in ("store", "no_products"):
+            response = plan["response"]
+            yield {"type": "token", "text": response}
+
+        elif cached is not None:
+            response = cached
+            yield {"type": "token", "text": response}
+
+        elif self.llm is None:
+            # Sin API key: mismas respuestas de respaldo que chat()
+            if plan["kind"] == "conversational":
+                response = self._generate_conversational_response(user_input)
+            else:
+                response = self._fallback_response(user_input, products)
+            yield {"type": "token", "text": response}
+
+        else:
+            if plan["kind"] == "conversational":
+                messages = self._conversational_messages(user_input)
+                options = {"temperature": 0.7, "max_tokens": 150}
+            else:
+                messages = self._build_messages(user_input, products)
+                options = {"temperature": 0.5, "max_tokens": 1200}
+
+            parts = []
+            try:
+                async for text in self.llm.stream(messages, model="llama-3.3-70b-versatile", top_p=0.9,
+                                                  **options):
+                    parts.append(text)
+                    yield {"type": "token", "text": text}
+                response = "".join(parts)
+                self._log_tokens(messages, response)
+
+            except Exception as e:
+                logger.error(f"❌ Error con Groq API (stream): {e}")
+                if plan["kind"] == "conversational":
+                    response = "¡Hola! 👋 ¿En qué puedo ayudarte hoy?"
+                else:
+                    response = self._fallback_response(user_input, products)
+                yield {"type": "replace" if parts else "token", "text": response}
+                parts = []
+
+            # ✅ VALIDACIÓN POST-RESPUESTA: los tokens ya se enviaron, así que si la
+            # respuesta no pasa la validación se pide al cliente reemplazarla
+            if parts and plan["kind"] == "products":
+                validated = self._validate_response(response, products)
+                if validated != response:
+                    response = validated
+                    yield {"type": "replace", "text": response}
+                if cache_key is not None:
+                    self.response_cache.set(*cache_key, response)
+
+        self._record_turn(user_input, response, plan["products_found"])
+        yield {"type": "done", "response": response}
+
     def clear_history(self):
         """Limpia el historial de conversación"""
         self.conversation_history = []
@@ -529,29 +562,35 @@ class TechChatbot:
                 self.conversation_history) >= 2 else 0
         }
 
+    def _conversational_messages(self, user_input: str) -> List[Dict]:
+        """Mensajes para conversación normal (no búsqueda de productos)"""
+        return [
+            {"role": "system", "content": """Eres un asistente amigable y conversacional especializado en productos tecnológicos. 
+            Responde de manera natural y cordial a saludos y conversación general.
+            Mantén tus respuestas breves y amigables.
+            Si es apropiado, pregunta si la persona necesita ayuda con productos tecnológicos."""},
+            {"role": "user", "content": user_input}
+        ]
+
     def _generate_conversational_response(self, user_input: str) -> str:
         """Genera respuestas para conversación normal (no búsqueda de productos)"""
         try:
-            if not self.client:
+            if not self.llm:
                 return "¡Hola! 👋 ¿En qué puedo ayudarte hoy?"
 
-            messages = [
-                {"role": "system", "content": """Eres un asistente amigable y conversacional especializado en productos tecnológicos. 
-                Responde de manera natural y cordial a saludos y conversación general.
-                Mantén tus respuestas breves y amigables.
-                Si es apropiado, pregunta si la persona necesita ayuda con productos tecnológicos."""},
-                {"role": "user", "content": user_input}
-            ]
+            messages = self._conversational_messages(user_input)
 
-            chat_completion = self.client.chat.completions.create(
-                messages=messages,
+            chat_completion = self.llm.complete(
+                messages,
                 model="llama-3.3-70b-versatile",
                 temperature=0.7,
                 max_tokens=150,
                 top_p=0.9
             )
 
-            return chat_completion.choices[0].message.content
+            response = chat_completion.choices[0].message.content
+            self._log_tokens(messages, response, getattr(chat_completion, 'usage', None))
+            return response
 
         except Exception as e:
             logger.error(f"Error en respuesta conversacional: {e}")
@@ -0,0 +1,105 @@
+import glob
+import io
+import os
+import time
+from contextlib import redirect_stdout
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.scrapping.alkosto.Scrapping import AlkostoScraper
+from core.scrapping.falabella.Scarpping import FalabellaScraper
+
+FIXTURES_DIR = os.path.join(settings.BASE_DIR, 'core', 'test', 'fixtures')
+
+SCRAPERS = {
+    'alkosto': AlkostoScraper,
+    'falabella': FalabellaScraper,
+}
+
+
+class Command(BaseCommand):
+    help = 'Compara el throughput (tarjetas/segundo) de los parsers de tarjetas bs4 y lxml con los fixtures grabados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--site',
+            choices=list(SCRAPERS),
+            nargs='+',
+            default=list(SCRAPERS),
+            help='Sitios a medir (default: todos)'
+        )
+        parser.add_argument(
+            '--cards',
+            type=int,
+            default=2000,
+            help='Tarjetas en el listado sintético, repitiendo las de los fixtures (default: 2000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Repeticiones por parser; se reporta la mejor (default: 3)'
+        )
+
+    def handle(self, *args, **options):
+        for site in options['site']:
+            page = self._build_listing(site, options['cards'])
+            if page is None:
+                self.stdout.write(f"⚠️ No hay fixtures para {site}")
+                continue
+
+            html, total_cards = page
+            self.stdout.write(f"\n📦 {site}: {total_cards} tarjetas ({len(html) / 1024:.0f} KB de HTML)")
+
+            outputs = {}
+            for parser in ('bs4', 'lxml'):
+                scraper = SCRAPERS[site](parser=parser)
+                best = None
+                for _ in range(options['repeat']):
+                    elapsed, products = self._run(scraper, html)
+                    best = elapsed if best is None else min(best, elapsed)
+                outputs[parser] = [self._as_dict(product) for product in products]
+                self.stdout.write(
+                    f"   {parser:<5} {total_cards / best:>10,.0f} tarjetas/s  ({best * 1000:.1f} ms, "
+                    f"{len(products)} productos con descuento)"
+                )
+
+            if outputs['bs4'] == outputs['lxml']:
+                self.stdout.write(self.style.SUCCESS("   ✅ Salida idéntica en ambos parsers"))
+            else:
+                self.stdout.write(self.style.ERROR("   ❌ Los parsers producen productos distintos"))
+
+    def _build_listing(self, site, cards):
+        """Listado sintético con las tarjetas de los fixtures repetidas hasta llegar a cards"""
+        fixture_cards = []
+        parser = SCRAPERS[site](parser='bs4').card_parser
+        for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, site, 'listing_page_*.html'))):
+            with open(path, encoding='utf-8') as f:
+                fixture_cards.extend(str(card) for card in parser.cards(f.read()))
+
+        if not fixture_cards:
+            return None
+
+        repeated = [fixture_cards[i % len(fixture_cards)] for i in range(cards)]
+        html = f"<html><body><ol>{''.join(repeated)}</ol></body></html>"
+        return html, len(repeated)
+
+    def _run(self, scraper, html):
+        """Parsea el listado completo y extrae los productos (sin los prints por producto)"""
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            products = [
+                product for product in (
+                    scraper.extract_product_data(item, 'https://benchmark.local/listado', 'benchmark')
+                    for item in scraper.card_parser.cards(html)
+                ) if product
+            ]
+        return time.perf_counter() - start, products
+
+    @staticmethod
+    def _as_dict(product):
+        # La fecha de scraping se genera al construir el producto: no se compara
+        if hasattr(product, 'dict'):
+            return product.dict(exclude={'scraping_date'})
+        return dict(vars(product))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from core.chatbot.EmbeddingManager import EmbeddingManager
+from core.chatbot.IndexFactory import INDEX_TYPES
 from datetime import datetime
 import logging
 
@@ -22,6 +23,71 @@ class Command(BaseCommand):
             action='store_true',
             help='Fuerza recrear embeddings aunque ya existan'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Procesos de codificación en paralelo; cada uno carga su copia del modelo (default: 1)'
+        )
+        parser.add_argument(
+            '--torch-threads',
+            type=int,
+            default=None,
+            help='Hilos de torch por worker (default: núcleos / workers)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Solo codifica productos nuevos o modificados y elimina los que ya no existen'
+        )
+        parser.add_argument(
+            '--index-type',
+            choices=INDEX_TYPES,
+            default='flat',
+            help='Tipo de índice: flat (exacto), hnsw o ivfpq (aproximados) (default: flat)'
+        )
+        parser.add_argument(
+            '--hnsw-m',
+            type=int,
+            default=32,
+            help='Vecinos por nodo del grafo HNSW (default: 32)'
+        )
+        parser.add_argument(
+            '--ef-construction',
+            type=int,
+            default=80,
+            help='Amplitud de búsqueda al construir el grafo HNSW (default: 80)'
+        )
+        parser.add_argument(
+            '--ef-search',
+            type=int,
+            default=None,
+            help='efSearch de HNSW al consultar (default: EMBEDDINGS_HNSW_EF_SEARCH)'
+        )
+        parser.add_argument(
+            '--nlist',
+            type=int,
+            default=None,
+            help='Listas invertidas de IVF-PQ (default: ~4 * raíz del número de productos)'
+        )
+        parser.add_argument(
+            '--pq-m',
+            type=int,
+            default=16,
+            help='Subcuantizadores de PQ, bytes por vector (default: 16)'
+        )
+        parser.add_argument(
+            '--nprobe',
+            type=int,
+            default=None,
+            help='nprobe de IVF-PQ al consultar (default: EMBEDDINGS_IVF_NPROBE)'
+        )
+        parser.add_argument(
+            '--train-size',
+            type=int,
+            default=None,
+            help='Vectores para entrenar IVF-PQ (default: automático)'
+        )
 
     def handle(self, *args, **options):
         start_time = datetime.now()
@@ -32,7 +98,12 @@ class Command(BaseCommand):
 
         try:
             # Inicializar EmbeddingManager
-            embedding_manager = EmbeddingManager()
+            embedding_manager = EmbeddingManager(ef_search=options['ef_search'], nprobe=options['nprobe'])
+
+            # Actualización incremental sobre el índice existente
+            if options['incremental']:
+                self._run_incremental(embedding_manager, options, start_time)
+                return
 
             # Verificar si ya existen embeddings
             if not options['force']:
@@ -53,7 +124,20 @@ class Command(BaseCommand):
             batch_size = options['batch_size']
             self.stdout.write(f'🔄 Procesando productos en lotes de {batch_size}...')
 
-            success = embedding_manager.create_embeddings_from_db(batch_size=batch_size)
+            if options['workers'] > 1:
+                self.stdout.write(f'⚙️  Codificando con {options["workers"]} workers en paralelo...')
+
+            success = embedding_manager.create_embeddings_from_db(
+                batch_size=batch_size,
+                workers=options['workers'],
+                torch_threads=options['torch_threads'],
+                index_type=options['index_type'],
+                hnsw_m=options['hnsw_m'],
+                ef_construction=options['ef_construction'],
+                nlist=options['nlist'],
+                pq_m=options['pq_m'],
+                train_size=options['train_size']
+            )
 
             if success:
                 # Mostrar estadísticas
@@ -70,6 +154,8 @@ class Command(BaseCommand):
                 self.stdout.write(
                     f'💰 Productos con descuento: {stats["products_with_discount"]} ({stats["discount_percentage"]})')
 
+                self._print_recall_report(embedding_manager.last_recall_report)
+
                 # Probar búsqueda de ejemplo
                 self.stdout.write(
                     self.style.SUCCESS('\n🔍 PRUEBA DE BÚSQUEDA:')
@@ -104,3 +190,38 @@ class Command(BaseCommand):
             self.style.SUCCESS('\n✅ SIGUIENTE PASO:')
         )
         self.stdout.write('Ejecute: python manage.py test_chatbot --interactive')
+
+    def _run_incremental(self, embedding_manager, options, start_time):
+        """Aplica solo los cambios de la base de datos sobre el índice actual"""
+        self.stdout.write(f'🔄 Actualización incremental en lotes de {options["batch_size"]}...')
+
+        summary = embedding_manager.update_embeddings_from_db(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            torch_threads=options['torch_threads']
+        )
+        if summary is None:
+            self.stdout.write(self.style.ERROR('❌ Error actualizando embeddings'))
+            return
+
+        execution_time = (datetime.now() - start_time).total_seconds() / 60
+        self.stdout.write(self.style.SUCCESS('\n🎉 EMBEDDINGS ACTUALIZADOS!'))
+        self.stdout.write(f'⏱️  Tiempo total: {execution_time:.2f} minutos')
+        self.stdout.write(f'🆕 Nuevos: {summary["added"]}')
+        self.stdout.write(f'✏️  Modificados: {summary["updated"]}')
+        self.stdout.write(f'🗑️  Eliminados: {summary["removed"]}')
+        self.stdout.write(f'✅ Sin cambios: {summary["unchanged"]}')
+
+    def _print_recall_report(self, report):
+        """Muestra el recall del índice frente a la búsqueda exacta"""
+        if not report:
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'\n🎯 RECALL@{report["k"]} FRENTE A BÚSQUEDA EXACTA ({report["index_type"]}):'))
+        for row in report['sweep']:
+            label = f'{row["param"]}={row["value"]}' if row['param'] else 'exacto'
+            self.stdout.write(f'  {label:<14} recall={row["recall"]:.3f}  latencia={row["latency_ms"]:.3f} ms/consulta')
+
+        configured = report['ef_search'] or report['nprobe']
+        if configured:
+            self.stdout.write(f'  Configurado: {configured} -> recall={report["recall"]:.3f}')
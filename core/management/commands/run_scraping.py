@@ -24,12 +24,82 @@ class Command(BaseCommand):
             default=None,
             help='Límite de categorías a scrapear'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Categorías a scrapear en paralelo, cada una con su navegador (default: 1)'
+        )
+        parser.add_argument(
+            '--per-host-limit',
+            type=int,
+            default=2,
+            help='Máximo de páginas abiertas a la vez contra el mismo sitio (default: 2)'
+        )
+        parser.add_argument(
+            '--host-delay',
+            type=float,
+            default=2.0,
+            help='Segundos mínimos entre cargas de página al mismo sitio (default: 2)'
+        )
+        parser.add_argument(
+            '--fetch-mode',
+            choices=['auto', 'http', 'selenium'],
+            default='auto',
+            help='auto: listado por HTTP (Algolia/HTML) y Selenium si falla; http; selenium (default: auto)'
+        )
+        parser.add_argument(
+            '--pipeline',
+            action='store_true',
+            help='Scraping, validación y escritura en etapas paralelas con cola acotada (implica --stream)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Productos por bulk_write en modo --stream/--pipeline (default: 200)'
+        )
+        parser.add_argument(
+            '--queue-size',
+            type=int,
+            default=1000,
+            help='Productos en vuelo entre etapas del pipeline antes de frenar a los scrapers (default: 1000)'
+        )
+        parser.add_argument(
+            '--flush-interval',
+            type=float,
+            default=2.0,
+            help='Segundos máximos que un lote espera antes de escribirse (default: 2)'
+        )
+        parser.add_argument(
+            '--parser',
+            choices=['lxml', 'bs4'],
+            default='lxml',
+            help='Backend para leer las tarjetas de producto (default: lxml)'
+        )
+        parser.add_argument(
+            '--stream',
+            action='store_true',
+            help='Extraer las tarjetas nuevas después de cada "Mostrar más" y guardar por lotes mientras se pagina'
+        )
 
     def handle(self, *args, **options):
         start_time = datetime.now()
 
-        # Crear crawler cone l parámetro clicks
-        crawler = AlkostoCrawler(clicks=options['clicks'])
+        # Crear crawler con el parámetro clicks y los workers en paralelo
+        crawler = AlkostoCrawler(
+            clicks=options['clicks'],
+            workers=options['workers'],
+            per_host_limit=options['per_host_limit'],
+            host_delay=options['host_delay'],
+            fetch_mode=options['fetch_mode'],
+            stream=options['stream'],
+            parser=options['parser'],
+            pipeline=options['pipeline'],
+            save_batch_size=options['batch_size'],
+            queue_size=options['queue_size'],
+            flush_interval=options['flush_interval']
+        )
         categories = options['categories']
         limit_categories = options['limit_categories']
 
@@ -42,23 +112,29 @@ class Command(BaseCommand):
         else:
             self.stdout.write(f"🔢 MODO: {options['clicks']} clicks por categoría")
 
-        if categories:
-            # Scrapear categorías específicas
-            results = crawler.crawl_specific_categories(categories)
-            total_products = sum(len(products) for products in results.values())
-        else:
-            # Scrapear todas las categorías o limitar
-            if limit_categories:
+        if options['workers'] > 1:
+            self.stdout.write(
+                f"⚙️  {options['workers']} workers en paralelo "
+                f"(máx. {options['per_host_limit']} páginas simultáneas por sitio)"
+            )
+
+        try:
+            if categories:
+                # Scrapear categorías específicas
+                results = crawler.crawl_specific_categories(categories)
+                total_products = sum(len(products) for products in results.values())
+            elif limit_categories:
                 # Limitar categorías
-                limited_urls = dict(list(crawler.category_urls.items())[:limit_categories])
-                total_products = 0
-                for category_name, url in limited_urls.items():
-                    products = crawler.crawl_category(category_name, url)
-                    total_products += len(products)
+                limited = list(crawler.category_urls)[:limit_categories]
+                results = crawler.crawl_specific_categories(limited)
+                total_products = sum(len(products) for products in results.values())
             else:
                 # Todas las categorías
                 all_products = crawler.crawl_all_categories()
                 total_products = len(all_products)
+        finally:
+            # Cerrar los navegadores del pool
+            crawler.close()
 
         # Estadísticas
         end_time = datetime.now()
@@ -74,4 +150,4 @@ class Command(BaseCommand):
         from core.mongo.MongoManager import MongoManager
         mongo = MongoManager()
         self.stdout.write(f'📊 Total en MongoDB: {mongo.get_product_count()} productos')
-        self.stdout.write(f'🏷️  Categorías: {", ".join(mongo.get_categories())}')
\ No newline at end of file
+        self.stdout.write(f'🏷️  Categorías: {", ".join(mongo.get_categories())}')
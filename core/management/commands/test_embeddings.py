@@ -68,6 +68,10 @@ class Command(BaseCommand):
         results = embedding_manager.search_products(query, top_k=top_k, threshold=threshold)
         search_time = time.time() - start_time
 
+        self._print_results(results, search_time)
+
+    def _print_results(self, results, search_time):
+        """Muestra los productos encontrados para una consulta"""
         if not results:
             self.stdout.write("   ❌ No se encontraron productos")
             return
@@ -175,11 +179,27 @@ class Command(BaseCommand):
 
         self.stdout.write("🧪 Ejecutando batería de pruebas...\n")
 
+        # Una búsqueda por lotes por cada umbral (un solo forward del modelo y una búsqueda FAISS)
+        by_threshold = {}
+        for query, threshold in test_cases:
+            by_threshold.setdefault(threshold, []).append(query)
+
+        results = {}
+        start_time = time.time()
+        for threshold, queries in by_threshold.items():
+            for query, products in zip(queries, embedding_manager.search_products_batch(queries, 3, threshold)):
+                results[query] = products
+        batch_time = time.time() - start_time
+
         for query, threshold in test_cases:
             self.stdout.write(f"🧪 TEST: '{query}'")
-            self._test_single_query(embedding_manager, query, threshold, 3)
+            self.stdout.write(f"\n🔍 Probando: '{query}' (threshold: {threshold})")
+            self._print_results(results[query], batch_time / len(test_cases))
             self.stdout.write("   " + "─" * 60)
 
+        self.stdout.write(f"\n⏱️  {len(test_cases)} consultas en {batch_time:.2f}s "
+                          f"({len(by_threshold)} búsquedas por lotes)")
+
         # Mostrar estadísticas finales
         stats = embedding_manager.get_stats()
         self._show_stats(stats)
@@ -202,4 +222,10 @@ class Command(BaseCommand):
             self.stdout.write("   💵 Distribución de precios:")
             for range_name, count in stats['price_ranges'].items():
                 percentage = (count / stats['total_products'] * 100) if stats['total_products'] > 0 else 0
-                self.stdout.write(f"      {range_name}: {count} productos ({percentage:.1f}%)")
\ No newline at end of file
+                self.stdout.write(f"      {range_name}: {count} productos ({percentage:.1f}%)")
+
+        cache_stats = stats.get('query_cache')
+        if cache_stats:
+            self.stdout.write(
+                f"   ⚡ Caché de consultas: {cache_stats['hits']} aciertos ({cache_stats['l2_hits']} de Redis), "
+                f"{cache_stats['misses']} fallos ({cache_stats['hit_rate']:.0%})")
\ No newline at end of file
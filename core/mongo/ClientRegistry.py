@@ -0,0 +1,108 @@
+# core/mongo/ClientRegistry.py
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+from django.conf import settings
+from pymongo import MongoClient
+
+logger = logging.getLogger(__name__)
+
+# Colección con las versiones de índices ya aplicadas en la base de datos
+SCHEMA_COLLECTION = '_schema'
+
+_clients: Dict = {}
+_indexed = set()
+_lock = threading.Lock()
+
+
+def client_options() -> Dict:
+    """Tamaño del pool y timeouts del MongoClient, desde settings"""
+    return {
+        'maxPoolSize': getattr(settings, 'MONGODB_MAX_POOL_SIZE', 50),
+        'minPoolSize': getattr(settings, 'MONGODB_MIN_POOL_SIZE', 0),
+        'maxIdleTimeMS': getattr(settings, 'MONGODB_MAX_IDLE_TIME_MS', 60000),
+        'serverSelectionTimeoutMS': getattr(settings, 'MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        'connectTimeoutMS': getattr(settings, 'MONGODB_CONNECT_TIMEOUT_MS', 5000),
+        'socketTimeoutMS': getattr(settings, 'MONGODB_SOCKET_TIMEOUT_MS', 5000),
+    }
+
+
+def get_client(connection_string: str = None, **options) -> MongoClient:
+    """
+    MongoClient compartido por proceso para connection_string (por defecto el de settings)
+
+    MongoClient es thread-safe y mantiene su propio pool de conexiones, así que
+    todos los MongoManager del proceso reutilizan el mismo. El ping se hace solo
+    al crear el cliente.
+    """
+    connection_string = connection_string or settings.MONGODB_CONNECTION_STRING
+    merged = {**client_options(), **options}
+    key = (connection_string, tuple(sorted(merged.items())))
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = MongoClient(connection_string, **merged)
+            # Verificar conexión
+            client.admin.command('ping')
+            logger.info(f"✅ Conexión exitosa a MongoDB (pool de {merged['maxPoolSize']} conexiones)")
+            _clients[key] = client
+        return client
+
+
+def ensure_indexes(collection, indexes: List[List]) -> bool:
+    """
+    Crea los índices de una colección una sola vez por despliegue
+
+    La versión (hash de la lista de índices) se guarda en la colección _schema;
+    si ya coincide no se hace ningún create_index. Dentro del proceso se
+    recuerda para no volver a consultarla. La versión solo se guarda si todos
+    los create_index funcionaron, así el siguiente arranque reintenta los que
+    fallaron. Devuelve True si se crearon todos los índices.
+    """
+    version = hashlib.blake2b(json.dumps(indexes, default=str).encode('utf-8'), digest_size=8).hexdigest()
+    marker_id = f"{collection.name}_indexes"
+    memo_key = (collection.database.name, marker_id, version)
+
+    if memo_key in _indexed:
+        return False
+
+    schema = collection.database[SCHEMA_COLLECTION]
+    marker = schema.find_one({'_id': marker_id})
+    if marker and marker.get('version') == version:
+        _indexed.add(memo_key)
+        return False
+
+    failed = 0
+    for index in indexes:
+        try:
+            collection.create_index(index)
+        except Exception as e:
+            failed += 1
+            logger.warning(f"⚠️ Error creando índice: {e}")
+
+    if failed:
+        logger.warning(f"⚠️ {failed} índices de {collection.name} sin crear, se reintentará en el próximo arranque")
+        return False
+
+    schema.replace_one(
+        {'_id': marker_id},
+        {'_id': marker_id, 'version': version, 'applied_at': datetime.now()},
+        upsert=True
+    )
+    _indexed.add(memo_key)
+    logger.info(f"🗂️ Índices de {collection.name} creados (versión {version})")
+    return True
+
+
+def close_all():
+    """Cierra todos los clientes del proceso (al apagar o en pruebas)"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _indexed.clear()
@@ -1,30 +1,66 @@
 # core/mongo/MongoManager.py
 import pymongo
-from pymongo import MongoClient, UpdateOne
+from django.conf import settings
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure
 from datetime import datetime, timedelta
+import hashlib
+import json
 import logging
-from typing import List, Optional
+import time
+from typing import Dict, Iterator, List, Optional
 from bson import ObjectId
 
 # Importar los schemas Pydantic
-from .Schemas import ProductBase, ProductResponse, ProductUpdate
+from .Schemas import LISTING_PROJECTION, ProductBase, ProductRecord, ProductResponse, ProductUpdate
+from .ClientRegistry import ensure_indexes, get_client
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Campos que no forman parte del contenido del producto (no afectan content_hash)
+TRACKING_FIELDS = frozenset({
+    '_id', 'content_hash', 'scraping_date', 'last_updated', 'last_changed', 'last_seen',
+})
+
+
+# Formatos de salida de las lecturas: ProductResponse validado, ProductRecord liviano o dict crudo
+READ_OUTPUTS = ('response', 'record', 'raw')
+
+# Códigos de error de escritura que vale la pena reintentar (réplica sin primario o red).
+# 11000 (clave duplicada) no está: sin índice único en product_url no es una carrera
+# transitoria y reintentarlo no cambia el resultado
+RETRYABLE_WRITE_CODES = frozenset({6, 7, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436})
+
 
 class MongoManager:
-    def __init__(self, connection_string: str = None, db_name: str = "alkosto_db"):
+    # Valores por defecto de las escrituras en lote
+    bulk_chunk_size = 500
+    bulk_retries = 3
+    bulk_retry_backoff = 0.5
+
+    def __init__(self, connection_string: str = None, db_name: str = None,
+                 bulk_chunk_size: int = None, bulk_retries: int = None):
         """
         Inicializa el manager de MongoDB
 
+        El MongoClient es compartido por todo el proceso (ver ClientRegistry), así
+        que crear varios MongoManager no abre conexiones nuevas.
+
         Args:
-            connection_string: String de conexión a MongoDB
-            db_name: Nombre de la base de datos
+            connection_string: String de conexión a MongoDB (default: settings.MONGODB_CONNECTION_STRING)
+            db_name: Nombre de la base de datos (default: settings.MONGODB_DB_NAME)
+            bulk_chunk_size: Operaciones por bulk_write (default: settings.MONGODB_BULK_CHUNK_SIZE)
+            bulk_retries: Reintentos de las operaciones con errores transitorios (default: settings.MONGODB_BULK_RETRIES)
         """
-        self.connection_string = connection_string or "mongodb://localhost:27017/"
-        self.db_name = db_name
+        self.connection_string = connection_string or settings.MONGODB_CONNECTION_STRING
+        self.db_name = db_name or settings.MONGODB_DB_NAME
+        self.bulk_chunk_size = max(1, bulk_chunk_size or getattr(settings, 'MONGODB_BULK_CHUNK_SIZE',
+                                                                 self.bulk_chunk_size))
+        if bulk_retries is None:
+            bulk_retries = getattr(settings, 'MONGODB_BULK_RETRIES', self.bulk_retries)
+        self.bulk_retries = max(0, bulk_retries)
         self.client = None
         self.db = None
         self.products_collection = None
@@ -32,23 +68,14 @@ class MongoManager:
         self.connect()
 
     def connect(self):
-        """Establece conexión con MongoDB"""
+        """Obtiene el cliente compartido del proceso y la colección de productos"""
         try:
-            self.client = MongoClient(
-                self.connection_string,
-                serverSelectionTimeoutMS=5000,
-                connectTimeoutMS=5000,
-                socketTimeoutMS=5000
-            )
-
-            # Verificar conexión
-            self.client.admin.command('ping')
-            logger.info("✅ Conexión exitosa a MongoDB")
+            self.client = get_client(self.connection_string)
 
             self.db = self.client[self.db_name]
             self.products_collection = self.db['products']
 
-            # Crear índices para optimizar búsquedas
+            # Crear índices para optimizar búsquedas (una vez por despliegue)
             self._create_indexes()
 
         except pymongo.errors.ServerSelectionTimeoutError:
@@ -67,87 +94,257 @@ class MongoManager:
             [("discount_percent", -1)],  # Índice por descuento (descendente)
             [("scraping_date", -1)],  # Índice por fecha de scraping
             [("product_url", 1)],  # Índice único para URLs
+            [("last_changed", -1)],  # Changed-set para re-embeber
         ]
 
-        for index in indexes:
-            try:
-                self.products_collection.create_index(index)
-            except Exception as e:
-                logger.warning(f"⚠️ Error creando índice: {e}")
+        ensure_indexes(self.products_collection, indexes)
 
     def save_products(self, products: List[ProductBase], category: str = None) -> int:
         """
         Guarda productos validados con Pydantic en MongoDB
 
+        Solo se reescriben los productos nuevos o cuyo contenido cambió (ver
+        upsert_documents); a los demás solo se les actualiza last_seen.
+
         Args:
             products: Lista de objetos ProductBase
             category: Categoría de los productos (opcional)
+
+        Returns:
+            Productos nuevos + modificados
         """
         if not products:
             logger.warning("⚠️ No hay productos para guardar")
             return 0
 
         try:
-            operations = []
+            documents = [self.prepare_document(product, category) for product in products]
+        except Exception as e:
+            logger.error(f"❌ Error guardando productos: {e}")
+            return 0
+
+        result = self.upsert_documents(documents)
+        return result['upserted'] + result['modified']
+
+    @staticmethod
+    def content_hash(document: Dict) -> str:
+        """Hash del contenido de un producto, sin los campos de seguimiento"""
+        content = {key: value for key, value in document.items() if key not in TRACKING_FIELDS}
+        payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
 
-            for product in products:
-                # Convertir el modelo Pydantic a dict
-                product_dict = product.dict()
-                product_dict['last_updated'] = datetime.now()
+    def prepare_document(self, product: ProductBase, category: str = None) -> Dict:
+        """Documento a guardar para un producto, con su content_hash"""
+        # Convertir el modelo Pydantic a dict
+        product_dict = product.dict() if hasattr(product, 'dict') else dict(product)
 
-                # Sobrescribir categoría si se proporciona
-                if category:
-                    product_dict['category'] = category
+        # Sobrescribir categoría si se proporciona
+        if category:
+            product_dict['category'] = category
 
-                # Crear operación de upsert
-                operation = UpdateOne(
-                    {'product_url': product_dict['product_url']},
-                    {'$set': product_dict},
-                    upsert=True
+        product_dict['content_hash'] = self.content_hash(product_dict)
+        return product_dict
+
+    def upsert_documents(self, documents: List[Dict]) -> Dict:
+        """
+        Upsert por product_url que solo toca los documentos cuyo content_hash cambió
+
+        Los hashes guardados se leen en un solo find; los productos nuevos o
+        modificados se reescriben completos (con last_updated y last_changed) y a
+        los que no cambiaron solo se les actualiza last_seen con un update_many.
+
+        Returns:
+            Dict con upserted, modified, unchanged, failed, changed_urls (para
+            re-embeber) y chunks (conteos de cada bulk_write)
+        """
+        result = {'upserted': 0, 'modified': 0, 'unchanged': 0, 'failed': 0, 'changed_urls': [], 'chunks': []}
+        if not documents:
+            return result
+
+        # Si un producto aparece dos veces en el lote, gana la última versión
+        by_url = {document['product_url']: document for document in documents}
+        now = datetime.now()
+
+        try:
+            stored_hashes = {
+                stored['product_url']: stored.get('content_hash')
+                for stored in self.products_collection.find(
+                    {'product_url': {'$in': list(by_url)}},
+                    {'_id': 0, 'product_url': 1, 'content_hash': 1}
                 )
-                operations.append(operation)
+            }
+
+            operations = []
+            changed_urls = []
+            unchanged_urls = []
+            for url, document in by_url.items():
+                if stored_hashes.get(url) == document['content_hash']:
+                    unchanged_urls.append(url)
+                    continue
+
+                document = dict(document, last_updated=now, last_changed=now, last_seen=now)
+                operations.append(UpdateOne({'product_url': url}, {'$set': document}, upsert=True))
+                changed_urls.append(url)
 
-            # Ejecutar operaciones en lote
             if operations:
-                result = self.products_collection.bulk_write(operations)
-                total = result.upserted_count + result.modified_count
-                logger.info(
-                    f"💾 Guardados: {result.upserted_count} nuevos, Actualizados: {result.modified_count} productos")
-                return total
+                write = self.bulk_write_chunked(operations)
+                failed = set(write['failed_indexes'])
+                result['upserted'] = write['upserted']
+                result['modified'] = write['modified']
+                result['failed'] = write['failed']
+                result['chunks'] = write['chunks']
+                result['changed_urls'] = [url for i, url in enumerate(changed_urls) if i not in failed]
+
+            if unchanged_urls:
+                self.products_collection.update_many(
+                    {'product_url': {'$in': unchanged_urls}},
+                    {'$set': {'last_seen': now}}
+                )
+                result['unchanged'] = len(unchanged_urls)
 
-            return 0
+            logger.info(
+                f"💾 Guardados: {result['upserted']} nuevos, Actualizados: {result['modified']} productos, "
+                f"Sin cambios: {result['unchanged']}, Fallidos: {result['failed']}")
+            return result
 
         except Exception as e:
             logger.error(f"❌ Error guardando productos: {e}")
-            return 0
+            result['changed_urls'] = []
+            return result
+
+    def bulk_write_chunked(self, operations: List) -> Dict:
+        """
+        bulk_write no ordenado en chunks de bulk_chunk_size operaciones
 
-    def get_product_by_url(self, product_url: str) -> Optional[ProductResponse]:
-        """Obtiene un producto por su URL (devuelve objeto ProductResponse)"""
+        Un documento inválido solo hace fallar su operación: el resto del chunk
+        se aplica igual. Las operaciones con errores transitorios (red, cambio de
+        primario, carrera entre upserts) se reintentan con backoff exponencial;
+        los upserts por product_url son idempotentes, así que reintentar es seguro.
+
+        Returns:
+            Dict con los totales (upserted, modified, failed), failed_indexes
+            (posiciones en operations) y chunks (conteos de cada chunk)
+        """
+        summary = {'upserted': 0, 'modified': 0, 'failed': 0, 'failed_indexes': [], 'chunks': []}
+
+        for start in range(0, len(operations), self.bulk_chunk_size):
+            chunk = operations[start:start + self.bulk_chunk_size]
+            counts, failed_indexes = self._write_chunk(chunk)
+
+            summary['upserted'] += counts['upserted']
+            summary['modified'] += counts['modified']
+            summary['failed'] += counts['failed']
+            summary['failed_indexes'].extend(start + index for index in failed_indexes)
+            summary['chunks'].append(counts)
+
+            if counts['failed']:
+                logger.warning(
+                    f"⚠️ Chunk {len(summary['chunks'])}: {counts['upserted']} nuevos, "
+                    f"{counts['modified']} actualizados, {counts['failed']} fallidos")
+
+        return summary
+
+    def _write_chunk(self, chunk: List):
+        """Escribe un chunk con ordered=False y reintenta solo las operaciones transitorias"""
+        counts = {'upserted': 0, 'modified': 0, 'failed': 0, 'retries': 0}
+        pending = list(range(len(chunk)))
+        failed = []
+
+        for attempt in range(self.bulk_retries + 1):
+            retry = []
+            try:
+                result = self.products_collection.bulk_write([chunk[i] for i in pending], ordered=False)
+                counts['upserted'] += result.upserted_count
+                counts['modified'] += result.modified_count
+
+            except BulkWriteError as e:
+                details = e.details or {}
+                counts['upserted'] += details.get('nUpserted', 0)
+                counts['modified'] += details.get('nModified', 0)
+                for error in details.get('writeErrors', []):
+                    index = pending[error['index']]
+                    if error.get('code') in RETRYABLE_WRITE_CODES:
+                        retry.append(index)
+                    else:
+                        logger.warning(f"⚠️ Operación descartada ({error.get('code')}): {error.get('errmsg')}")
+                        failed.append(index)
+
+            except ConnectionFailure as e:
+                logger.warning(f"⚠️ Error de conexión escribiendo el chunk: {e}")
+                retry = pending
+
+            except Exception as e:
+                logger.error(f"❌ Error guardando el chunk: {e}")
+                failed.extend(pending)
+
+            if not retry:
+                break
+            if attempt == self.bulk_retries:
+                failed.extend(retry)
+                break
+
+            counts['retries'] += 1
+            time.sleep(self.bulk_retry_backoff * (2 ** attempt))
+            pending = retry
+
+        counts['failed'] = len(failed)
+        return counts, sorted(failed)
+
+    def iter_changed_products(self, since: datetime, projection: Dict = None,
+                              batch_size: int = 500) -> Iterator[Dict]:
+        """Productos cuyo contenido cambió desde since (el changed-set a re-embeber)"""
+        return self.iter_products({'last_changed': {'$gte': since}}, projection, batch_size)
+
+    def _read(self, query: Dict, projection: Dict = None, sort=None, limit: int = 0,
+              output: str = 'response') -> List:
+        """
+        Ejecuta una lectura y convierte cada documento según output
+
+        - 'response': ProductResponse validado (documento completo por defecto)
+        - 'record': ProductRecord con slots, sin validar (LISTING_PROJECTION por defecto)
+        - 'raw': el dict de pymongo tal cual (LISTING_PROJECTION por defecto)
+        """
+        if output not in READ_OUTPUTS:
+            raise ValueError(f"Formato no soportado: {output}. Opciones: {', '.join(READ_OUTPUTS)}")
+        if projection is None and output != 'response':
+            projection = LISTING_PROJECTION
+
+        cursor = self.products_collection.find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        if output == 'response':
+            return [ProductResponse(**product) for product in cursor]
+        if output == 'record':
+            return [ProductRecord.from_document(product) for product in cursor]
+        return list(cursor)
+
+    def get_product_by_url(self, product_url: str, projection: Dict = None, output: str = 'response'):
+        """Obtiene un producto por su URL (ProductResponse por defecto, ver _read)"""
         try:
-            product_data = self.products_collection.find_one({'product_url': product_url})
-            if product_data:
-                return ProductResponse(**product_data)
-            return None
+            products = self._read({'product_url': product_url}, projection, limit=1, output=output)
+            return products[0] if products else None
         except Exception as e:
             logger.error(f"❌ Error obteniendo producto: {e}")
             return None
 
-    def get_products_by_category(self, category: str, limit: int = 100) -> List[ProductResponse]:
-        """Obtiene productos por categoría (devuelve lista de ProductResponse)"""
+    def get_products_by_category(self, category: str, limit: int = 100, projection: Dict = None,
+                                 output: str = 'response') -> List:
+        """Obtiene productos por categoría (lista de ProductResponse por defecto, ver _read)"""
         try:
-            products_data = list(self.products_collection.find(
-                {'category': category}
-            ).sort('scraping_date', -1).limit(limit))
-
-            return [ProductResponse(**product) for product in products_data]
+            return self._read({'category': category}, projection, sort=[('scraping_date', -1)],
+                              limit=limit, output=output)
         except Exception as e:
             logger.error(f"❌ Error obteniendo productos por categoría: {e}")
             return []
 
-    def get_products_with_discount(self, min_discount: float = 10, limit: int = 50) -> List[ProductResponse]:
+    def get_products_with_discount(self, min_discount: float = 10, limit: int = 50, projection: Dict = None,
+                                   output: str = 'response') -> List:
         """Obtiene productos con descuento mínimo"""
         try:
-            products_data = list(self.products_collection.find({
+            query = {
                 'discount_percent': {'$ne': "0%"},
                 'discount_price_num': {'$gt': 0},
                 'original_price_num': {'$gt': 0},
@@ -157,22 +354,21 @@ class MongoManager:
                         min_discount
                     ]
                 }
-            }).sort('discount_percent', -1).limit(limit))
-
-            return [ProductResponse(**product) for product in products_data]
+            }
+            return self._read(query, projection, sort=[('discount_percent', -1)], limit=limit, output=output)
         except Exception as e:
             logger.error(f"❌ Error obteniendo productos con descuento: {e}")
             return []
 
-    def search_products(self, search_term: str, limit: int = 50) -> List[ProductResponse]:
+    def search_products(self, search_term: str, limit: int = 50, projection: Dict = None,
+                        output: str = 'response') -> List:
         """Busca productos por texto"""
         try:
-            products_data = list(self.products_collection.find(
-                {'$text': {'$search': search_term}},
-                {'score': {'$meta': 'textScore'}}
-            ).sort([('score', {'$meta': 'textScore'})]).limit(limit))
-
-            return [ProductResponse(**product) for product in products_data]
+            if projection is None and output != 'response':
+                projection = LISTING_PROJECTION
+            projection = dict(projection or {}, score={'$meta': 'textScore'})
+            return self._read({'$text': {'$search': search_term}}, projection,
+                              sort=[('score', {'$meta': 'textScore'})], limit=limit, output=output)
         except Exception as e:
             logger.error(f"❌ Error buscando productos: {e}")
             return []
@@ -223,10 +419,13 @@ class MongoManager:
             return 0
 
     def close_connection(self):
-        """Cierra la conexión con MongoDB"""
+        """
+        Suelta el cliente compartido sin cerrarlo (otros MongoManager lo siguen usando);
+        para cerrar los pools del proceso usar ClientRegistry.close_all()
+        """
         if self.client:
-            self.client.close()
-            logger.info("🔌 Conexión a MongoDB cerrada")
+            self.client = None
+            logger.info("🔌 Conexión a MongoDB liberada")
 
     def __enter__(self):
         """Para usar con context manager"""
@@ -236,32 +435,52 @@ class MongoManager:
         """Cierra conexión al salir del context manager"""
         self.close_connection()
 
-    def get_all_products(self, limit=10000):
-        """Obtiene todos los productos de la base de datos"""
+    def get_all_products(self, limit=None):
+        """Obtiene todos los productos de la base de datos (para catálogos grandes usar iter_products)"""
         try:
-            return list(self.products_collection.find({}).limit(limit))
+            cursor = self.products_collection.find({})
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
         except Exception as e:
             logger.error(f"❌ Error obteniendo todos los productos: {e}")
             return []
 
-    def search_products_by_spec(self, spec_key, spec_value, limit=10):
-        """Busca productos por especificación específica"""
+    def search_products_by_spec(self, spec_key: str, spec_value: str, limit: int = 10, projection: Dict = None,
+                                output: str = 'response') -> List:
+        """Busca productos por especificación específica (lista de ProductResponse por defecto, ver _read)"""
         try:
             query = {f"specifications.{spec_key}": {"$regex": spec_value, "$options": "i"}}
-            products = list(self.products_collection.find(query).limit(limit))
-            return [ProductResponse(**p) for p in products]
+            return self._read(query, projection, limit=limit, output=output)
         except Exception as e:
             logger.error(f"❌ Error buscando por especificación: {e}")
             return []
 
-    def search_products_by_price_range(self, min_price, max_price, limit=10):
-        """Busca productos por rango de precio"""
+    def search_products_by_price_range(self, min_price: float, max_price: float, limit: int = 10,
+                                       projection: Dict = None, output: str = 'response') -> List:
+        """Busca productos por rango de precio (lista de ProductResponse por defecto, ver _read)"""
         try:
             query = {
                 "discount_price_num": {"$gte": min_price, "$lte": max_price}
             }
-            products = list(self.products_collection.find(query).limit(limit))
-            return [ProductResponse(**p) for p in products]
+            return self._read(query, projection, limit=limit, output=output)
         except Exception as e:
             logger.error(f"❌ Error buscando por precio: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def iter_products(self, query: Dict = None, projection: Dict = None,
+                      batch_size: int = 500) -> Iterator[Dict]:
+        """
+        Recorre los productos con un cursor, sin cargar el catálogo en memoria
+
+        Args:
+            query: Filtro de MongoDB (por defecto todos los productos)
+            projection: Campos a traer de cada documento
+            batch_size: Documentos por round-trip al servidor
+        """
+        cursor = self.products_collection.find(query or {}, projection).batch_size(batch_size)
+        try:
+            for product in cursor:
+                yield product
+        finally:
+            cursor.close()
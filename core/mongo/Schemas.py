@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Dict, Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 
@@ -54,4 +54,44 @@ class ProductUpdate(BaseModel):
     discount_price_num: Optional[float] = None
     availability: Optional[str] = None
     in_stock: Optional[bool] = None
-    last_updated: datetime = Field(default_factory=datetime.now)
\ No newline at end of file
+    last_updated: datetime = Field(default_factory=datetime.now)
+
+# Campos de los listados (sin specifications, el campo más pesado de decodificar)
+LISTING_FIELDS = (
+    'name', 'brand', 'category', 'product_url', 'image_url', 'discount_percent', 'rating',
+    'original_price_num', 'discount_price_num', 'in_stock', 'source',
+)
+LISTING_PROJECTION = {field: 1 for field in LISTING_FIELDS}
+
+
+class ProductRecord:
+    """
+    Registro liviano de solo lectura para listados, sin validación de Pydantic
+
+    Guarda solo los campos de LISTING_FIELDS (más id) en __slots__; los que no
+    vienen en la proyección quedan en None. Usar validate() cuando se necesite
+    el ProductResponse completo (requiere el documento sin proyección).
+    """
+
+    __slots__ = ('id',) + LISTING_FIELDS + ('_document',)
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> 'ProductRecord':
+        record = cls.__new__(cls)
+        record.id = str(document['_id']) if '_id' in document else None
+        for field in LISTING_FIELDS:
+            setattr(record, field, document.get(field))
+        record._document = document
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {field: getattr(self, field) for field in LISTING_FIELDS}
+        data['id'] = self.id
+        return data
+
+    def validate(self) -> ProductResponse:
+        """Valida el documento original como ProductResponse"""
+        return ProductResponse(**self._document)
+
+    def __repr__(self):
+        return f"ProductRecord(name={self.name!r}, discount_price_num={self.discount_price_num!r})"
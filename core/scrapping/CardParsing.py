@@ -0,0 +1,12 @@
+from lxml import etree
+
+
+def has_class(name: str) -> str:
+    """Predicado XPath equivalente a class_='name' de BeautifulSoup con una sola clase"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def first(xpath: etree.XPath, node):
+    """Primer nodo que encuentra xpath dentro de node, o None"""
+    found = xpath(node)
+    return found[0] if found else None
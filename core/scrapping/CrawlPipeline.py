@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+from typing import Dict
+
+# Marca de fin de flujo entre etapas
+_DONE = object()
+
+
+class StageStats:
+    """Items procesados, tiempo ocupado y tiempo bloqueado por backpressure de una etapa"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def add(self, items: int = 1, busy: float = 0.0, blocked: float = 0.0):
+        with self._lock:
+            if self.started is None:
+                self.started = time.monotonic()
+            self.items += items
+            self.busy += busy
+            self.blocked += blocked
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    def summary(self) -> Dict:
+        with self._lock:
+            end = self.finished or time.monotonic()
+            wall = end - self.started if self.started is not None else 0.0
+            return {
+                'items': self.items,
+                'wall': wall,
+                'busy': self.busy,
+                'blocked': self.blocked,
+                'per_second': self.items / wall if wall > 0 else 0.0,
+            }
+
+
+class CrawlPipeline:
+    """
+    Pipeline crawl → validación → escritura con colas acotadas
+
+    - crawl: los workers del crawler llaman submit() con cada ProductBase; si la
+      cola está llena, submit() bloquea (backpressure) y el scraper espera.
+    - validación: un hilo serializa cada producto y calcula su content_hash.
+    - escritura: un hilo junta las operaciones y hace bulk_write cuando el lote
+      llega a batch_size o cuando pasan flush_interval segundos desde el primer
+      item del lote.
+
+    La memoria queda acotada por queue_size productos en vuelo más un lote.
+    """
+
+    def __init__(self, mongo_manager, queue_size: int = 1000, batch_size: int = 200,
+                 flush_interval: float = 2.0):
+        self.mongo_manager = mongo_manager
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+        self._products = queue.Queue(maxsize=max(1, queue_size))
+        self._documents = queue.Queue(maxsize=max(1, queue_size))
+        self._threads = []
+
+        self.stats = {name: StageStats(name) for name in ('crawl', 'validate', 'write')}
+        self.saved = 0
+        self.unchanged = 0
+        # product_url de los productos nuevos o modificados (para re-embeber)
+        self.changed_urls = []
+        # Cada contador lo actualiza un solo hilo: invalid la validación y write_failed la escritura
+        self.invalid = 0
+        self.write_failed = 0
+        self.batches = 0
+
+    @property
+    def failed(self) -> int:
+        """Productos descartados por inválidos más los que fallaron al escribirse"""
+        return self.invalid + self.write_failed
+
+    def start(self) -> 'CrawlPipeline':
+        self._threads = [
+            threading.Thread(target=self._validate_loop, name="pipeline-validate", daemon=True),
+            threading.Thread(target=self._write_loop, name="pipeline-write", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def submit(self, product, category: str = None):
+        """Encola un producto; bloquea mientras la cola esté llena"""
+        start = time.monotonic()
+        self._products.put((product, category))
+        self.stats['crawl'].add(blocked=time.monotonic() - start)
+
+    def close(self):
+        """Espera a que se validen y escriban todos los productos encolados"""
+        self._products.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+        self.stats['crawl'].finish()
+
+    def _validate_loop(self):
+        stats = self.stats['validate']
+        while True:
+            item = self._products.get()
+            if item is _DONE:
+                break
+
+            product, category = item
+            start = time.monotonic()
+            try:
+                document = self.mongo_manager.prepare_document(product, category)
+            except Exception as e:
+                print(f"⚠️ Producto inválido descartado: {e}")
+                self.invalid += 1
+                continue
+            busy = time.monotonic() - start
+
+            self._documents.put(document)
+            stats.add(busy=busy, blocked=time.monotonic() - start - busy)
+
+        stats.finish()
+        self._documents.put(_DONE)
+
+    def _write_loop(self):
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._documents.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _DONE:
+                break
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+        if batch:
+            self._flush(batch)
+        self.stats['write'].finish()
+
+    def _flush(self, batch):
+        start = time.monotonic()
+        result = self.mongo_manager.upsert_documents(batch)
+        self.stats['write'].add(items=len(batch), busy=time.monotonic() - start)
+        self.batches += 1
+        self.saved += result['upserted'] + result['modified']
+        self.unchanged += result['unchanged']
+        self.write_failed += result['failed']
+        self.changed_urls.extend(result['changed_urls'])
+
+    def report(self):
+        print("📈 Throughput del pipeline:")
+        for name, stage in self.stats.items():
+            stats = stage.summary()
+            print(f"   {name:<9} {stats['items']:>6} items | {stats['per_second']:>8.1f} items/s | "
+                  f"ocupado {stats['busy']:.1f}s | bloqueado por cola llena {stats['blocked']:.1f}s")
+        print(f"   💾 {self.saved} productos nuevos o actualizados y {self.unchanged} sin cambios "
+              f"en {self.batches} lotes, {self.invalid} descartados por inválidos y "
+              f"{self.write_failed} fallidos al escribir")
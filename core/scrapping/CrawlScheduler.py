@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import urlparse
+
+
+class HostThrottle:
+    """
+    Límites de cortesía por host
+
+    - max_concurrent: páginas abiertas a la vez contra el mismo host
+    - min_interval: segundos mínimos entre dos cargas que empiezan en el mismo host
+    """
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 2.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_interval = min_interval
+        self._semaphores = {}
+        self._next_start = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.Semaphore(self.max_concurrent)
+            return self._semaphores[host]
+
+    def _wait_turn(self, host: str):
+        """Reserva el siguiente turno del host y espera hasta que llegue"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.min_interval
+        delay = start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def run(self, url: str, fn: Callable, *args, **kwargs):
+        """Ejecuta fn respetando los límites del host de url"""
+        host = urlparse(url).netloc
+        with self._semaphore(host):
+            self._wait_turn(host)
+            return fn(*args, **kwargs)
+
+
+class CrawlScheduler:
+    """Ejecuta tareas de crawling en paralelo con límites de cortesía por host"""
+
+    def __init__(self, workers: int = 1, per_host_limit: int = 2, host_delay: float = 2.0):
+        self.workers = max(1, workers)
+        self.throttle = HostThrottle(max_concurrent=per_host_limit, min_interval=host_delay)
+
+    def run(self, tasks: List[Tuple[str, str, Callable]]) -> Dict[str, Any]:
+        """
+        Ejecuta tareas (nombre, url, función sin argumentos)
+
+        Returns:
+            Dict nombre -> resultado, en el mismo orden de las tareas. Una tarea que
+            falla se reporta y su resultado queda en None.
+        """
+        results = {name: None for name, _, _ in tasks}
+
+        def execute(name, url, fn):
+            try:
+                return self.throttle.run(url, fn)
+            except Exception as e:
+                print(f"❌ Error en {name}: {e}")
+                return None
+
+        if self.workers == 1:
+            for name, url, fn in tasks:
+                results[name] = execute(name, url, fn)
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawler") as executor:
+            futures = {name: executor.submit(execute, name, url, fn) for name, url, fn in tasks}
+            for name, future in futures.items():
+                results[name] = future.result()
+
+        return results
@@ -0,0 +1,94 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+
+
+class DriverPool:
+    """
+    Pool acotado de navegadores Chrome reutilizables
+
+    Los drivers se crean bajo demanda (hasta size) y se devuelven al pool al
+    terminar cada categoría, así que el costo de arrancar Chrome se paga una vez
+    por worker y no una vez por categoría. Un driver que falla se descarta y se
+    reemplaza por uno nuevo; cada driver se recicla tras max_uses usos para
+    evitar la acumulación de memoria del navegador.
+    """
+
+    def __init__(self, options, size: int = 2, max_uses: int = 50):
+        self.options = options
+        self.size = max(1, size)
+        self.max_uses = max_uses
+
+        self._idle = queue.LifoQueue()  # El driver usado más recientemente está más "caliente"
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create_driver(self):
+        print("🧭 Iniciando navegador Chrome para el pool...")
+        return webdriver.Chrome(options=self.options)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def acquire(self):
+        """Presta un driver; bloquea si los size drivers están ocupados"""
+        if self._closed:
+            raise RuntimeError("El pool de drivers está cerrado")
+
+        self._slots.acquire()
+        driver = None
+        healthy = False
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._create_driver()
+
+            with self._lock:
+                self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+
+            yield driver
+            healthy = True
+        finally:
+            if driver is not None:
+                if healthy and not self._closed and self._uses.get(id(driver), 0) < self.max_uses:
+                    try:
+                        # Dejar el navegador limpio para la siguiente categoría
+                        driver.delete_all_cookies()
+                        self._idle.put(driver)
+                    except Exception:
+                        self._discard(driver)
+                else:
+                    self._discard(driver)
+            self._slots.release()
+
+    def invalidate(self, driver):
+        """Marca un driver prestado para descartarlo al devolverlo (p. ej. tras un error)"""
+        with self._lock:
+            self._uses[id(driver)] = self.max_uses
+
+    def close(self):
+        """Cierra todos los navegadores inactivos (los prestados se cierran al devolverse)"""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
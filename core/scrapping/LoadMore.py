@@ -0,0 +1,268 @@
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from selenium.webdriver.common.by import By
+
+# Conteo de tarjetas, de peticiones de red terminadas y de peticiones en curso en un solo
+# viaje al navegador. Resource Timing solo registra una petición cuando termina, así que
+# las que siguen en vuelo se cuentan aparte con el contador que instala CLICK_SCRIPT
+COUNT_SCRIPT = """
+return [document.querySelectorAll(arguments[0]).length,
+        performance.getEntriesByType('resource').length,
+        window.__loadMorePending || 0];
+"""
+
+# outerHTML de las tarjetas [inicio, fin) para extraer solo las recién agregadas
+SLICE_SCRIPT = """
+return Array.from(document.querySelectorAll(arguments[0]))
+    .slice(arguments[1], arguments[2])
+    .map(function (el) { return el.outerHTML; });
+"""
+
+# Instala (una vez por página) el contador de fetch/XHR en curso, limpia el buffer de
+# Resource Timing (250 entradas por defecto) y hace click
+CLICK_SCRIPT = """
+if (window.__loadMorePending === undefined) {
+    window.__loadMorePending = 0;
+    var done = function () { window.__loadMorePending = Math.max(0, window.__loadMorePending - 1); };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            window.__loadMorePending++;
+            try {
+                var request = originalFetch.apply(this, arguments);
+            } catch (e) {
+                done();
+                throw e;
+            }
+            request.then(done, done);
+            return request;
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__loadMorePending++;
+        this.addEventListener('loadend', done);
+        return originalSend.apply(this, arguments);
+    };
+}
+performance.clearResourceTimings();
+arguments[0].click();
+"""
+
+
+class LoadMoreStats:
+    """
+    Latencias de los clicks en "Mostrar más" y timeout adaptativo
+
+    El timeout de cada espera se aprende de las últimas cargas (p95 de la
+    ventana reciente por un margen), acotado entre min_timeout y max_timeout.
+    Se comparte entre workers, así que es thread-safe.
+    """
+
+    def __init__(self, window: int = 30, min_timeout: float = 2.0, max_timeout: float = 15.0,
+                 factor: float = 2.0):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.factor = factor
+        self._recent = deque(maxlen=window)
+        self._all = []
+        self.timeouts = 0
+        self.idle_stops = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._recent.append(latency)
+            self._all.append(latency)
+
+    def record_timeout(self, network_idle: bool = False):
+        """Click que no trajo productos nuevos (fin del listado o carga lenta)"""
+        with self._lock:
+            if network_idle:
+                self.idle_stops += 1
+            else:
+                self.timeouts += 1
+
+    def timeout(self) -> float:
+        """Tiempo máximo a esperar por la siguiente carga"""
+        with self._lock:
+            recent = list(self._recent)
+        if len(recent) < 3:
+            return self.max_timeout
+        p95 = sorted(recent)[int(0.95 * (len(recent) - 1))]
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.factor))
+
+    def expected(self) -> float:
+        """
+        Latencia típica reciente (mediana); antes de eso la red en reposo no cuenta
+
+        Sin historial (primer click de un crawl) se usa min_timeout, para no cortar
+        la primera carga lenta por falta de referencia.
+        """
+        with self._lock:
+            recent = list(self._recent)
+        return statistics.median(recent) if recent else self.min_timeout
+
+    def summary(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._all)
+            timeouts, idle_stops = self.timeouts, self.idle_stops
+        if not latencies:
+            return {'clicks': 0, 'timeouts': timeouts, 'idle_stops': idle_stops}
+        return {
+            'clicks': len(latencies),
+            'mean': statistics.fmean(latencies),
+            'p50': latencies[len(latencies) // 2],
+            'p95': latencies[int(0.95 * (len(latencies) - 1))],
+            'max': latencies[-1],
+            'total': sum(latencies),
+            'timeouts': timeouts,
+            'idle_stops': idle_stops,
+        }
+
+    def report(self, label: str = "Mostrar más"):
+        stats = self.summary()
+        if not stats['clicks']:
+            return
+        print(f"⏱️  Latencia de '{label}': {stats['clicks']} clicks | "
+              f"media {stats['mean']:.2f}s | p50 {stats['p50']:.2f}s | p95 {stats['p95']:.2f}s | "
+              f"máx {stats['max']:.2f}s | esperando {stats['total']:.1f}s en total | "
+              f"{stats['timeouts']} timeouts, {stats['idle_stops']} cortes por red en reposo")
+
+
+class LoadMorePaginator:
+    """
+    Hace click en "Mostrar más" y espera a que cambie el DOM en lugar de dormir
+
+    Después de cada click se consulta el número de tarjetas cada poll segundos y
+    la espera termina en cuanto aumenta. Si no aumenta, se corta cuando la red
+    lleva idle_window segundos en reposo (sin fetch/XHR en curso ni peticiones
+    nuevas terminadas, y ya pasó la latencia típica) o al llegar al timeout
+    adaptativo de LoadMoreStats. Si el botón no está, el
+    listado terminó: solo se le da button_grace segundos para aparecer.
+    """
+
+    def __init__(self, item_selector: str, button_selector: str, stats: LoadMoreStats = None,
+                 poll: float = 0.1, idle_window: float = 0.75, button_grace: float = 1.0):
+        self.item_selector = item_selector
+        self.button_selector = button_selector
+        self.stats = stats or LoadMoreStats()
+        self.poll = poll
+        self.idle_window = idle_window
+        self.button_grace = button_grace
+
+    def _snapshot(self, driver):
+        items, resources, pending = driver.execute_script(COUNT_SCRIPT, self.item_selector)
+        return int(items), int(resources), int(pending)
+
+    def count_items(self, driver) -> int:
+        return self._snapshot(driver)[0]
+
+    def _find_button(self, driver):
+        deadline = time.monotonic() + self.button_grace
+        while True:
+            for button in driver.find_elements(By.CSS_SELECTOR, self.button_selector):
+                try:
+                    if button.is_displayed() and button.is_enabled():
+                        return button
+                except Exception:
+                    # El botón se re-renderizó entre la búsqueda y la consulta
+                    continue
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll)
+
+    def item_html(self, driver, start: int, end: int) -> List[str]:
+        """outerHTML de las tarjetas en el rango [start, end)"""
+        return driver.execute_script(SLICE_SCRIPT, self.item_selector, start, end) or []
+
+    def wait_for_more(self, driver, previous_count: int, started: float = None) -> Optional[int]:
+        """
+        Espera hasta que haya más de previous_count tarjetas; None si no llegan
+
+        started es el instante del click (por defecto ahora), para medir la
+        latencia aunque entre el click y la espera se haya hecho otro trabajo.
+        """
+        start = started or time.monotonic()
+        timeout = self.stats.timeout()
+        expected = self.stats.expected()
+        last_resources = -1
+        last_activity = time.monotonic()
+
+        while True:
+            count, resources, pending = self._snapshot(driver)
+            now = time.monotonic()
+            if count > previous_count:
+                self.stats.record(now - start)
+                return count
+
+            if pending or resources != last_resources:
+                last_resources = resources
+                last_activity = now
+            elif now - last_activity >= self.idle_window and now - start >= expected:
+                self.stats.record_timeout(network_idle=True)
+                return None
+
+            if now - start >= timeout:
+                self.stats.record_timeout()
+                return None
+            time.sleep(self.poll)
+
+    def _click(self, driver) -> bool:
+        button = self._find_button(driver)
+        if button is None:
+            return False
+        try:
+            driver.execute_script(CLICK_SCRIPT, button)
+        except Exception as e:
+            print(f"⚠️ No se pudo hacer click en 'Mostrar más': {e}")
+            return False
+        return True
+
+    def iter_ranges(self, driver, clicks: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """
+        Pagina y entrega el rango [inicio, fin) de las tarjetas nuevas de cada carga
+
+        El click de la siguiente carga se hace antes de entregar el rango
+        anterior, así el consumidor procesa una tanda mientras el navegador
+        descarga la siguiente.
+        """
+        click_count = 0
+        count = self.count_items(driver)
+        pending = (0, count)
+
+        while True:
+            clicked_at = None
+            if (clicks is None or click_count < clicks) and self._click(driver):
+                clicked_at = time.monotonic()
+                click_count += 1
+                print(f"📋 Click #{click_count} en 'Mostrar más'")
+
+            if pending[1] > pending[0]:
+                yield pending
+
+            if clicked_at is None:
+                break
+            new_count = self.wait_for_more(driver, count, started=clicked_at)
+            if new_count is None:
+                break
+            pending = (count, new_count)
+            count = new_count
+
+        print(f"✅ Fin de los productos ({click_count} clicks realizados, {count} tarjetas)")
+
+    def iter_batches(self, driver, clicks: Optional[int] = None) -> Iterator[List[str]]:
+        """Como iter_ranges, pero entrega el outerHTML de cada tanda de tarjetas nuevas"""
+        for start, end in self.iter_ranges(driver, clicks):
+            yield self.item_html(driver, start, end)
+
+    def run(self, driver, clicks: Optional[int] = None) -> int:
+        """Hace hasta clicks clicks (None = hasta el final) y devuelve el total de tarjetas"""
+        count = 0
+        for _, end in self.iter_ranges(driver, clicks):
+            count = end
+        return count
@@ -0,0 +1,135 @@
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+from core.scrapping.CardParsing import first, has_class
+
+# Clase exacta de cada tarjeta del listado
+CARD_CLASS = 'ais-InfiniteHits-item product__item js-product-item js-algolia-product-click'
+
+
+class SoupCardParser:
+    """Extrae los campos crudos de cada tarjeta con BeautifulSoup (html.parser)"""
+
+    name = 'bs4'
+
+    def cards(self, html: str) -> List:
+        soup = BeautifulSoup(html, 'html.parser')
+        return soup.find_all('li', class_=CARD_CLASS)
+
+    def fields(self, item) -> Optional[Dict]:
+        name_tag = item.find('h3', class_=['product__item__top__title', 'js-algolia-product-click',
+                                           'js-algolia-product-title'])
+        if not name_tag:
+            return None
+
+        link_tag = item.find('a', class_='product__item__top__link')
+        brand_tag = item.find('div', class_='product__item__information__brand')
+        discount_percent_tag = item.find('span', class_='label-offer')
+        stars_tag = item.find('span', class_='averageNumber')
+        old_price_tag = item.find('p', class_='product__price--discounts__old')
+        discount_price_tag = item.find('span', class_='price')
+
+        img_c_div = item.find('div', class_='product__item__information__image js-algolia-product-click')
+        image_tag = img_c_div.find('img') if img_c_div else None
+
+        specifications = {}
+        specs_container = item.find('ul', class_='product__item__information__key-features--list js-key-list')
+        if specs_container:
+            for spec in specs_container.find_all('li', class_='item'):
+                key_elem = spec.find('div', class_='item--key')
+                value_elem = spec.find('div', class_='item--value')
+                if key_elem and value_elem:
+                    specifications[key_elem.get_text(strip=True)] = value_elem.get_text(strip=True)
+
+        return {
+            'name': name_tag.get_text(strip=True),
+            'href': link_tag.get('href') if link_tag else None,
+            'brand': brand_tag.get_text(strip=True) if brand_tag else None,
+            'discount_percent': discount_percent_tag.get_text(strip=True) if discount_percent_tag else None,
+            'rating': stars_tag.get_text(strip=True) if stars_tag else None,
+            'old_price': old_price_tag.get_text(strip=True) if old_price_tag else None,
+            'discount_price': discount_price_tag.get_text(strip=True) if discount_price_tag else None,
+            'image_src': image_tag.get('src') if image_tag else None,
+            'specifications': specifications,
+        }
+
+
+class LxmlCardParser:
+    """
+    Mismos campos que SoupCardParser, con lxml y XPath precompilados
+
+    Cada selector reproduce la semántica de find() de BeautifulSoup: una clase
+    suelta coincide con cualquier token del atributo class y una cadena con
+    espacios coincide con el atributo completo.
+    """
+
+    name = 'lxml'
+
+    CARDS = etree.XPath(f"//li[normalize-space(@class) = '{CARD_CLASS}']")
+    NAME = etree.XPath(".//h3[" + " or ".join(has_class(c) for c in (
+        'product__item__top__title', 'js-algolia-product-click', 'js-algolia-product-title')) + "]")
+    LINK = etree.XPath(f".//a[{has_class('product__item__top__link')}]")
+    BRAND = etree.XPath(f".//div[{has_class('product__item__information__brand')}]")
+    DISCOUNT = etree.XPath(f".//span[{has_class('label-offer')}]")
+    RATING = etree.XPath(f".//span[{has_class('averageNumber')}]")
+    OLD_PRICE = etree.XPath(f".//p[{has_class('product__price--discounts__old')}]")
+    PRICE = etree.XPath(f".//span[{has_class('price')}]")
+    IMAGE = etree.XPath(
+        ".//div[normalize-space(@class) = 'product__item__information__image js-algolia-product-click']//img")
+    SPECS = etree.XPath(
+        ".//ul[normalize-space(@class) = 'product__item__information__key-features--list js-key-list']")
+    SPEC_ITEMS = etree.XPath(f".//li[{has_class('item')}]")
+    SPEC_KEY = etree.XPath(f".//div[{has_class('item--key')}]")
+    SPEC_VALUE = etree.XPath(f".//div[{has_class('item--value')}]")
+    TEXT = etree.XPath(".//text()")
+
+    def cards(self, html: str) -> List:
+        return self.CARDS(lxml_html.fromstring(html))
+
+    def _text(self, node) -> Optional[str]:
+        if node is None:
+            return None
+        return ''.join(text.strip() for text in self.TEXT(node))
+
+    def fields(self, item) -> Optional[Dict]:
+        name_tag = first(self.NAME, item)
+        if name_tag is None:
+            return None
+
+        link_tag = first(self.LINK, item)
+        image_tag = first(self.IMAGE, item)
+
+        specifications = {}
+        specs_container = first(self.SPECS, item)
+        if specs_container is not None:
+            for spec in self.SPEC_ITEMS(specs_container):
+                key_elem = first(self.SPEC_KEY, spec)
+                value_elem = first(self.SPEC_VALUE, spec)
+                if key_elem is not None and value_elem is not None:
+                    specifications[self._text(key_elem)] = self._text(value_elem)
+
+        return {
+            'name': self._text(name_tag),
+            'href': link_tag.get('href') if link_tag is not None else None,
+            'brand': self._text(first(self.BRAND, item)),
+            'discount_percent': self._text(first(self.DISCOUNT, item)),
+            'rating': self._text(first(self.RATING, item)),
+            'old_price': self._text(first(self.OLD_PRICE, item)),
+            'discount_price': self._text(first(self.PRICE, item)),
+            'image_src': image_tag.get('src') if image_tag is not None else None,
+            'specifications': specifications,
+        }
+
+
+PARSERS = {
+    'bs4': SoupCardParser,
+    'lxml': LxmlCardParser,
+}
+
+
+def get_card_parser(name: str):
+    if name not in PARSERS:
+        raise ValueError(f"Parser no soportado: {name}. Opciones: {', '.join(PARSERS)}")
+    return PARSERS[name]()
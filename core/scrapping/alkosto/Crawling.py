@@ -1,14 +1,41 @@
-import time
-
 from core.mongo.MongoManager import MongoManager
+from core.scrapping.CrawlPipeline import CrawlPipeline
+from core.scrapping.CrawlScheduler import CrawlScheduler
+from core.scrapping.DriverPool import DriverPool
 from core.scrapping.alkosto.Scrapping import AlkostoScraper
 
 
 class AlkostoCrawler:
-    def __init__(self, clicks = None):
-        self.scraper = AlkostoScraper()
+    def __init__(self, clicks = None, workers=1, per_host_limit=2, host_delay=2.0, fetch_mode='auto',
+                 stream=False, save_batch_size=100, parser='lxml', pipeline=False, queue_size=1000,
+                 flush_interval=2.0):
+        """
+        Args:
+            clicks: Clicks en "Mostrar más" por categoría (None = todos los productos)
+            fetch_mode: 'auto' (HTTP y Selenium si falla), 'http' o 'selenium'
+            stream: Extraer las tarjetas por tandas mientras se pagina y guardar cada save_batch_size productos
+            parser: Backend para leer las tarjetas: 'lxml' o 'bs4'
+            pipeline: Guardar en un hilo escritor aparte (cola de queue_size productos, lotes de
+                save_batch_size o cada flush_interval segundos); implica stream
+            workers: Categorías que se crawlean en paralelo (un navegador por worker)
+            per_host_limit: Máximo de páginas abiertas a la vez contra alkosto.com
+            host_delay: Segundos mínimos entre dos cargas de página contra alkosto.com
+        """
+        self.scraper = AlkostoScraper(fetch_mode=fetch_mode, parser=parser)
         self.mongo_manager = MongoManager()
         self.clicks = clicks
+        self.workers = max(1, workers)
+        self.stream = stream or pipeline
+        self.save_batch_size = max(1, save_batch_size)
+        self.use_pipeline = pipeline
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.pipeline = None
+
+        # Los navegadores se mantienen abiertos entre categorías
+        self.driver_pool = DriverPool(self.scraper.options, size=min(self.workers, per_host_limit))
+        self.scraper.driver_pool = self.driver_pool
+        self.scheduler = CrawlScheduler(workers=self.workers, per_host_limit=per_host_limit, host_delay=host_delay)
         self.category_urls = {
             'smartphones': 'https://www.alkosto.com/celulares/smartphones/c/BI_101_ALKOS',
             'portatiles': 'https://www.alkosto.com/computadores-tablet/computadores-portatiles/c/BI_104_ALKOS',
@@ -32,6 +59,9 @@ class AlkostoCrawler:
         print(f"📁 URL: {url}")
         print(f"🔢 Modo: {'TODOS los productos' if self.clicks is None else f'{self.clicks} clicks'}")
 
+        if self.stream:
+            return self._crawl_category_stream(category_name, url)
+
         # Pasar el parámetro clicks al scraper
         products, error = self.scraper.scrape_products(url, category_name, clicks=self.clicks)
 
@@ -48,26 +78,72 @@ class AlkostoCrawler:
 
         return products
 
+    def _crawl_category_stream(self, category_name, url):
+        """Guarda los productos por lotes a medida que el scraper los extrae"""
+        products = []
+        batch = []
+        saved_count = 0
+
+        for product in self.scraper.stream_products(url, category_name, clicks=self.clicks):
+            products.append(product)
+            if self.pipeline is not None:
+                # El hilo escritor guarda; si va atrasado, submit bloquea
+                self.pipeline.submit(product, category_name)
+                continue
+            batch.append(product)
+            if len(batch) >= self.save_batch_size:
+                saved_count += self.mongo_manager.save_products(batch, category_name)
+                batch = []
+
+        if batch:
+            saved_count += self.mongo_manager.save_products(batch, category_name)
+
+        print(f"✅ {len(products)} productos con descuento encontrados en {category_name}")
+        if self.pipeline is None:
+            print(f"💾 {saved_count} productos guardados en MongoDB")
+        return products
+
+    def _crawl_many(self, category_urls):
+        """Crawlea varias categorías con el scheduler (en paralelo si workers > 1)"""
+        tasks = [
+            (category_name, url, lambda name=category_name, link=url: self.crawl_category(name, link))
+            for category_name, url in category_urls.items()
+        ]
+        if self.use_pipeline:
+            self.pipeline = CrawlPipeline(self.mongo_manager, queue_size=self.queue_size,
+                                          batch_size=self.save_batch_size,
+                                          flush_interval=self.flush_interval).start()
+        try:
+            results = self.scheduler.run(tasks)
+        finally:
+            if self.pipeline is not None:
+                # Vaciar las colas antes de reportar
+                self.pipeline.close()
+                self.pipeline.report()
+                self.pipeline = None
+
+        self.scraper.load_more_stats.report()
+        return {category_name: products or [] for category_name, products in results.items()}
+
     def crawl_all_categories(self):
         """Crawlea todas las categorías"""
-        all_products = []
-
-        for category_name, url in self.category_urls.items():
-            products = self.crawl_category(category_name, url)
-            all_products.extend(products)
-            time.sleep(2)  # Pausa entre categorías
+        results = self._crawl_many(self.category_urls)
+        all_products = [product for products in results.values() for product in products]
 
         print(f"\n🎉 Crawling completado! Total: {len(all_products)} productos con descuento")
         return all_products
 
     def crawl_specific_categories(self, categories):
         """Crawlea categorías específicas"""
-        results = {}
+        selected = {}
         for category in categories:
             if category in self.category_urls:
-                products = self.crawl_category(category, self.category_urls[category])
-                results[category] = products
+                selected[category] = self.category_urls[category]
             else:
                 print(f"⚠️ Categoría no encontrada: {category}")
 
-        return results
\ No newline at end of file
+        return self._crawl_many(selected)
+
+    def close(self):
+        """Cierra los navegadores del pool"""
+        self.driver_pool.close()
@@ -0,0 +1,314 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.mongo.Schemas import ProductBase
+
+BASE_URL = "https://www.alkosto.com"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept-Language": "es-CO,es;q=0.9",
+}
+
+# Configuración de Algolia embebida en la página del listado (clave pública de solo búsqueda)
+ALGOLIA_APP_ID_RE = re.compile(
+    r'["\']?(?:algoliaApplicationId|applicationId|appId)["\']?\s*[:=]\s*["\']([A-Z0-9]{8,12})["\']')
+ALGOLIA_API_KEY_RE = re.compile(
+    r'["\']?(?:algoliaSearchApiKey|searchApiKey|algoliaApiKey|apiKey)["\']?\s*[:=]\s*["\']([a-f0-9]{32})["\']')
+ALGOLIA_INDEX_RE = re.compile(
+    r'["\']?(?:algoliaIndexName|indexName)["\']?\s*[:=]\s*["\']([\w\-]+)["\']')
+ALGOLIA_FILTERS_RE = re.compile(r'["\']?filters["\']?\s*[:=]\s*["\']([^"\']+)["\']')
+ALGOLIA_HITS_PER_PAGE_RE = re.compile(r'["\']?hitsPerPage["\']?\s*[:=]\s*(\d+)')
+
+# Código de categoría en la URL (/c/BI_101_ALKOS) y filtro de Algolia por defecto
+CATEGORY_CODE_RE = re.compile(r'/c/([^/?#]+)')
+CATEGORY_FILTER_TEMPLATE = 'categories:"{code}"'
+
+# Campos candidatos de cada hit de Algolia (el índice usa sufijos de tipo de SAP Commerce)
+HIT_FIELDS = {
+    'name': ['name_text_es', 'name'],
+    'brand': ['brand_string_mv', 'brand_string', 'brand'],
+    'url': ['url_es_string', 'url'],
+    'image': ['img-310Wx310H_string', 'img-820h_string', 'image', 'imageUrl'],
+    'price': ['lowestprice_double', 'pricevalue_cop_double', 'price'],
+    'original_price': ['baseprice_cop_double', 'baseprice_double', 'originalPrice'],
+    'discount': ['discount_string', 'discountpercentage_string', 'discount'],
+    'rating': ['averagerating_double', 'rating'],
+    'specifications': ['keyfeatures_string_mv', 'keyFeatures'],
+}
+
+
+def build_session(pool_size: int = 4, retries: int = 3) -> requests.Session:
+    """Sesión HTTP con pool de conexiones keep-alive y reintentos con backoff"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def format_price(value: float) -> str:
+    """Formatea un precio como en el sitio ($1.299.900)"""
+    return f"${value:,.0f}".replace(',', '.')
+
+
+class AlkostoHttpFetcher:
+    """
+    Obtiene productos de Alkosto sin navegador
+
+    1. Algolia: lee la configuración pública de la página del listado y consulta
+       el índice página por página (JSON).
+    2. HTML paginado: si no hay configuración de Algolia, pide ?page=N y extrae
+       las tarjetas renderizadas en el servidor.
+
+    Si ninguna estrategia devuelve productos, fetch_products devuelve None y el
+    scraper usa Selenium.
+    """
+
+    def __init__(self, scraper, session: requests.Session = None, timeout: float = 15,
+                 hits_per_page: int = 25):
+        self.scraper = scraper
+        self.session = session or build_session()
+        self.timeout = timeout
+        self.hits_per_page = hits_per_page
+
+    def fetch_products(self, url, category=None, clicks=None) -> Optional[Tuple[List[ProductBase], None]]:
+        """
+        Productos con descuento de una categoría (mismo formato que scrape_products)
+
+        clicks equivale a páginas adicionales después de la primera (None = todas).
+        """
+        max_pages = None if clicks is None else clicks + 1
+
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"⚠️ No se pudo descargar el listado por HTTP: {e}")
+            return None
+
+        html = response.text
+        config = self.extract_algolia_config(html, url)
+
+        if config:
+            print(f"⚡ Listado vía Algolia ({config['index']})")
+            try:
+                products = self._fetch_algolia(config, url, category, max_pages)
+                if products is not None:
+                    return products, None
+            except (requests.RequestException, ValueError) as e:
+                print(f"⚠️ Error consultando Algolia: {e}")
+
+        products = self._fetch_html_pages(html, url, category, max_pages)
+        if products is not None:
+            print("⚡ Listado vía HTML paginado")
+            return products, None
+
+        return None
+
+    # ------------------------------------------------------------------ Algolia
+
+    def extract_algolia_config(self, html: str, url: str) -> Optional[Dict]:
+        """Configuración de Algolia (app id, clave de búsqueda, índice, filtros) de la página"""
+        app_id = ALGOLIA_APP_ID_RE.search(html)
+        api_key = ALGOLIA_API_KEY_RE.search(html)
+        index = ALGOLIA_INDEX_RE.search(html)
+        if not (app_id and api_key and index):
+            return None
+
+        filters = ALGOLIA_FILTERS_RE.search(html)
+        if filters:
+            filters = filters.group(1)
+        else:
+            code = CATEGORY_CODE_RE.search(urlparse(url).path)
+            filters = CATEGORY_FILTER_TEMPLATE.format(code=code.group(1)) if code else ""
+
+        hits_per_page = ALGOLIA_HITS_PER_PAGE_RE.search(html)
+        return {
+            'app_id': app_id.group(1),
+            'api_key': api_key.group(1),
+            'index': index.group(1),
+            'filters': filters,
+            'hits_per_page': int(hits_per_page.group(1)) if hits_per_page else self.hits_per_page,
+        }
+
+    def _query_algolia(self, config: Dict, page: int) -> Dict:
+        endpoint = f"https://{config['app_id'].lower()}-dsn.algolia.net/1/indexes/{config['index']}/query"
+        params = {'page': page, 'hitsPerPage': config['hits_per_page']}
+        if config['filters']:
+            params['filters'] = config['filters']
+
+        response = self.session.post(
+            endpoint,
+            headers={
+                'X-Algolia-Application-Id': config['app_id'],
+                'X-Algolia-API-Key': config['api_key'],
+            },
+            data=json.dumps({'params': urlencode(params)}),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_algolia(self, config: Dict, source_url, category, max_pages) -> Optional[List[ProductBase]]:
+        products = []
+        page = 0
+        total_hits = 0
+
+        while max_pages is None or page < max_pages:
+            result = self._query_algolia(config, page)
+            hits = result.get('hits', [])
+            total_hits += len(hits)
+
+            for hit in hits:
+                product = self.hit_to_product(hit, source_url, category)
+                if product:
+                    products.append(product)
+
+            page += 1
+            if not hits or page >= result.get('nbPages', 0):
+                break
+
+        if not total_hits:
+            return None
+
+        print(f"📊 {total_hits} productos en {page} páginas de Algolia")
+        return products
+
+    @staticmethod
+    def _first(hit: Dict, field: str):
+        for key in HIT_FIELDS[field]:
+            value = hit.get(key)
+            if isinstance(value, list):
+                value = value[0] if value else None
+            if value not in (None, ''):
+                return value
+        return None
+
+    def hit_to_product(self, hit: Dict, source_url, forced_category=None) -> Optional[ProductBase]:
+        """Convierte un hit de Algolia en ProductBase (mismas reglas que extract_product_data)"""
+        name = self._first(hit, 'name')
+        if not name:
+            return None
+
+        href = self._first(hit, 'url') or ''
+        product_url = f"{BASE_URL}{href}" if href.startswith('/') else href
+
+        discount_price_num = float(self._first(hit, 'price') or 0)
+        original_price_num = float(self._first(hit, 'original_price') or 0)
+
+        discount_percent = self._first(hit, 'discount')
+        if not discount_percent:
+            if original_price_num > discount_price_num > 0:
+                discount_percent = f"{round((1 - discount_price_num / original_price_num) * 100)}%"
+            else:
+                discount_percent = "0%"
+        discount_percent = str(discount_percent)
+
+        # 🔍 FILTRAR PRODUCTOS SIN DESCUENTO REAL
+        # (import local: Scrapping importa este módulo)
+        from core.scrapping.alkosto.Scrapping import has_real_discount
+        if not has_real_discount(discount_percent, original_price_num, discount_price_num):
+            return None
+
+        image = self._first(hit, 'image') or ""
+        image_url = f"{BASE_URL}{image}" if image.startswith('/') else image
+
+        specifications = {}
+        features = hit.get(HIT_FIELDS['specifications'][0]) or hit.get(HIT_FIELDS['specifications'][1]) or []
+        for feature in features:
+            if isinstance(feature, str) and ':' in feature:
+                key, value = feature.split(':', 1)
+                specifications[key.strip()] = value.strip()
+
+        rating = self._first(hit, 'rating')
+        category = forced_category if forced_category else self.scraper.extract_category_from_url(
+            product_url or source_url)
+
+        return ProductBase(
+            name=str(name).strip(),
+            brand=str(self._first(hit, 'brand') or "Sin marca").strip(),
+            category=category,
+            product_url=product_url,
+            source_url=source_url,
+            discount_percent=discount_percent,
+            rating=str(rating) if rating is not None else "Sin calificación",
+            original_price=format_price(original_price_num) if original_price_num else "Sin descuento",
+            original_price_num=original_price_num,
+            discount_price=format_price(discount_price_num),
+            discount_price_num=discount_price_num,
+            image_url=image_url,
+            specifications=specifications,
+            availability="Disponible",
+            in_stock=True,
+            source='alkosto'
+        )
+
+    # ------------------------------------------------------------ HTML paginado
+
+    @staticmethod
+    def _page_url(url: str, page: int) -> str:
+        parts = urlparse(url)
+        query = dict(parse_qsl(parts.query))
+        query['page'] = str(page)
+        return urlunparse(parts._replace(query=urlencode(query)))
+
+    def _fetch_html_pages(self, first_html: str, source_url, category, max_pages) -> Optional[List[ProductBase]]:
+        products = []
+        seen_urls = set()
+        html = first_html
+        page = 0
+        pages_with_cards = 0
+
+        while True:
+            new_cards = 0
+            parser = self.scraper.card_parser
+            for item in parser.cards(html):
+                fields = parser.fields(item)
+                key = fields['href'] if fields and fields['href'] else id(item)
+                if key in seen_urls:
+                    continue
+                seen_urls.add(key)
+                new_cards += 1
+
+                try:
+                    product = self.scraper.product_from_fields(fields, source_url, category)
+                    if product:
+                        products.append(product)
+                except Exception as e:
+                    print(f"⚠️ Error extrayendo producto: {e}")
+
+            page += 1
+            if new_cards:
+                pages_with_cards += 1
+            # La página no trajo tarjetas nuevas: fin del listado (o el sitio ignora ?page=)
+            if not new_cards or (max_pages is not None and page >= max_pages):
+                break
+
+            try:
+                response = self.session.get(self._page_url(source_url, page), timeout=self.timeout)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                print(f"⚠️ Error descargando página {page}: {e}")
+                break
+            html = response.text
+
+        if not seen_urls:
+            return None
+
+        # Solo la primera página tuvo tarjetas: el sitio no pagina por HTML y el
+        # listado puede estar incompleto, así que se deja a Selenium
+        if pages_with_cards == 1 and max_pages != 1:
+            return None
+
+        print(f"📊 {len(seen_urls)} productos en {pages_with_cards} páginas HTML")
+        return products
@@ -1,13 +1,15 @@
-from typing import Optional
+from contextlib import contextmanager
+from typing import Iterator, Optional
 from selenium import webdriver
 from selenium.common import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import time
 from core.mongo.Schemas import ProductBase
+from core.scrapping.alkosto.CardParser import get_card_parser
+from core.scrapping.LoadMore import LoadMorePaginator, LoadMoreStats
+from core.scrapping.alkosto.HttpFetcher import AlkostoHttpFetcher
 
 
 def has_real_discount(discount_percent, original_price_num, discount_price_num):
@@ -47,8 +49,32 @@ def has_real_discount(discount_percent, original_price_num, discount_price_num):
     return True
 
 
+# Modos de obtención del listado
+FETCH_MODES = ('auto', 'http', 'selenium')
+
+ITEM_SELECTOR = "li.ais-InfiniteHits-item"
+LOAD_MORE_SELECTOR = "button.ais-InfiniteHits-loadMore.button-primary__outline.product__listing__load-more"
+
+
 class AlkostoScraper:
-    def __init__(self):
+    def __init__(self, driver_pool=None, fetch_mode='auto', http_fetcher=None, parser='lxml'):
+        """
+        Args:
+            driver_pool: Pool de navegadores compartido (ver DriverPool); sin pool se abre un Chrome por página
+            fetch_mode: 'auto' (HTTP y Selenium si falla), 'http' (solo HTTP) o 'selenium'
+            http_fetcher: Fetcher HTTP a usar (por defecto uno con sesión propia)
+            parser: Backend para leer las tarjetas: 'lxml' (XPath precompilados) o 'bs4'
+        """
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Modo no soportado: {fetch_mode}. Opciones: {', '.join(FETCH_MODES)}")
+
+        self.driver_pool = driver_pool
+        self.card_parser = get_card_parser(parser)
+        self.fetch_mode = fetch_mode
+        self.http_fetcher = http_fetcher or AlkostoHttpFetcher(self)
+        # Latencias de "Mostrar más" compartidas por todas las categorías del crawl
+        self.load_more_stats = LoadMoreStats()
+        self.paginator = LoadMorePaginator(ITEM_SELECTOR, LOAD_MORE_SELECTOR, stats=self.load_more_stats)
         self.options = Options()
         self.options.add_argument("--headless")
         self.options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
@@ -106,10 +132,27 @@ class AlkostoScraper:
         except:
             return "Sin categoría"
 
+    @contextmanager
+    def _driver(self):
+        """Driver del pool si existe; si no, un Chrome nuevo que se cierra al terminar"""
+        if self.driver_pool is not None:
+            with self.driver_pool.acquire() as driver:
+                yield driver
+            return
+
+        driver = webdriver.Chrome(options=self.options)
+        try:
+            yield driver
+        finally:
+            driver.quit()
+
     def get_content_selenium(self, url, clicks=3):
         """Obtiene contenido HTML de la URL con Selenium"""
-        driver = webdriver.Chrome(options=self.options)
+        with self._driver() as driver:
+            return self._load_listing(driver, url, clicks)
 
+    def _load_listing(self, driver, url, clicks):
+        """Carga el listado y hace click en 'Mostrar más' hasta clicks veces (None = hasta el final)"""
         try:
             print(f"🌐 Accediendo a: {url}")
             driver.get(url)
@@ -117,52 +160,42 @@ class AlkostoScraper:
             # Esperar carga inicial
             try:
                 WebDriverWait(driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "li.ais-InfiniteHits-item"))
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ITEM_SELECTOR))
                 )
             except TimeoutException:
                 print("Timeout: No se encontraron productos")
                 return None, "No se encontraron productos"
 
-            # Lógica para clicks - si clicks es None, sigue hasta el final
-            click_count = 0
-            while True:
-                # Si clicks no es None y ya alcanzamos el límite, salir
-                if clicks is not None and click_count >= clicks:
-                    break
-
-                try:
-                    boton = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR,
-                                                    "button.ais-InfiniteHits-loadMore.button-primary__outline.product__listing__load-more"))
-                    )
-                    driver.execute_script("arguments[0].click();", boton)
-                    click_count += 1
-                    print(f"📋 Click #{click_count} en 'Mostrar más'")
-                    time.sleep(2)
-                except Exception as e:
-                    print(f"✅ Fin de los productos ({click_count} clicks realizados)")
-                    break
+            # Clicks en "Mostrar más" esperando a que lleguen las tarjetas (None = hasta el final)
+            self.paginator.run(driver, clicks)
 
             return driver.page_source, None
 
         except Exception as e:
             error_msg = f"❌ Error durante el scraping: {str(e)}"
             print(error_msg)
+            if self.driver_pool is not None:
+                # El navegador puede haber quedado en mal estado: no reutilizarlo
+                self.driver_pool.invalidate(driver)
             return None, error_msg
-        finally:
-            driver.quit()
 
     def scrape_products(self, url, category=None, clicks = None):
         """Scrapea productos de una URL específica y devuelve objetos ProductBase"""
+        if self.fetch_mode != 'selenium':
+            result = self.http_fetcher.fetch_products(url, category, clicks=clicks)
+            if result is not None:
+                return result
+            if self.fetch_mode == 'http':
+                return [], "No se pudo obtener el listado por HTTP"
+            print("🔁 Listado no disponible por HTTP, usando Selenium")
+
         html_content, error = self.get_content_selenium(url,clicks=clicks)
 
         if error:
             return [], error
 
         product_info_list = []
-        soup = BeautifulSoup(html_content, 'html.parser')
-        product_items = soup.find_all('li',
-                                      class_='ais-InfiniteHits-item product__item js-product-item js-algolia-product-click')
+        product_items = self.card_parser.cards(html_content)
 
         print(f"📊 Encontrados {len(product_items)} productos para scrapear")
 
@@ -177,41 +210,87 @@ class AlkostoScraper:
 
         return product_info_list, None
 
+    def stream_products(self, url, category=None, clicks=None) -> Iterator[ProductBase]:
+        """
+        Versión en streaming de scrape_products: entrega cada ProductBase en cuanto se extrae
+
+        Con Selenium no se parsea el page_source final: después de cada "Mostrar
+        más" se extraen solo las tarjetas recién agregadas, así la memoria se
+        mantiene plana y el consumidor puede guardar mientras se pagina.
+        """
+        if self.fetch_mode != 'selenium':
+            result = self.http_fetcher.fetch_products(url, category, clicks=clicks)
+            if result is not None:
+                yield from result[0]
+                return
+            if self.fetch_mode == 'http':
+                print("❌ No se pudo obtener el listado por HTTP")
+                return
+            print("🔁 Listado no disponible por HTTP, usando Selenium")
+
+        with self._driver() as driver:
+            try:
+                print(f"🌐 Accediendo a: {url}")
+                driver.get(url)
+
+                try:
+                    WebDriverWait(driver, 15).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, ITEM_SELECTOR))
+                    )
+                except TimeoutException:
+                    print("Timeout: No se encontraron productos")
+                    return
+
+                extracted = 0
+                for cards in self.paginator.iter_batches(driver, clicks):
+                    for card_html in cards:
+                        extracted += 1
+                        try:
+                            items = self.card_parser.cards(card_html)
+                            product_data = self.extract_product_data(items[0], url, category) if items else None
+                        except Exception as e:
+                            print(f"⚠️ Error extrayendo producto: {e}")
+                            continue
+                        if product_data:
+                            yield product_data
+
+                print(f"📊 {extracted} productos extraídos por tandas")
+
+            except Exception as e:
+                print(f"❌ Error durante el scraping: {str(e)}")
+                if self.driver_pool is not None:
+                    # El navegador puede haber quedado en mal estado: no reutilizarlo
+                    self.driver_pool.invalidate(driver)
+
     def extract_product_data(self, item, source_url, forced_category=None) -> Optional[ProductBase]:
-        """Extrae datos de un producto individual y devuelve ProductBase"""
-        # Extraer información básica
-        name_tag = item.find('h3', class_=['product__item__top__title', 'js-algolia-product-click',
-                                           'js-algolia-product-title'])
-        if not name_tag:
+        """Extrae datos de un producto individual (tarjeta del backend de parser) y devuelve ProductBase"""
+        return self.product_from_fields(self.card_parser.fields(item), source_url, forced_category)
+
+    def product_from_fields(self, fields, source_url, forced_category=None) -> Optional[ProductBase]:
+        """Construye el ProductBase a partir de los campos crudos de una tarjeta"""
+        if not fields:
             return None
 
-        name = name_tag.get_text(strip=True)
+        name = fields['name']
 
         # URL del producto
-        link_tag = item.find('a', class_='product__item__top__link')
         product_url = None
-        if link_tag and link_tag.get('href'):
-            href = link_tag['href']
+        href = fields['href']
+        if href:
             product_url = f"https://www.alkosto.com{href}" if href.startswith('/') else href
 
         # Marca
-        brand_tag = item.find('div', class_='product__item__information__brand')
-        brand = brand_tag.get_text(strip=True) if brand_tag else "Sin marca"
+        brand = fields['brand'] if fields['brand'] is not None else "Sin marca"
 
         # Descuento
-        discount_percent_tag = item.find('span', class_='label-offer')
-        discount_percent = discount_percent_tag.get_text(strip=True) if discount_percent_tag else "0%"
+        discount_percent = fields['discount_percent'] if fields['discount_percent'] is not None else "0%"
 
         # Rating
-        stars_tag = item.find('span', class_='averageNumber')
-        rating = stars_tag.get_text(strip=True) if stars_tag else "Sin calificación"
+        rating = fields['rating'] if fields['rating'] is not None else "Sin calificación"
 
         # Precios
-        old_price_tag = item.find('p', class_='product__price--discounts__old')
-        discount_price_tag = item.find('span', class_='price')
-
-        old_price_text = old_price_tag.get_text(strip=True) if old_price_tag else "Sin descuento"
-        discount_price_text = discount_price_tag.get_text(strip=True) if discount_price_tag else "0"
+        old_price_text = fields['old_price'] if fields['old_price'] is not None else "Sin descuento"
+        discount_price_text = fields['discount_price'] if fields['discount_price'] is not None else "0"
 
         # Limpiar precios para valores numéricos
         original_price_num = self.clean_price(old_price_text)
@@ -223,25 +302,13 @@ class AlkostoScraper:
             return None
 
         # Imagen
-        img_c_div = item.find('div', class_='product__item__information__image js-algolia-product-click')
-        image_tag = img_c_div.find('img') if img_c_div else None
         image_url = ""
-        if image_tag and image_tag.get('src'):
-            src = image_tag['src']
+        src = fields['image_src']
+        if src:
             image_url = f"https://www.alkosto.com{src}" if src.startswith('/') else src
 
         # Especificaciones
-        specifications = {}
-        specs_container = item.find('ul', class_='product__item__information__key-features--list js-key-list')
-        if specs_container:
-            spec_items = specs_container.find_all('li', class_='item')
-            for spec in spec_items:
-                key_elem = spec.find('div', class_='item--key')
-                value_elem = spec.find('div', class_='item--value')
-                if key_elem and value_elem:
-                    key = key_elem.get_text(strip=True)
-                    value = value_elem.get_text(strip=True)
-                    specifications[key] = value
+        specifications = fields['specifications']
 
         # Categoría
         category = forced_category if forced_category else self.extract_category_from_url(product_url or source_url)
@@ -268,4 +335,4 @@ class AlkostoScraper:
             availability=availability,
             in_stock=in_stock,
             source='alkosto'
-        )
\ No newline at end of file
+        )
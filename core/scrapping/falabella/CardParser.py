@@ -0,0 +1,102 @@
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+from core.scrapping.CardParsing import first, has_class
+
+
+class SoupCardParser:
+    """Extrae los campos crudos de cada tarjeta de Falabella con BeautifulSoup (html.parser)"""
+
+    name = 'bs4'
+
+    def cards(self, html: str) -> List:
+        soup = BeautifulSoup(html, 'html.parser')
+        return soup.find_all('li', class_='search-results-list__item')
+
+    def fields(self, item) -> Optional[Dict]:
+        link_tag = item.find('a', class_='pod-link')
+        if not link_tag or not link_tag.get('href'):
+            return None
+
+        name_tag = item.find('b', class_='pod-subTitle')
+        brand_tag = item.find('div', class_='pod-title')
+
+        discount_price_tag = item.find('li', class_='price-list-item best-price')
+        discount_price_span = discount_price_tag.find('span') if discount_price_tag else None
+        old_price_tag = item.find('li', class_='price-list-item old-price')
+        old_price_span = old_price_tag.find('span') if old_price_tag else None
+
+        discount_percent_tag = item.find('span', class_='discount-badge')
+        image_tag = item.find('img', class_='pod-image')
+        rating_tag = item.find('span', class_='falabella-rating-stars-2-average')
+
+        return {
+            'href': link_tag['href'],
+            'name': name_tag.get_text(strip=True) if name_tag else None,
+            'brand': brand_tag.get_text(strip=True) if brand_tag else None,
+            'discount_price': discount_price_span.get_text(strip=True) if discount_price_span else None,
+            'old_price': old_price_span.get_text(strip=True) if old_price_span else None,
+            'discount_percent': discount_percent_tag.get_text(strip=True) if discount_percent_tag else None,
+            'image_src': image_tag.get('src') if image_tag else None,
+            'rating': rating_tag.get_text(strip=True) if rating_tag else None,
+            'has_buy_button': item.find('button', class_='fb-btn-primary') is not None,
+        }
+
+
+class LxmlCardParser:
+    """Mismos campos que SoupCardParser, con lxml y XPath precompilados"""
+
+    name = 'lxml'
+
+    CARDS = etree.XPath(f"//li[{has_class('search-results-list__item')}]")
+    LINK = etree.XPath(f".//a[{has_class('pod-link')}]")
+    NAME = etree.XPath(f".//b[{has_class('pod-subTitle')}]")
+    BRAND = etree.XPath(f".//div[{has_class('pod-title')}]")
+    PRICE = etree.XPath(".//li[normalize-space(@class) = 'price-list-item best-price']//span")
+    OLD_PRICE = etree.XPath(".//li[normalize-space(@class) = 'price-list-item old-price']//span")
+    DISCOUNT = etree.XPath(f".//span[{has_class('discount-badge')}]")
+    IMAGE = etree.XPath(f".//img[{has_class('pod-image')}]")
+    RATING = etree.XPath(f".//span[{has_class('falabella-rating-stars-2-average')}]")
+    BUY_BUTTON = etree.XPath(f".//button[{has_class('fb-btn-primary')}]")
+    TEXT = etree.XPath(".//text()")
+
+    def cards(self, html: str) -> List:
+        return self.CARDS(lxml_html.fromstring(html))
+
+    def _text(self, node) -> Optional[str]:
+        if node is None:
+            return None
+        return ''.join(text.strip() for text in self.TEXT(node))
+
+    def fields(self, item) -> Optional[Dict]:
+        link_tag = first(self.LINK, item)
+        if link_tag is None or not link_tag.get('href'):
+            return None
+
+        image_tag = first(self.IMAGE, item)
+
+        return {
+            'href': link_tag.get('href'),
+            'name': self._text(first(self.NAME, item)),
+            'brand': self._text(first(self.BRAND, item)),
+            'discount_price': self._text(first(self.PRICE, item)),
+            'old_price': self._text(first(self.OLD_PRICE, item)),
+            'discount_percent': self._text(first(self.DISCOUNT, item)),
+            'image_src': image_tag.get('src') if image_tag is not None else None,
+            'rating': self._text(first(self.RATING, item)),
+            'has_buy_button': bool(self.BUY_BUTTON(item)),
+        }
+
+
+PARSERS = {
+    'bs4': SoupCardParser,
+    'lxml': LxmlCardParser,
+}
+
+
+def get_card_parser(name: str):
+    if name not in PARSERS:
+        raise ValueError(f"Parser no soportado: {name}. Opciones: {', '.join(PARSERS)}")
+    return PARSERS[name]()
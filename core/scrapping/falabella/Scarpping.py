@@ -1,12 +1,12 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 from selenium import webdriver
 from selenium.common import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import time
+from core.scrapping.falabella.CardParser import get_card_parser
+from core.scrapping.LoadMore import LoadMorePaginator, LoadMoreStats
 
 class ProductBase:
     def __init__(self, **kwargs):
@@ -50,8 +50,12 @@ def has_real_discount(discount_percent, original_price_num, discount_price_num):
 
 
 class FalabellaScraper:
-    def __init__(self):
-       
+    def __init__(self, parser='lxml'):
+        """
+        Args:
+            parser: Backend para leer las tarjetas: 'lxml' (XPath precompilados) o 'bs4'
+        """
+        self.card_parser = get_card_parser(parser)
         self.options = Options()
         self.options.add_argument("--headless")
         self.options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
@@ -61,6 +65,14 @@ class FalabellaScraper:
         
         self.base_url = "https://www.falabella.com.co"
 
+        # Latencias de "Mostrar más" compartidas por todas las categorías del crawl
+        self.load_more_stats = LoadMoreStats()
+        self.paginator = LoadMorePaginator(
+            "li.search-results-list__item",
+            "button.fb-btn.fb-btn-secondary.fb-btn-icon.fb-show-more",
+            stats=self.load_more_stats
+        )
+
     def clean_price(self, price_str):
         """Convierte precios de texto (e.g., '$ 1.299.900') a números"""
         if not price_str:
@@ -115,28 +127,8 @@ class FalabellaScraper:
                 print("Timeout: No se encontraron productos")
                 return None, "No se encontraron productos"
 
-            
-            click_count = 0
-            while True:
-               
-                if clicks is not None and click_count >= clicks:
-                    break
-
-                
-                load_more_selector = "button.fb-btn.fb-btn-secondary.fb-btn-icon.fb-show-more"
-                
-                try:
-                    boton = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, load_more_selector))
-                    )
-                    driver.execute_script("arguments[0].click();", boton)
-                    click_count += 1
-                    print(f"📋 Click #{click_count} en 'Mostrar más'")
-                    time.sleep(3) 
-                except Exception:
-                    
-                    print(f"✅ Fin de los productos ({click_count} clicks realizados)")
-                    break
+            # Clicks en "Mostrar más" esperando a que lleguen las tarjetas (None = hasta el final)
+            self.paginator.run(driver, clicks)
 
             return driver.page_source, None
 
@@ -155,10 +147,9 @@ class FalabellaScraper:
             return [], error
 
         product_info_list = []
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Selector para cada tarjeta de producto en Falabella
-        product_items = soup.find_all('li', class_='search-results-list__item')
+
+        # Tarjetas de producto de Falabella (li.search-results-list__item)
+        product_items = self.card_parser.cards(html_content)
 
         print(f"📊 Encontrados {len(product_items)} productos para scrapear")
 
@@ -173,67 +164,75 @@ class FalabellaScraper:
 
         return product_info_list, None
 
+    def stream_products(self, url, category=None, clicks=None) -> Iterator[ProductBase]:
+        """Entrega cada producto en cuanto se extrae, procesando solo las tarjetas nuevas de cada carga"""
+        driver = webdriver.Chrome(options=self.options)
+
+        try:
+            full_url = url if url.startswith('http') else f"{self.base_url}{url}"
+            print(f"🌐 Accediendo a: {full_url}")
+            driver.get(full_url)
+
+            try:
+                WebDriverWait(driver, 20).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.search-results-list"))
+                )
+            except TimeoutException:
+                print("Timeout: No se encontraron productos")
+                return
+
+            for cards in self.paginator.iter_batches(driver, clicks):
+                for card_html in cards:
+                    try:
+                        items = self.card_parser.cards(card_html)
+                        product_data = self.extract_product_data(items[0], url, category) if items else None
+                    except Exception as e:
+                        print(f"⚠️ Error extrayendo producto: {e}")
+                        continue
+                    if product_data:
+                        yield product_data
+
+        except Exception as e:
+            print(f"❌ Error durante el scraping: {str(e)}")
+        finally:
+            driver.quit()
+
     def extract_product_data(self, item, source_url, forced_category=None) -> Optional[ProductBase]:
-        """Extrae datos de un producto individual y devuelve ProductBase"""
-    
-        
-      
-        link_tag = item.find('a', class_='pod-link')
-        if not link_tag or not link_tag.get('href'):
+        """Extrae datos de un producto individual (tarjeta del backend de parser) y devuelve ProductBase"""
+        return self.product_from_fields(self.card_parser.fields(item), source_url, forced_category)
+
+    def product_from_fields(self, fields, source_url, forced_category=None) -> Optional[ProductBase]:
+        """Construye el ProductBase a partir de los campos crudos de una tarjeta"""
+        if not fields:
             return None
 
-        product_url = link_tag['href']
+        product_url = fields['href']
         if not product_url.startswith('http'):
             product_url = f"{self.base_url}{product_url}"
 
-        
-        name_tag = item.find('b', class_='pod-subTitle')
-        name = name_tag.get_text(strip=True) if name_tag else "Sin nombre"
-        
-       
-        brand_tag = item.find('div', class_='pod-title')
-        brand = brand_tag.get_text(strip=True) if brand_tag else "Sin marca"
+        name = fields['name'] if fields['name'] is not None else "Sin nombre"
+        brand = fields['brand'] if fields['brand'] is not None else "Sin marca"
 
-        
-        discount_price_tag = item.find('li', class_='price-list-item best-price')
-        discount_price_text = discount_price_tag.find('span').get_text(strip=True) if discount_price_tag and discount_price_tag.find('span') else "0"
-        
-        old_price_tag = item.find('li', class_='price-list-item old-price')
-        old_price_text = old_price_tag.find('span').get_text(strip=True) if old_price_tag and old_price_tag.find('span') else "Sin descuento"
-        
-       
-        discount_percent_tag = item.find('span', class_='discount-badge')
-        discount_percent = discount_percent_tag.get_text(strip=True) if discount_percent_tag else "0%"
+        discount_price_text = fields['discount_price'] if fields['discount_price'] is not None else "0"
+        old_price_text = fields['old_price'] if fields['old_price'] is not None else "Sin descuento"
+        discount_percent = fields['discount_percent'] if fields['discount_percent'] is not None else "0%"
 
-        
         original_price_num = self.clean_price(old_price_text)
         discount_price_num = self.clean_price(discount_price_text)
-        
-      
+
         if not has_real_discount(discount_percent, original_price_num, discount_price_num):
-           
             print(f"⏭️  Saltando producto sin descuento real o significativo: {name[:50]}...")
             return None
 
-      
-        image_tag = item.find('img', class_='pod-image')
-        image_url = image_tag['src'] if image_tag and image_tag.get('src') else ""
-
-       
-        rating_tag = item.find('span', class_='falabella-rating-stars-2-average')
-        rating = rating_tag.get_text(strip=True) if rating_tag else "Sin calificación"
+        image_url = fields['image_src'] or ""
+        rating = fields['rating'] if fields['rating'] is not None else "Sin calificación"
 
-        
         category = forced_category if forced_category else self.extract_category_from_url(product_url)
-        
-       
-        buy_button = item.find('button', class_='fb-btn-primary')
-        availability = "Disponible" if buy_button else "No disponible/Agotado"
+
+        availability = "Disponible" if fields['has_buy_button'] else "No disponible/Agotado"
         in_stock = "disponible" in availability.lower()
-        
-        
-        specifications: Dict[str, Any] = {}
 
+        specifications: Dict[str, Any] = {}
 
         return ProductBase(
             name=name,
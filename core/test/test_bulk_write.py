@@ -0,0 +1,101 @@
+from django.test import TestCase
+from pymongo.errors import AutoReconnect, BulkWriteError
+from core.test.test_change_detection import FakeCollection, fake_manager, make_product
+
+
+class FlakyCollection(FakeCollection):
+    """
+    Falla según el product_url: 'bad' siempre (documento inválido), 'duplicate'
+    siempre (clave duplicada) y 'flaky' la primera vez (primario reiniciándose)
+    """
+
+    def __init__(self, bad=(), flaky=(), duplicate=(), disconnect_once=False):
+        super().__init__()
+        self.bad = set(bad)
+        self.duplicate = set(duplicate)
+        self.flaky = set(flaky)
+        self.disconnect_once = disconnect_once
+        self.calls = []
+
+    def bulk_write(self, operations, ordered=True):
+        self.calls.append((len(operations), ordered))
+        if self.disconnect_once:
+            self.disconnect_once = False
+            raise AutoReconnect("conexión perdida")
+
+        errors = []
+        applied = []
+        for index, operation in enumerate(operations):
+            url = operation._filter['product_url']
+            if url in self.bad:
+                errors.append({'index': index, 'code': 121, 'errmsg': 'Document failed validation'})
+            elif url in self.duplicate:
+                errors.append({'index': index, 'code': 11000, 'errmsg': 'E11000 duplicate key'})
+            elif url in self.flaky:
+                self.flaky.discard(url)
+                errors.append({'index': index, 'code': 91, 'errmsg': 'The server is in quiesce mode'})
+            else:
+                applied.append(operation)
+
+        result = super().bulk_write(applied, ordered)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nUpserted': result.upserted_count,
+                                  'nModified': result.modified_count})
+        return result
+
+
+def url(i):
+    return f"https://www.alkosto.com/p/{i}"
+
+
+class ChunkedBulkWriteTest(TestCase):
+    """bulk_write no ordenado, por chunks, con reintentos de errores transitorios"""
+
+    def _manager(self, collection, chunk_size=3):
+        manager = fake_manager()
+        manager.products_collection = collection
+        manager.bulk_chunk_size = chunk_size
+        manager.bulk_retry_backoff = 0
+        return manager
+
+    def test_bad_document_does_not_lose_the_chunk(self):
+        collection = FlakyCollection(bad={url(1)}, flaky={url(4)})
+        manager = self._manager(collection)
+
+        documents = [manager.prepare_document(make_product(i)) for i in range(7)]
+        result = manager.upsert_documents(documents)
+
+        self.assertEqual((result['upserted'], result['failed']), (6, 1))
+        self.assertEqual([(c['upserted'], c['failed']) for c in result['chunks']], [(2, 1), (3, 0), (1, 0)])
+        self.assertEqual(result['chunks'][1]['retries'], 1)
+        self.assertNotIn(url(1), result['changed_urls'])
+        self.assertIn(url(4), collection.docs)
+        self.assertTrue(all(ordered is False for _, ordered in collection.calls))
+
+    def test_duplicate_keys_are_not_retried(self):
+        collection = FlakyCollection(duplicate={url(2)})
+        manager = self._manager(collection, chunk_size=10)
+
+        result = manager.upsert_documents([manager.prepare_document(make_product(i)) for i in range(4)])
+
+        self.assertEqual((result['upserted'], result['failed']), (3, 1))
+        self.assertEqual(len(collection.calls), 1)
+
+    def test_connection_errors_are_retried(self):
+        collection = FlakyCollection(disconnect_once=True)
+        manager = self._manager(collection, chunk_size=10)
+
+        result = manager.upsert_documents([manager.prepare_document(make_product(i)) for i in range(4)])
+
+        self.assertEqual((result['upserted'], result['failed']), (4, 0))
+        self.assertEqual(len(collection.calls), 2)
+
+    def test_gives_up_after_retries(self):
+        manager = self._manager(FlakyCollection(), chunk_size=10)
+        manager.bulk_retries = 1
+        manager.products_collection.bulk_write = lambda operations, ordered=True: (_ for _ in ()).throw(
+            AutoReconnect("sin primario"))
+
+        result = manager.upsert_documents([manager.prepare_document(make_product(i)) for i in range(2)])
+        self.assertEqual(result['failed'], 2)
+        self.assertEqual(result['changed_urls'], [])
@@ -0,0 +1,43 @@
+import glob
+import os
+from django.test import TestCase
+from core.scrapping.alkosto.Scrapping import AlkostoScraper
+from core.scrapping.falabella.Scarpping import FalabellaScraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def parse_fixtures(scraper, site):
+    products = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, site, 'listing_page_*.html'))):
+        with open(path, encoding='utf-8') as f:
+            for item in scraper.card_parser.cards(f.read()):
+                product = scraper.extract_product_data(item, 'https://fixture.local/listado')
+                if product:
+                    products.append(product)
+    return products
+
+
+class CardParserTest(TestCase):
+    """El backend lxml debe producir exactamente los mismos productos que BeautifulSoup"""
+
+    def test_alkosto_backends_match(self):
+        soup = [p.dict(exclude={'scraping_date'}) for p in parse_fixtures(AlkostoScraper(parser='bs4'), 'alkosto')]
+        fast = [p.dict(exclude={'scraping_date'}) for p in parse_fixtures(AlkostoScraper(parser='lxml'), 'alkosto')]
+
+        self.assertEqual(len(soup), 3)
+        self.assertEqual(soup, fast)
+        self.assertEqual(fast[0]['specifications'], {'Memoria RAM': '8 GB', 'Pantalla': '6.6 pulgadas'})
+
+    def test_falabella_backends_match(self):
+        soup = [vars(p) for p in parse_fixtures(FalabellaScraper(parser='bs4'), 'falabella')]
+        fast = [vars(p) for p in parse_fixtures(FalabellaScraper(parser='lxml'), 'falabella')]
+
+        self.assertEqual(len(soup), 2)
+        self.assertEqual(soup, fast)
+        self.assertEqual(fast[0]['discount_price'], '$ 2.999.900')
+        self.assertEqual(fast[1]['name'], 'iPhone 15128GBNegro')
+
+    def test_unknown_parser_is_rejected(self):
+        with self.assertRaises(ValueError):
+            AlkostoScraper(parser='regex')
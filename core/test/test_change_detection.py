@@ -0,0 +1,89 @@
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from django.test import TestCase
+from core.mongo.MongoManager import MongoManager
+from core.mongo.Schemas import ProductBase
+
+
+def make_product(i, price=80000):
+    return ProductBase(
+        name=f"Producto {i}", brand="MARCA", category="Celulares",
+        product_url=f"https://www.alkosto.com/p/{i}", source_url="https://www.alkosto.com/listado",
+        discount_percent="-20%", rating="4.5", original_price="$100.000", original_price_num=100000,
+        discount_price=f"${price:,}".replace(',', '.'), discount_price_num=price, image_url="",
+        specifications={}, availability="Disponible", in_stock=True, source="alkosto"
+    )
+
+
+class FakeCollection:
+    """Colección en memoria con lo que usa upsert_documents (find, bulk_write, update_many)"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.docs = {}
+        self.batches = []
+        self.writes = 0
+
+    def find(self, query, projection=None):
+        urls = query['product_url']['$in']
+        return [dict(self.docs[url]) for url in urls if url in self.docs]
+
+    def bulk_write(self, operations, ordered=True):
+        time.sleep(self.delay)
+        self.batches.append(operations)
+        upserted = modified = 0
+        for operation in operations:
+            url = operation._filter['product_url']
+            if url in self.docs:
+                modified += 1
+            else:
+                upserted += 1
+            self.docs.setdefault(url, {}).update(operation._doc['$set'])
+            self.writes += 1
+        return SimpleNamespace(upserted_count=upserted, modified_count=modified)
+
+    def update_many(self, query, update):
+        for url in query['product_url']['$in']:
+            self.docs[url].update(update['$set'])
+
+
+def fake_manager(delay=0.0):
+    # MongoManager sin conexión, sobre una colección en memoria
+    manager = MongoManager.__new__(MongoManager)
+    manager.products_collection = FakeCollection(delay)
+    return manager
+
+
+class ChangeDetectionTest(TestCase):
+    """Upserts que solo reescriben los productos cuyo contenido cambió"""
+
+    def test_unchanged_products_only_touch_last_seen(self):
+        manager = fake_manager()
+        collection = manager.products_collection
+
+        self.assertEqual(manager.save_products([make_product(1), make_product(2)], 'smartphones'), 2)
+        first_seen = collection.docs['https://www.alkosto.com/p/1']['last_seen']
+        first_changed = collection.docs['https://www.alkosto.com/p/1']['last_changed']
+
+        # Segundo crawl: el producto 1 igual (con otra scraping_date), el 2 bajó de precio
+        documents = [manager.prepare_document(make_product(1), 'smartphones'),
+                     manager.prepare_document(make_product(2, price=75000), 'smartphones')]
+        result = manager.upsert_documents(documents)
+
+        self.assertEqual(result['changed_urls'], ['https://www.alkosto.com/p/2'])
+        self.assertEqual((result['upserted'], result['modified'], result['unchanged']), (0, 1, 1))
+        self.assertEqual(collection.writes, 3)
+
+        unchanged = collection.docs['https://www.alkosto.com/p/1']
+        self.assertEqual(unchanged['last_changed'], first_changed)
+        self.assertGreaterEqual(unchanged['last_seen'], first_seen)
+        self.assertEqual(collection.docs['https://www.alkosto.com/p/2']['discount_price_num'], 75000)
+
+    def test_hash_ignores_tracking_fields(self):
+        manager = fake_manager()
+        document = manager.prepare_document(make_product(1))
+        again = dict(document, scraping_date=datetime(2020, 1, 1), last_seen=datetime.now())
+        self.assertEqual(manager.content_hash(again), document['content_hash'])
+        self.assertNotEqual(manager.prepare_document(make_product(1), 'otra')['content_hash'],
+                            document['content_hash'])
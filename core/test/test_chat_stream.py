@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+from unittest import mock
+from django.test import TestCase, override_settings
+from core.chatbot.LLMGateway import LLMGateway
+from core.chatbot.TechChatbot import TechChatbot
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chat-stream-tests',
+    }
+}
+
+PRODUCTS = [{
+    'id': '1', 'name': 'Computador Portátil HP Victus 15', 'brand': 'HP', 'category': 'Portátiles',
+    'price': 3699000.0, 'discount_percent': '32%', 'product_url': 'https://www.alkosto.com/victus',
+    'source': 'alkosto', 'similarity_score': 0.8, 'is_main_product': True,
+}]
+
+
+class FakeEmbeddingManager:
+    def search_products(self, query, top_k=10, threshold=0.4):
+        return [dict(product) for product in PRODUCTS]
+
+    def get_available_sources(self):
+        return ['alkosto']
+
+
+class FakeStream:
+    """Imita el stream asíncrono de chat.completions.create(stream=True)"""
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for text in self.parts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeAsyncGroq:
+    def __init__(self, parts):
+        async def create(**kwargs):
+            self.kwargs = kwargs
+            return FakeStream(parts)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChatStreamViewTest(TestCase):
+    """Pruebas del endpoint de chat en streaming (SSE)"""
+
+    def _chatbot(self, session_id):
+        return TechChatbot(groq_api_key=None, embedding_manager=FakeEmbeddingManager(),
+                           llm=LLMGateway('test-key', async_client=self.groq))
+
+    async def _post(self, payload):
+        response = await self.async_client.post('/chat/nologin/stream', data=json.dumps(payload),
+                                                content_type='application/json')
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+        return response, parse_events(body)
+
+    async def test_streams_products_then_tokens(self):
+        """Los productos se envían antes de la respuesta, que llega token a token"""
+        self.groq = groq = FakeAsyncGroq(["En ALKOSTO encontré el ", "Computador Portátil HP Victus 15", " con 32% OFF"])
+
+        with mock.patch('core.views.get_chatbot_for_session', self._chatbot):
+            response, events = await self._post({'message': 'portátil hp victus', 'session_id': 'sesion-1'})
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        names = [name for name, _ in events]
+        self.assertEqual(names, ['session', 'products', 'token', 'token', 'token', 'done'])
+        self.assertEqual(events[1][1]['products'][0]['name'], PRODUCTS[0]['name'])
+        self.assertTrue(groq.kwargs['stream'])
+        self.assertEqual(events[-1][1]['response'], "".join(data['text'] for name, data in events if name == 'token'))
+
+    async def test_empty_message_is_rejected(self):
+        response = await self.async_client.post('/chat/nologin/stream', data=json.dumps({'message': ' '}),
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_malformed_payloads_get_json_errors(self):
+        for payload in ([], "hola", {'message': 123}, {'message': 'hola', 'session_id': ['x']}):
+            with self.subTest(payload=payload):
+                response = await self.async_client.post('/chat/nologin/stream', data=json.dumps(payload),
+                                                        content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(json.loads(response.content)['success'])
@@ -0,0 +1,117 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from core.mongo import ClientRegistry
+from core.mongo.MongoManager import MongoManager
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.indexes = []
+        self.docs = {}
+        self.fail_indexes = 0
+
+    def create_index(self, index):
+        if self.fail_indexes:
+            self.fail_indexes -= 1
+            raise RuntimeError("índice en conflicto")
+        self.indexes.append(index)
+
+    def find_one(self, query):
+        return self.docs.get(query['_id'])
+
+    def replace_one(self, query, document, upsert=False):
+        self.docs[query['_id']] = document
+
+
+class FakeDatabase:
+    def __init__(self, name):
+        self.name = name
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection(self, name))
+
+
+class FakeMongoClient:
+    instances = []
+    # Bases de datos compartidas entre clientes, como en un servidor real
+    databases = {}
+
+    def __init__(self, uri, **options):
+        self.uri = uri
+        self.options = options
+        self.pings = 0
+        self.admin = mock.Mock()
+        self.admin.command.side_effect = self._ping
+        FakeMongoClient.instances.append(self)
+
+    def _ping(self, command):
+        self.pings += 1
+
+    def __getitem__(self, name):
+        return FakeMongoClient.databases.setdefault(name, FakeDatabase(name))
+
+    def close(self):
+        pass
+
+
+@override_settings(MONGODB_CONNECTION_STRING='mongodb://mongo-test:27017/', MONGODB_DB_NAME='registry_db',
+                   MONGODB_MAX_POOL_SIZE=7)
+class ClientRegistryTest(TestCase):
+    """Un MongoClient por proceso y creación de índices una vez por despliegue"""
+
+    def setUp(self):
+        ClientRegistry.close_all()
+        FakeMongoClient.instances = []
+        FakeMongoClient.databases = {}
+        patcher = mock.patch.object(ClientRegistry, 'MongoClient', FakeMongoClient)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(ClientRegistry.close_all)
+
+    def test_managers_share_one_client_from_settings(self):
+        first = MongoManager()
+        second = MongoManager()
+
+        self.assertEqual(len(FakeMongoClient.instances), 1)
+        client = FakeMongoClient.instances[0]
+        self.assertIs(first.client, second.client)
+        self.assertEqual(client.uri, 'mongodb://mongo-test:27017/')
+        self.assertEqual(client.options['maxPoolSize'], 7)
+        self.assertEqual(client.pings, 1)
+        self.assertEqual(first.db.name, 'registry_db')
+
+        MongoManager(connection_string='mongodb://otro:27017/')
+        self.assertEqual(len(FakeMongoClient.instances), 2)
+
+    def test_indexes_are_created_once_per_deployment(self):
+        MongoManager()
+        products = FakeMongoClient.databases['registry_db']['products']
+        created = len(products.indexes)
+        self.assertGreater(created, 0)
+
+        MongoManager()
+        self.assertEqual(len(products.indexes), created)
+
+        # Otro proceso (memoria limpia) encuentra la versión guardada y no repite los índices
+        ClientRegistry.close_all()
+        MongoManager()
+        self.assertEqual(len(products.indexes), created)
+        self.assertEqual(len(FakeMongoClient.instances), 2)
+
+    def test_failed_index_is_retried_on_next_start(self):
+        db = FakeMongoClient.databases.setdefault('registry_db', FakeDatabase('registry_db'))
+        products = db['products']
+        products.fail_indexes = 1
+
+        MongoManager()
+        self.assertNotIn('products_indexes', db['_schema'].docs)
+        created = len(products.indexes)
+
+        # El siguiente arranque vuelve a intentarlo y, si todo funciona, guarda la versión
+        ClientRegistry.close_all()
+        MongoManager()
+        self.assertEqual(len(products.indexes), 2 * created + 1)
+        self.assertIn('products_indexes', db['_schema'].docs)
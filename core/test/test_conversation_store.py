@@ -0,0 +1,74 @@
+from django.test import TestCase, override_settings
+from django.core.cache import caches
+from core.chatbot.ConversationStore import ConversationStore
+from core.chatbot.LRUCache import LRUCache
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'conversation-store-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConversationStoreTest(TestCase):
+    """Pruebas del almacenamiento de historial por sesión"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.history = [
+            {"type": "user", "content": "Busco un portátil gamer", "products_found": 3},
+            {"type": "assistant", "content": "¡Claro! Encontré estos portátiles..."},
+        ]
+
+    def test_save_and_load_roundtrip(self):
+        """El historial se recupera con el mismo formato que usa TechChatbot"""
+        store = ConversationStore()
+        store.save('sesion-1', self.history)
+
+        self.assertEqual(store.load('sesion-1'), self.history)
+        self.assertEqual(store.load('sesion-inexistente'), [])
+
+    def test_history_is_shared_between_workers(self):
+        """Otro worker (otra instancia con su propio L1) ve los cambios más recientes"""
+        worker_a = ConversationStore()
+        worker_b = ConversationStore()
+
+        worker_a.save('sesion-1', self.history)
+        self.assertEqual(worker_b.load('sesion-1'), self.history)
+
+        updated = self.history + [{"type": "user", "content": "¿Y más baratos?", "products_found": 0}]
+        worker_b.save('sesion-1', updated)
+
+        # El L1 de worker_a quedó desactualizado y debe descartarse por la revisión
+        self.assertEqual(worker_a.load('sesion-1'), updated)
+
+    def test_history_is_trimmed_and_cleared(self):
+        """Se guardan como máximo max_messages mensajes y clear elimina la sesión"""
+        store = ConversationStore(max_messages=2)
+        store.save('sesion-1', self.history * 3)
+        self.assertEqual(len(store.load('sesion-1')), 2)
+
+        store.clear('sesion-1')
+        self.assertEqual(store.load('sesion-1'), [])
+
+
+class LRUCacheTest(TestCase):
+    """Pruebas de la caché LRU en memoria"""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_entries_are_not_returned(self):
+        cache = LRUCache(max_size=10, ttl=0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
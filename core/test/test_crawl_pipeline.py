@@ -0,0 +1,70 @@
+import threading
+import time
+from django.test import TestCase
+from core.scrapping.CrawlPipeline import CrawlPipeline
+from core.test.test_change_detection import fake_manager, make_product
+
+
+class CrawlPipelineTest(TestCase):
+    """Pruebas del pipeline crawl → validación → escritura"""
+
+    def test_flushes_by_batch_size(self):
+        manager = fake_manager()
+        pipeline = CrawlPipeline(manager, queue_size=10, batch_size=4, flush_interval=10).start()
+        for i in range(10):
+            pipeline.submit(make_product(i), 'smartphones')
+        pipeline.close()
+
+        sizes = [len(batch) for batch in manager.products_collection.batches]
+        self.assertEqual(sizes, [4, 4, 2])
+        self.assertEqual(pipeline.saved, 10)
+        self.assertEqual(len(pipeline.changed_urls), 10)
+        self.assertEqual(pipeline.stats['write'].summary()['items'], 10)
+
+        operation = manager.products_collection.batches[0][0]
+        self.assertEqual(operation._filter, {'product_url': 'https://www.alkosto.com/p/0'})
+        self.assertEqual(operation._doc['$set']['category'], 'smartphones')
+
+    def test_flushes_by_time(self):
+        manager = fake_manager()
+        pipeline = CrawlPipeline(manager, batch_size=100, flush_interval=0.05).start()
+        pipeline.submit(make_product(1), 'smartphones')
+
+        deadline = time.monotonic() + 2
+        while not manager.products_collection.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(manager.products_collection.batches), 1)
+        pipeline.close()
+
+    def test_backpressure_blocks_producers(self):
+        """Con el escritor lento, submit bloquea en lugar de acumular productos"""
+        manager = fake_manager(delay=0.05)
+        pipeline = CrawlPipeline(manager, queue_size=2, batch_size=1, flush_interval=10).start()
+
+        producer = threading.Thread(target=lambda: [pipeline.submit(make_product(i)) for i in range(12)])
+        producer.start()
+        time.sleep(0.1)
+        # Cola de productos + cola de operaciones + el lote en escritura
+        in_flight = pipeline._products.qsize() + pipeline._documents.qsize()
+        self.assertLessEqual(in_flight, 4)
+        self.assertTrue(producer.is_alive())
+
+        producer.join()
+        pipeline.close()
+        self.assertEqual(pipeline.saved, 12)
+        self.assertGreater(pipeline.stats['crawl'].summary()['blocked'], 0)
+
+    def test_counts_invalid_and_failed_writes_separately(self):
+        manager = fake_manager()
+        upsert = manager.upsert_documents
+        manager.upsert_documents = lambda batch: dict(upsert(batch), failed=1)
+        pipeline = CrawlPipeline(manager, batch_size=2, flush_interval=10).start()
+
+        pipeline.submit(make_product(1))
+        pipeline.submit(object())
+        pipeline.submit(make_product(2))
+        pipeline.close()
+
+        self.assertEqual(pipeline.invalid, 1)
+        self.assertEqual(pipeline.write_failed, 1)
+        self.assertEqual(pipeline.failed, 2)
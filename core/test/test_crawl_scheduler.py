@@ -0,0 +1,85 @@
+import threading
+import time
+from django.test import TestCase
+from core.scrapping.CrawlScheduler import CrawlScheduler
+from core.scrapping.DriverPool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.closed = False
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.closed = True
+
+
+class FakeDriverPool(DriverPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(None, *args, **kwargs)
+        self.created = []
+
+    def _create_driver(self):
+        driver = FakeDriver()
+        self.created.append(driver)
+        return driver
+
+
+class CrawlSchedulerTest(TestCase):
+    """Pruebas del scheduler de crawling y del pool de navegadores"""
+
+    def test_per_host_limit_is_respected(self):
+        """Nunca hay más de per_host_limit tareas simultáneas contra el mismo host"""
+        active = {'alkosto': 0, 'falabella': 0}
+        peak = {'alkosto': 0, 'falabella': 0}
+        lock = threading.Lock()
+
+        def task(host):
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            time.sleep(0.05)
+            with lock:
+                active[host] -= 1
+            return host
+
+        tasks = []
+        for i in range(6):
+            tasks.append((f'alkosto-{i}', f'https://www.alkosto.com/c/{i}', lambda: task('alkosto')))
+            tasks.append((f'falabella-{i}', f'https://www.falabella.com.co/c/{i}', lambda: task('falabella')))
+
+        results = CrawlScheduler(workers=6, per_host_limit=2, host_delay=0).run(tasks)
+
+        self.assertEqual(list(results), [name for name, _, _ in tasks])
+        self.assertEqual(peak, {'alkosto': 2, 'falabella': 2})
+
+    def test_failed_task_does_not_stop_the_crawl(self):
+        def fail():
+            raise RuntimeError("boom")
+
+        results = CrawlScheduler(workers=2, host_delay=0).run([
+            ('a', 'https://www.alkosto.com/a', fail),
+            ('b', 'https://www.alkosto.com/b', lambda: [1, 2]),
+        ])
+        self.assertEqual(results, {'a': None, 'b': [1, 2]})
+
+    def test_driver_pool_reuses_and_replaces_drivers(self):
+        """Los drivers se reutilizan; uno invalidado se cierra y se reemplaza"""
+        pool = FakeDriverPool(size=1)
+
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pool.invalidate(second)
+        with pool.acquire() as third:
+            pass
+
+        self.assertIs(first, second)
+        self.assertTrue(second.closed)
+        self.assertIsNot(third, second)
+        self.assertEqual(len(pool.created), 2)
+
+        pool.close()
+        self.assertTrue(third.closed)
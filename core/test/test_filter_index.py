@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from django.test import TestCase
+from core.chatbot.FilterIndex import FilterIndex
+from core.chatbot.IndexFactory import create_index, filtered_search
+from core.chatbot.MetadataStore import MetadataStore, MetadataStoreWriter
+
+
+class FilterIndexTest(TestCase):
+    """Pruebas del filtrado previo a la búsqueda vectorial"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(self.tmp_dir, "product_metadata.bin")
+
+        writer = MetadataStoreWriter(path)
+        for i in range(6000):
+            writer.append({
+                'vector_id': i * 2,  # IDs no contiguos, como tras una actualización incremental
+                'name': f'Producto {i}',
+                'brand': ['HP', 'Samsung', 'Lenovo'][i % 3],
+                'category': ['Portátiles', 'Smartphones', 'Accesorios Electrónicos'][i % 3],
+                'price': float(1000 * i),
+                'discount_percent': '10%' if i % 5 == 0 else '0%',
+                'is_main_product': i % 3 != 2,
+            })
+        writer.close()
+        self.store = MetadataStore(path)
+        self.filters = FilterIndex(self.store)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_mask_combines_filters(self):
+        """Categoría y marca por subcadena, rango de precio y descuento"""
+        self.assertIsNone(self.filters.mask())
+
+        mask = self.filters.mask(category='portát', brand='hp', min_price=30000, max_price=60000, with_discount=True)
+        positions = np.flatnonzero(mask).tolist()
+        self.assertEqual(positions, [30, 45, 60])
+
+    def test_filtered_search_fills_top_k(self):
+        """Con un filtro muy selectivo, HNSW devuelve igual k resultados elegibles"""
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((len(self.store), 16)).astype('float32')
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        index = create_index('hnsw', 16, hnsw_m=16)
+        index.add_with_ids(vectors, self.filters.vector_ids)
+
+        for mask in (self.filters.mask(max_price=20000), self.filters.mask(min_price=1000000)):
+            eligible_ids = self.filters.vector_ids[mask]
+            scores, ids = filtered_search(index, vectors[:1], 10, self.filters.selector(mask), eligible_ids)
+
+            self.assertEqual(ids.shape, (1, min(10, len(eligible_ids))))
+            self.assertTrue(set(ids[0].tolist()) <= set(eligible_ids.tolist()))
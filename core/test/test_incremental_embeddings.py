@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from core.chatbot import EmbeddingManager as embedding_module
+from core.chatbot.EmbeddingManager import EmbeddingManager
+from core.chatbot.MetadataStore import MetadataStore
+from core.test.test_search_batch import PRODUCTS, BagOfWordsModel
+
+
+class FakeMongo:
+    """Catálogo en memoria con la interfaz que usa el pipeline de embeddings"""
+
+    def __init__(self, products):
+        self.products = products
+
+    def get_product_count(self):
+        return len(self.products)
+
+    def iter_products(self, query=None, projection=None, batch_size=500):
+        return iter([dict(product) for product in self.products])
+
+
+def catalog(names):
+    return [{'name': name, 'brand': name.split()[1], 'category': category, 'price': 1000.0,
+             'product_url': f"https://tienda.co/{i}", 'source': 'alkosto', 'is_main_product': is_main}
+            for i, (name, category, is_main) in enumerate(PRODUCTS) if name in names]
+
+
+class UpdateEmbeddingsTest(TestCase):
+    """Pruebas de la actualización incremental del índice"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        with mock.patch.object(EmbeddingManager, '_load_model'), \
+                mock.patch.object(EmbeddingManager, '_load_or_create_index'):
+            self.manager = EmbeddingManager()
+        self.manager.model = BagOfWordsModel()
+        self.manager.index_file = os.path.join(self.tmp_dir, "product_index.faiss")
+        self.manager.metadata_file = os.path.join(self.tmp_dir, "product_metadata.bin")
+
+        # Registrar cada MetadataStore abierto para comprobar que se liberan
+        self.opened = []
+        original_init = MetadataStore.__init__
+
+        def tracking_init(store, *args, **kwargs):
+            original_init(store, *args, **kwargs)
+            self.opened.append(store)
+        patcher = mock.patch.object(MetadataStore, '__init__', tracking_init)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if self.manager.product_metadata is not None:
+            self.manager.product_metadata.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _create(self, products, **options):
+        with mock.patch.object(embedding_module, 'MongoManager', return_value=FakeMongo(products)):
+            return self.manager.create_embeddings_from_db(batch_size=2, recall_k=0, **options)
+
+    def _update(self, products):
+        self.opened.clear()
+        with mock.patch.object(embedding_module, 'MongoManager', return_value=FakeMongo(products)):
+            return self.manager.update_embeddings_from_db(batch_size=2)
+
+    def _leaked_stores(self):
+        return [store for store in self.opened
+                if store is not self.manager.product_metadata and not store._file.closed]
+
+    def test_incremental_update(self):
+        names = [name for name, _, _ in PRODUCTS]
+        self.assertTrue(self._create(catalog(names[:4])))
+
+        summary = self._update(catalog(names[1:]))
+
+        self.assertEqual(summary, {'added': 2, 'updated': 0, 'removed': 1, 'unchanged': 3})
+        self.assertEqual(self.manager.index.ntotal, 5)
+        self.assertEqual(self._leaked_stores(), [])
+        # La cabecera conserva el tipo de índice para la próxima reconstrucción
+        self.assertEqual(self.manager.product_metadata.extra.get('index_type'), 'flat')
+
+    def test_previous_store_closed_on_full_rebuild(self):
+        names = [name for name, _, _ in PRODUCTS]
+        self.assertTrue(self._create(catalog(names), index_type='hnsw'))
+
+        summary = self._update(catalog(names))
+
+        self.assertIsNotNone(summary)
+        self.assertEqual(self._leaked_stores(), [])
+
+    def test_previous_store_closed_on_error(self):
+        names = [name for name, _, _ in PRODUCTS]
+        self.assertTrue(self._create(catalog(names)))
+
+        with mock.patch.object(FakeMongo, 'iter_products', side_effect=RuntimeError("falla")):
+            self.assertIsNone(self._update(catalog(names)))
+        self.assertEqual(self._leaked_stores(), [])
@@ -0,0 +1,43 @@
+import numpy as np
+from django.test import TestCase
+from core.chatbot.IndexFactory import RecallEstimator, create_index, describe_index, supports_removal
+
+
+class IndexFactoryTest(TestCase):
+    """Pruebas de los tipos de índice y del cálculo de recall"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((2000, 32)).astype('float32')
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.ids = np.arange(len(vectors), dtype='int64')
+        self.queries = self.vectors[:20] + 0.1 * rng.standard_normal((20, 32)).astype('float32')
+
+    def _estimator(self):
+        estimator = RecallEstimator(self.queries, k=10)
+        # Se alimenta por lotes, igual que durante la creación de embeddings
+        for start in range(0, len(self.vectors), 300):
+            estimator.observe(self.vectors[start:start + 300], self.ids[start:start + 300])
+        return estimator
+
+    def test_flat_index_has_perfect_recall(self):
+        """El top-k acumulado por lotes coincide con la búsqueda exacta"""
+        index = create_index('flat', 32)
+        index.add_with_ids(self.vectors, self.ids)
+
+        self.assertEqual(describe_index(index), 'flat')
+        self.assertTrue(supports_removal(index))
+        self.assertEqual(self._estimator().recall(index), 1.0)
+
+    def test_hnsw_recall_improves_with_ef_search(self):
+        """El barrido de efSearch reporta recall creciente frente al índice exacto"""
+        index = create_index('hnsw', 32, hnsw_m=16)
+        index.add_with_ids(self.vectors, self.ids)
+
+        self.assertEqual(describe_index(index), 'hnsw')
+        self.assertFalse(supports_removal(index))
+
+        report = self._estimator().report(index)
+        self.assertEqual(report[0]['param'], 'efSearch')
+        self.assertGreaterEqual(report[-1]['recall'], report[0]['recall'])
+        self.assertGreater(report[-1]['recall'], 0.9)
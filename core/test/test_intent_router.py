@@ -0,0 +1,62 @@
+from django.test import TestCase
+
+from core.chatbot.IntentRouter import KEYWORDS, KeywordAutomaton, route, router_stats
+
+MESSAGES = [
+    'hola', 'Hola!', 'gracias por todo', 'hola busco un portátil gamer',
+    '¿De qué tiendas tienes productos?', 'que tiendas hay', 'tienda', 'empresa de envíos rápidos mañana',
+    'portátil con 16gb de ram', 'quiero un celular samsung', 'xyz', 'algo bonito para regalar',
+    'buenas tardes me recomiendas un monitor', 'ok', 'whatsapp', 'consola', 'hi there friend',
+]
+
+
+class KeywordAutomatonTest(TestCase):
+    """Pruebas del autómata Aho–Corasick"""
+
+    def test_finds_overlapping_keywords(self):
+        automaton = KeywordAutomaton({'a': ['que tiendas'], 'b': ['tienda'], 'c': ['dasx'], 'd': ['he', 'she']})
+
+        self.assertEqual(automaton.labels('de que tiendas'), frozenset({'a', 'b'}))
+        self.assertEqual(automaton.labels('ushers'), frozenset({'d'}))
+        self.assertEqual(automaton.labels('nada'), frozenset())
+
+    def test_matches_naive_substring_search(self):
+        """Mismas etiquetas que buscar cada palabra clave con `in`"""
+        for message in MESSAGES:
+            text = message.lower().strip()
+            expected = {label for label, words in KEYWORDS.items() if any(w in text for w in words)}
+            self.assertEqual(route(message).flags, frozenset(expected), message)
+
+
+class IntentRouterTest(TestCase):
+    """Pruebas del router de intención"""
+
+    def test_intents_and_thresholds(self):
+        cases = {
+            'hola': ('conversational', 0.45),
+            'gracias por todo': ('conversational', 0.45),
+            'hola busco un portátil gamer': ('product', 0.4),
+            '¿De qué tiendas tienes productos?': ('store', 0.45),
+            'tienda': ('store', 0.45),
+            'portátil con 16gb de ram': ('product', 0.35),
+            'xyz': ('conversational', 0.45),
+            'algo bonito para regalar': ('product', 0.45),
+            'ok': ('conversational', 0.45),
+        }
+        for message, (kind, threshold) in cases.items():
+            intent = route(message)
+            self.assertEqual((intent.kind, intent.threshold), (kind, threshold), message)
+
+    def test_store_indicator_only_counts_in_short_queries(self):
+        self.assertTrue(route('empresa de envíos').is_store)
+        self.assertFalse(route('empresa de envíos rápidos mañana').is_store)
+
+    def test_memoized_per_message(self):
+        route.cache_clear()
+        first = route('quiero un celular samsung')
+        second = route('quiero un celular samsung')
+
+        self.assertIs(first, second)
+        self.assertEqual(router_stats()['hits'], 1)
+        self.assertEqual(router_stats()['misses'], 1)
+        self.assertGreater(first.elapsed_us, 0)
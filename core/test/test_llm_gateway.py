@@ -0,0 +1,187 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import TestCase
+from groq import APITimeoutError, BadRequestError, InternalServerError
+
+from core.chatbot.LLMGateway import (
+    MIN_ATTEMPT_TIMEOUT, CircuitBreaker, CircuitOpenError, LLMGateway, LLMUnavailableError
+)
+from core.chatbot.TechChatbot import TechChatbot
+from core.test.test_chat_stream import PRODUCTS, FakeAsyncGroq, FakeEmbeddingManager
+
+COMPLETION = {
+    'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'llama-3.3-70b-versatile',
+    'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'hola'}}],
+}
+MESSAGES = [{'role': 'user', 'content': 'hola'}]
+
+
+class FakeGroqServer:
+    """Servidor HTTP local que imita /openai/v1/chat/completions con respuestas programadas"""
+
+    def __init__(self, script, delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                server.requests += 1
+                status = server.script.pop(0) if len(server.script) > 1 else server.script[0]
+                time.sleep(server.delay)
+                body = json.dumps(COMPLETION if status == 200 else {'error': {'message': 'falla'}}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente ya abandonó la petición por timeout
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LLMGatewayTest(TestCase):
+    """Pruebas del gateway del LLM contra un servidor local"""
+
+    def _gateway(self, server, **options):
+        options = {'timeout': 2.0, 'deadline': 5.0, 'max_retries': 2, 'retry_backoff': 0.01, **options}
+        return LLMGateway('test-key', base_url=server.url, **options)
+
+    def _server(self, script, delay=0.0):
+        server = FakeGroqServer(script, delay)
+        self.addCleanup(server.close)
+        return server
+
+    def test_retries_transient_errors(self):
+        server = self._server([500, 503, 200])
+        result = self._gateway(server).complete(MESSAGES, model='llama-3.3-70b-versatile')
+
+        self.assertEqual(result.choices[0].message.content, 'hola')
+        self.assertEqual(server.requests, 3)
+
+    def test_client_errors_are_not_retried(self):
+        server = self._server([400])
+        with self.assertRaises(BadRequestError):
+            self._gateway(server).complete(MESSAGES, model='llama-3.3-70b-versatile')
+        self.assertEqual(server.requests, 1)
+
+    def test_deadline_bounds_slow_upstream(self):
+        server = self._server([200], delay=1.0)
+        gateway = self._gateway(server, timeout=0.2, deadline=0.5)
+
+        start = time.monotonic()
+        with self.assertRaises((APITimeoutError, LLMUnavailableError)):
+            gateway.complete(MESSAGES, model='llama-3.3-70b-versatile')
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_attempt_timeout_never_reaches_zero(self):
+        gateway = LLMGateway('test-key', timeout=2.0)
+        now = time.monotonic()
+
+        self.assertEqual(gateway._attempt_timeout(now + 10), 2.0)
+        self.assertLessEqual(gateway._attempt_timeout(now + 0.5), 0.5)
+        # El semáforo se llevó todo el deadline: el intento igual recibe un timeout válido
+        self.assertEqual(gateway._attempt_timeout(now - 1), MIN_ATTEMPT_TIMEOUT)
+
+    def test_open_circuit_fails_fast(self):
+        server = self._server([500])
+        gateway = self._gateway(server, max_retries=0,
+                                breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+        for _ in range(2):
+            with self.assertRaises(InternalServerError):
+                gateway.complete(MESSAGES, model='llama-3.3-70b-versatile')
+        with self.assertRaises(CircuitOpenError):
+            gateway.complete(MESSAGES, model='llama-3.3-70b-versatile')
+
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(gateway.breaker.state, 'open')
+
+    def test_half_open_probe_closes_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def _half_open_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        return breaker
+
+    def test_probe_released_when_semaphore_times_out(self):
+        server = self._server([200])
+        gateway = self._gateway(server, max_concurrency=1, breaker=self._half_open_breaker())
+
+        gateway._semaphore.acquire()
+        with self.assertRaises(LLMUnavailableError) as raised:
+            gateway.complete(MESSAGES, deadline=0.05, model='llama-3.3-70b-versatile')
+        self.assertNotIsInstance(raised.exception, CircuitOpenError)
+        gateway._semaphore.release()
+
+        # La siguiente llamada puede hacer la prueba y cerrar el circuito
+        gateway.complete(MESSAGES, model='llama-3.3-70b-versatile')
+        self.assertEqual(gateway.breaker.state, 'closed')
+
+    def test_probe_released_when_stream_is_abandoned(self):
+        gateway = LLMGateway('test-key', async_client=FakeAsyncGroq(['Hola', ' mundo']),
+                             breaker=self._half_open_breaker())
+
+        async def consume_first_chunk():
+            stream = gateway.stream(MESSAGES, model='llama-3.3-70b-versatile')
+            first = await stream.__anext__()
+            # El cliente se desconecta a mitad de la respuesta
+            await stream.aclose()
+            return first
+
+        self.assertEqual(asyncio.run(consume_first_chunk()), 'Hola')
+        self.assertEqual(gateway.breaker.state, 'half_open')
+        self.assertTrue(gateway.breaker.allow())
+
+    def test_concurrency_limit(self):
+        server = self._server([200], delay=0.3)
+        gateway = self._gateway(server, max_concurrency=1)
+
+        first = threading.Thread(target=gateway.complete, args=(MESSAGES,),
+                                 kwargs={'model': 'llama-3.3-70b-versatile'})
+        first.start()
+        time.sleep(0.05)
+        with self.assertRaises(LLMUnavailableError):
+            gateway.complete(MESSAGES, deadline=0.1, model='llama-3.3-70b-versatile')
+        first.join()
+
+    def test_chatbot_falls_back_when_circuit_is_open(self):
+        server = self._server([500])
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        chatbot = TechChatbot(groq_api_key=None, embedding_manager=FakeEmbeddingManager(),
+                              llm=self._gateway(server, breaker=breaker))
+
+        response = chatbot.generate_response('portátil hp victus', PRODUCTS)
+
+        self.assertIn(PRODUCTS[0]['name'], response)
+        self.assertEqual(server.requests, 0)
@@ -0,0 +1,194 @@
+import time
+from contextlib import contextmanager
+from bs4 import BeautifulSoup
+from django.test import TestCase
+from core.scrapping.LoadMore import LoadMorePaginator, LoadMoreStats
+
+
+class FakeButton:
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+
+class FakeListingDriver:
+    """
+    Simula un listado que agrega page_size tarjetas load_delay segundos después de cada click
+
+    Como en el navegador, la petición solo aparece en Resource Timing al terminar;
+    mientras tanto se cuenta como en curso, salvo con track_requests=False
+    (página donde no se pudo instalar el contador de fetch/XHR).
+    """
+
+    def __init__(self, pages, page_size=24, load_delay=0.05, stall=False, track_requests=True):
+        self.pages = pages
+        self.page_size = page_size
+        self.load_delay = load_delay
+        self.stall = stall
+        self.track_requests = track_requests
+        self.loaded_pages = 1
+        self.pending_at = None
+        self.resources = 0
+
+    def _settle(self):
+        if self.pending_at is not None and time.monotonic() >= self.pending_at:
+            self.pending_at = None
+            self.loaded_pages += 1
+            self.resources += 1
+
+    def execute_script(self, script, *args):
+        self._settle()
+        if 'click()' in script:
+            self.resources = 0
+            if not self.stall:
+                self.pending_at = time.monotonic() + self.load_delay
+            return None
+        pending = int(self.track_requests and self.pending_at is not None)
+        return [self.loaded_pages * self.page_size, self.resources, pending]
+
+    def find_elements(self, by, selector):
+        self._settle()
+        if self.pending_at is None and self.loaded_pages < self.pages:
+            return [FakeButton()]
+        return []
+
+
+class LoadMorePaginatorTest(TestCase):
+    """Pruebas de la paginación por cambios del DOM"""
+
+    def _paginator(self, **kwargs):
+        return LoadMorePaginator('li.item', 'button.more', stats=LoadMoreStats(**kwargs),
+                                 poll=0.01, idle_window=0.1, button_grace=0.05)
+
+    def test_waits_for_new_items_instead_of_sleeping(self):
+        """Cada click espera solo lo que tardan las tarjetas y termina sin esperar el botón ausente"""
+        paginator = self._paginator()
+        driver = FakeListingDriver(pages=4)
+
+        start = time.monotonic()
+        cards = paginator.run(driver, clicks=None)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(cards, 4 * 24)
+        self.assertEqual(driver.loaded_pages, 4)
+        self.assertLess(elapsed, 1.0)
+
+        stats = paginator.stats.summary()
+        self.assertEqual(stats['clicks'], 3)
+        self.assertGreaterEqual(stats['p50'], 0.04)
+
+    def test_click_limit_is_respected(self):
+        paginator = self._paginator()
+        driver = FakeListingDriver(pages=10)
+        self.assertEqual(paginator.run(driver, clicks=2), 3 * 24)
+        self.assertEqual(driver.loaded_pages, 3)
+
+    def test_stalled_click_stops_on_network_idle(self):
+        """Si el click no trae tarjetas y la red queda en reposo no se espera el timeout completo"""
+        paginator = self._paginator(min_timeout=0.2, max_timeout=5.0)
+        driver = FakeListingDriver(pages=5, stall=True)
+
+        start = time.monotonic()
+        self.assertEqual(paginator.run(driver, clicks=None), 24)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(paginator.stats.summary()['idle_stops'], 1)
+
+    def test_loads_slower_than_idle_window_are_awaited(self):
+        """Una petición en curso no cuenta como red en reposo aunque dure más que idle_window"""
+        paginator = self._paginator(min_timeout=0.05)
+        driver = FakeListingDriver(pages=4, load_delay=0.3)
+
+        self.assertEqual(paginator.run(driver, clicks=None), 4 * 24)
+        stats = paginator.stats.summary()
+        self.assertEqual((stats['clicks'], stats['idle_stops'], stats['timeouts']), (3, 0, 0))
+
+    def test_first_click_without_history_waits_min_timeout(self):
+        """Sin latencias previas ni contador de peticiones, el reposo no corta antes de min_timeout"""
+        paginator = self._paginator(min_timeout=0.5)
+        driver = FakeListingDriver(pages=2, load_delay=0.3, track_requests=False)
+
+        self.assertEqual(paginator.stats.expected(), 0.5)
+        self.assertEqual(paginator.run(driver, clicks=None), 2 * 24)
+        self.assertEqual(paginator.stats.summary()['idle_stops'], 0)
+
+    def test_adaptive_timeout_follows_recent_latencies(self):
+        stats = LoadMoreStats(min_timeout=0.5, max_timeout=10.0, factor=2.0)
+        self.assertEqual(stats.timeout(), 10.0)
+        for latency in (0.4, 0.5, 0.6, 0.5):
+            stats.record(latency)
+        self.assertAlmostEqual(stats.timeout(), 1.0)
+        stats.record(0.01)
+        self.assertGreaterEqual(stats.timeout(), 0.5)
+
+
+class FixtureListingDriver:
+    """Navegador falso que agrega las tarjetas de cada página grabada de Alkosto en cada click"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.cards = list(pages[0])
+        self.loaded_pages = 1
+        self.slices = []
+
+    def get(self, url):
+        pass
+
+    def find_element(self, by, selector):
+        return object()
+
+    def find_elements(self, by, selector):
+        return [FakeButton()] if self.loaded_pages < len(self.pages) else []
+
+    def execute_script(self, script, *args):
+        if 'click()' in script:
+            self.cards.extend(self.pages[self.loaded_pages])
+            self.loaded_pages += 1
+            return None
+        if 'outerHTML' in script:
+            self.slices.append((args[1], args[2]))
+            return self.cards[args[1]:args[2]]
+        return [len(self.cards), self.loaded_pages, 0]
+
+
+class FakePool:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @contextmanager
+    def acquire(self):
+        yield self.driver
+
+    def invalidate(self, driver):
+        pass
+
+
+class AlkostoStreamTest(TestCase):
+    """Extracción incremental: solo se leen las tarjetas nuevas de cada carga"""
+
+    def test_stream_extracts_only_new_cards(self):
+        from core.scrapping.alkosto.Scrapping import AlkostoScraper
+        from core.test.test_alkosto_http import read_fixture
+
+        pages = []
+        for name in ('listing_page_0.html', 'listing_page_1.html'):
+            soup = BeautifulSoup(read_fixture(name), 'html.parser')
+            pages.append([str(li) for li in soup.select('li.ais-InfiniteHits-item')])
+        driver = FixtureListingDriver(pages)
+
+        scraper = AlkostoScraper(driver_pool=FakePool(driver), fetch_mode='selenium')
+        scraper.paginator.poll = 0.01
+        scraper.paginator.button_grace = 0.01
+
+        stream = scraper.stream_products('https://www.alkosto.com/celulares/smartphones/c/BI_101_ALKOS',
+                                         'smartphones')
+        first = next(stream)
+        self.assertEqual(first.name, 'Celular SAMSUNG Galaxy A15 128GB')
+        # El primer producto se entrega antes de terminar de paginar
+        self.assertEqual(driver.slices, [(0, 2)])
+
+        rest = list(stream)
+        self.assertEqual([p.name for p in rest],
+                         ['Celular XIAOMI Redmi 13C 256GB', 'Celular MOTOROLA Moto G54 256GB'])
+        self.assertEqual(driver.slices, [(0, 2), (2, 4)])
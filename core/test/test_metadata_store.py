@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+from django.test import TestCase
+from core.chatbot.MetadataStore import MetadataStore, MetadataStoreWriter, convert_json_metadata
+
+
+class MetadataStoreTest(TestCase):
+    """Pruebas del formato columnar memory-mapped de metadata"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "product_metadata.bin")
+        self.rows = [
+            {
+                'id': '64f0c0ffee', 'name': 'Computador Portátil HP Victus 15"', 'brand': 'HP',
+                'category': 'Portátiles', 'price': 3699000.0, 'discount_percent': '32%',
+                'product_url': 'https://www.alkosto.com/victus', 'image_url': '',
+                'availability': 'Disponible', 'specifications': {'RAM': '16GB', 'Procesador': 'Ryzen 5'},
+                'source': 'alkosto', 'is_main_product': True
+            },
+            {
+                'id': '64f0c0ffef', 'name': 'Cargador USB-C ñandú', 'brand': '',
+                'category': 'Accesorios Electrónicos', 'price': 59900.0, 'discount_percent': '0%',
+                'product_url': 'https://www.falabella.com.co/cargador', 'image_url': 'https://img/1.jpg',
+                'availability': 'Disponible', 'specifications': {},
+                'source': 'falabella', 'is_main_product': False
+            },
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_roundtrip_rows(self):
+        """Las filas leídas son iguales a las escritas"""
+        writer = MetadataStoreWriter(self.path, flush_every=1)
+        for row in self.rows:
+            writer.append(row)
+        build_id = writer.close()
+
+        store = MetadataStore(self.path)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.build_id, build_id)
+        self.assertEqual(store[0], self.rows[0])
+        self.assertEqual(store[-1], self.rows[1])
+        self.assertEqual(list(store.strings('source')), ['alkosto', 'falabella'])
+        self.assertEqual(store.numeric('price').tolist(), [3699000.0, 59900.0])
+        store.close()
+
+    def test_vector_id_lookup(self):
+        """position_of traduce IDs del índice FAISS a filas"""
+        writer = MetadataStoreWriter(self.path)
+        writer.append({**self.rows[0], 'vector_id': 42})
+        writer.append({**self.rows[1], 'vector_id': 7})
+        writer.close()
+
+        store = MetadataStore(self.path)
+        self.assertEqual(store.position_of(7), 1)
+        self.assertEqual(store.position_of(42), 0)
+        self.assertEqual(store.position_of(3), -1)
+        store.close()
+
+    def test_convert_legacy_json(self):
+        """El product_metadata.json anterior se convierte sin pérdida"""
+        json_path = os.path.join(self.tmp_dir, "product_metadata.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.rows, f, ensure_ascii=False, indent=2)
+
+        self.assertEqual(convert_json_metadata(json_path, self.path), 2)
+        store = MetadataStore(self.path)
+        self.assertEqual(list(store), self.rows)
+        store.close()
+
+    def test_empty_store(self):
+        """Un índice sin productos se comporta como secuencia vacía"""
+        MetadataStoreWriter(self.path).close()
+
+        store = MetadataStore(self.path)
+        self.assertFalse(store)
+        self.assertEqual(list(store), [])
+        store.close()
@@ -0,0 +1,71 @@
+from django.test import TestCase
+
+from core.chatbot.PromptBudget import PromptBudget, TokenCounter
+from core.chatbot.TechChatbot import SYSTEM_PROMPT, TechChatbot
+from core.test.test_chat_stream import PRODUCTS, FakeEmbeddingManager
+
+LONG_ANSWER = "En ALKOSTO encontré el Computador Portátil HP Victus 15 con 32% OFF. " * 40
+
+
+def history(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({"type": "user", "content": f"pregunta número {i} sobre portátiles"})
+        messages.append({"type": "assistant", "content": LONG_ANSWER})
+    return messages
+
+
+class TokenCounterTest(TestCase):
+    """Pruebas del conteo local de tokens"""
+
+    def test_estimate_and_truncate(self):
+        counter = TokenCounter()
+
+        self.assertEqual(counter.count(''), 0)
+        self.assertEqual(counter.count('hola, mundo'), 3)
+        self.assertGreater(counter.count('computadores'), 1)
+
+        truncated = counter.truncate(LONG_ANSWER, 20)
+        self.assertLessEqual(counter.count(truncated[:-1]), 20)
+        self.assertTrue(truncated.endswith('…'))
+        self.assertEqual(counter.truncate('corto', 20), 'corto')
+
+
+class PromptBudgetTest(TestCase):
+    """Pruebas del ajuste del historial al presupuesto de tokens"""
+
+    def test_old_answers_are_trimmed_but_last_is_kept(self):
+        budget = PromptBudget(TokenCounter(), max_prompt_tokens=10000, message_tokens=30)
+        messages = budget.fit_history(history(3), reserved_tokens=0)
+
+        self.assertEqual(len(messages), 6)
+        self.assertLessEqual(budget.counter.count(messages[1]["content"]), 31)
+        self.assertEqual(messages[-1]["content"], LONG_ANSWER)
+
+    def test_oldest_turns_are_dropped_and_summarized(self):
+        budget = PromptBudget(TokenCounter(), max_prompt_tokens=150, message_tokens=30)
+        messages = budget.fit_history(history(3), reserved_tokens=40)
+
+        self.assertLessEqual(budget.counter.count_messages(messages), 110)
+        self.assertEqual(messages[0]["role"], "system")
+        self.assertIn("pregunta número 0", messages[0]["content"])
+
+
+class BuildMessagesTest(TestCase):
+    """El prompt queda acotado y su prefijo no cambia entre peticiones"""
+
+    def _chatbot(self, turns):
+        chatbot = TechChatbot(groq_api_key=None, embedding_manager=FakeEmbeddingManager(),
+                              conversation_history=history(turns))
+        chatbot.prompt_budget = PromptBudget(TokenCounter(), max_prompt_tokens=1200, message_tokens=60)
+        return chatbot
+
+    def test_prompt_stays_within_budget(self):
+        short = self._chatbot(1)._build_messages('busco portátil gamer', PRODUCTS)
+        long = self._chatbot(20)._build_messages('busco portátil gamer', PRODUCTS)
+
+        self.assertEqual(short[0], {"role": "system", "content": SYSTEM_PROMPT})
+        self.assertEqual(long[0], short[0])
+        self.assertIn("HP Victus", long[-2]["content"])
+        self.assertEqual(long[-1], {"role": "user", "content": 'busco portátil gamer'})
+        self.assertLessEqual(TokenCounter().count_messages(long), 1200)
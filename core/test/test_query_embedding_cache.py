@@ -0,0 +1,53 @@
+import numpy as np
+from django.test import TestCase, override_settings
+from django.core.cache import caches
+from core.chatbot.QueryEmbeddingCache import QueryEmbeddingCache
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'query-embedding-cache-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryEmbeddingCacheTest(TestCase):
+    """Pruebas de la caché de embeddings de consultas"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.calls = []
+
+    def _encode(self, text):
+        self.calls.append(text)
+        vector = np.arange(1, 9, dtype='float32')
+        return (vector / np.linalg.norm(vector)).reshape(1, -1)
+
+    def test_repeated_queries_skip_the_model(self):
+        """Solo la primera consulta llama al modelo; se cuentan aciertos y fallos"""
+        cache = QueryEmbeddingCache('modelo-a', cache_alias='default')
+
+        first = cache.get_or_encode('portátil gamer', self._encode)
+        second = cache.get_or_encode('portátil gamer', self._encode)
+
+        self.assertEqual(self.calls, ['portátil gamer'])
+        self.assertIs(first, second)
+        self.assertEqual(first.shape, (1, 8))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_redis_tier_is_shared_between_workers(self):
+        """Otro worker recupera el vector (float16) desde la caché compartida"""
+        QueryEmbeddingCache('modelo-a', cache_alias='default').get_or_encode('celular samsung', self._encode)
+
+        other_worker = QueryEmbeddingCache('modelo-a', cache_alias='default')
+        vector = other_worker.get_or_encode('celular samsung', self._encode)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(other_worker.stats()['l2_hits'], 1)
+        np.testing.assert_allclose(vector, self._encode('celular samsung'), atol=1e-3)
+
+        # Un modelo distinto no reutiliza los vectores
+        QueryEmbeddingCache('modelo-b', cache_alias='default').get_or_encode('celular samsung', self._encode)
+        self.assertEqual(len(self.calls), 3)
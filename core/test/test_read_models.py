@@ -0,0 +1,103 @@
+from bson import ObjectId
+from django.test import TestCase
+from core.mongo.MongoManager import MongoManager
+from core.mongo.Schemas import LISTING_PROJECTION, ProductRecord, ProductResponse
+
+
+def stored_product(i):
+    return {
+        '_id': ObjectId(), 'name': f"Producto {i}", 'brand': 'MARCA', 'category': 'Celulares',
+        'product_url': f"https://www.alkosto.com/p/{i}", 'source_url': 'https://www.alkosto.com/listado',
+        'discount_percent': '-20%', 'original_price_num': 100000, 'discount_price_num': 80000,
+        'specifications': {'RAM': '8 GB'}, 'source': 'alkosto',
+    }
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+        self.sorted_by = None
+        self.limited_to = None
+
+    def sort(self, sort):
+        self.sorted_by = sort
+        return self
+
+    def limit(self, limit):
+        self.limited_to = limit
+        self.documents = self.documents[:limit]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.finds = []
+
+    def find(self, query, projection=None):
+        self.finds.append((query, projection))
+        if projection and any(value == 1 for value in projection.values()):
+            documents = [{key: value for key, value in document.items() if key in projection or key == '_id'}
+                         for document in self.documents]
+        else:
+            documents = list(self.documents)
+        return FakeCursor(documents)
+
+
+class ReadModelsTest(TestCase):
+    """Lecturas con proyección y registros livianos sin validación"""
+
+    def setUp(self):
+        self.manager = MongoManager.__new__(MongoManager)
+        self.manager.products_collection = FakeCollection([stored_product(i) for i in range(3)])
+
+    def test_default_output_is_validated_response(self):
+        products = self.manager.get_products_by_category('Celulares', limit=2)
+        self.assertEqual(len(products), 2)
+        self.assertIsInstance(products[0], ProductResponse)
+        self.assertIsNone(self.manager.products_collection.finds[0][1])
+
+    def test_record_output_uses_listing_projection(self):
+        records = self.manager.get_products_by_category('Celulares', output='record')
+
+        self.assertEqual(self.manager.products_collection.finds[0][1], LISTING_PROJECTION)
+        self.assertIsInstance(records[0], ProductRecord)
+        self.assertEqual(records[0].name, 'Producto 0')
+        self.assertEqual(records[0].discount_price_num, 80000)
+        self.assertFalse(hasattr(records[0], '__dict__'))
+        self.assertNotIn('specifications', records[0].to_dict())
+
+    def test_raw_output_with_custom_projection(self):
+        raw = self.manager.get_products_with_discount(output='raw', projection={'name': 1})
+        self.assertEqual(set(raw[0]), {'_id', 'name'})
+
+    def test_search_keeps_text_score(self):
+        self.manager.search_products('samsung', output='record')
+        projection = self.manager.products_collection.finds[0][1]
+        self.assertEqual(projection['score'], {'$meta': 'textScore'})
+        self.assertEqual(projection['name'], 1)
+
+    def test_record_validates_on_demand(self):
+        self.manager.products_collection.find = lambda query, projection=None: FakeCursor([stored_product(9)])
+        record = self.manager.get_product_by_url('https://www.alkosto.com/p/9', projection={}, output='record')
+        self.assertEqual(record.validate().specifications, {'RAM': '8 GB'})
+
+    def test_spec_search_reads_listing_records(self):
+        records = self.manager.search_products_by_spec('RAM', '8', limit=2, output='record')
+
+        query, projection = self.manager.products_collection.finds[0]
+        self.assertEqual(query, {'specifications.RAM': {'$regex': '8', '$options': 'i'}})
+        self.assertEqual(projection, LISTING_PROJECTION)
+        self.assertEqual([record.name for record in records], ['Producto 0', 'Producto 1'])
+
+    def test_price_range_defaults_to_validated_response(self):
+        products = self.manager.search_products_by_price_range(50000, 90000)
+
+        query, projection = self.manager.products_collection.finds[0]
+        self.assertEqual(query, {'discount_price_num': {'$gte': 50000, '$lte': 90000}})
+        self.assertIsNone(projection)
+        self.assertIsInstance(products[0], ProductResponse)
+        self.assertEqual(len(products), 3)
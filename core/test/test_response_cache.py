@@ -0,0 +1,148 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from django.test import TestCase
+
+from core.chatbot.LLMGateway import LLMGateway
+from core.chatbot.ResponseCache import ResponseCache
+from core.chatbot.TechChatbot import TechChatbot
+from core.test.test_chat_stream import PRODUCTS, FakeAsyncGroq
+
+ANSWER = "En ALKOSTO encontré el Computador Portátil HP Victus 15 con 32% OFF"
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype='float32')
+    return (vector / np.linalg.norm(vector)).reshape(1, -1)
+
+
+class VectorEmbeddingManager:
+    """Embeddings fijos por consulta y versión de índice controlable"""
+
+    VECTORS = {
+        'portátiles gamer en oferta': unit(1, 0, 0),
+        'portatiles gamer en oferta!': unit(1, 0.05, 0),
+        'celular samsung barato': unit(0, 1, 0),
+    }
+
+    def __init__(self):
+        self.index_version = 1
+
+    def encode_query(self, query):
+        return self.VECTORS[query]
+
+    def get_available_sources(self):
+        return ['alkosto']
+
+
+class FakeGroq:
+    def __init__(self):
+        self.calls = 0
+
+        def create(**kwargs):
+            self.calls += 1
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=ANSWER))])
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+class ResponseCacheTest(TestCase):
+    """Pruebas de la caché semántica de respuestas"""
+
+    def test_nearest_query_with_same_products(self):
+        cache = ResponseCache(max_size=10, ttl=60, similarity=0.95)
+        cache.set(unit(1, 0, 0), ['a', 'b'], 1, 'respuesta')
+
+        self.assertEqual(cache.get(unit(1, 0.05, 0), ['b', 'a'], 1), 'respuesta')
+        self.assertIsNone(cache.get(unit(0, 1, 0), ['a', 'b'], 1))
+        self.assertIsNone(cache.get(unit(1, 0, 0), ['a'], 1))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_index_rebuild_invalidates(self):
+        cache = ResponseCache(max_size=10, ttl=60, similarity=0.95)
+        cache.set(unit(1, 0, 0), ['a'], 1, 'respuesta')
+
+        self.assertIsNone(cache.get(unit(1, 0, 0), ['a'], 2))
+        self.assertIsNone(cache.get(unit(1, 0, 0), ['a'], 1))
+        self.assertEqual(cache.stats()['invalidations'], 2)
+
+    def test_entries_expire(self):
+        cache = ResponseCache(max_size=10, ttl=0.01, similarity=0.95)
+        cache.set(unit(1, 0, 0), ['a'], 1, 'respuesta')
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get(unit(1, 0, 0), ['a'], 1))
+
+
+class GenerateResponseCacheTest(TestCase):
+    """generate_response reutiliza respuestas sin llamar al LLM"""
+
+    def setUp(self):
+        self.manager = VectorEmbeddingManager()
+        self.groq = FakeGroq()
+        self.cache = ResponseCache(max_size=10, ttl=60, similarity=0.95)
+
+    def _chatbot(self, history=None):
+        return TechChatbot(groq_api_key=None, embedding_manager=self.manager, conversation_history=history,
+                           response_cache=self.cache, llm=LLMGateway('test-key', client=self.groq))
+
+    def test_repeated_question_skips_llm(self):
+        first = self._chatbot().generate_response('portátiles gamer en oferta', PRODUCTS)
+        second = self._chatbot().generate_response('portatiles gamer en oferta!', PRODUCTS)
+
+        self.assertEqual(first, ANSWER)
+        self.assertEqual(second, ANSWER)
+        self.assertEqual(self.groq.calls, 1)
+
+    def test_rebuilt_index_and_follow_ups_call_llm(self):
+        self._chatbot().generate_response('portátiles gamer en oferta', PRODUCTS)
+
+        history = [{"type": "user", "content": "hola"}, {"type": "assistant", "content": "¡Hola!"}]
+        self._chatbot(history).generate_response('portátiles gamer en oferta', PRODUCTS)
+        self.assertEqual(self.groq.calls, 2)
+
+        self.manager.index_version += 1
+        self._chatbot().generate_response('portátiles gamer en oferta', PRODUCTS)
+        self.assertEqual(self.groq.calls, 3)
+
+
+class StreamEmbeddingManager(VectorEmbeddingManager):
+    """Registra si encode_query corre dentro del event loop"""
+
+    def __init__(self):
+        super().__init__()
+        self.encoded_on_loop = []
+
+    def search_products(self, query, top_k=10, threshold=0.4):
+        return [dict(product) for product in PRODUCTS]
+
+    def encode_query(self, query):
+        try:
+            asyncio.get_running_loop()
+            self.encoded_on_loop.append(True)
+        except RuntimeError:
+            self.encoded_on_loop.append(False)
+        return super().encode_query(query)
+
+
+class ChatStreamResponseCacheTest(TestCase):
+    """chat_stream reutiliza respuestas sin bloquear el event loop al codificar la consulta"""
+
+    def test_cache_key_is_computed_off_the_event_loop(self):
+        manager = StreamEmbeddingManager()
+        cache = ResponseCache(max_size=10, ttl=60, similarity=0.95)
+        groq = FakeAsyncGroq([ANSWER])
+
+        async def ask(query):
+            chatbot = TechChatbot(groq_api_key=None, embedding_manager=manager, response_cache=cache,
+                                  llm=LLMGateway('test-key', async_client=groq))
+            return [event async for event in chatbot.chat_stream(query)][-1]['response']
+
+        self.assertEqual(asyncio.run(ask('portátiles gamer en oferta')), ANSWER)
+        groq.kwargs = None
+        self.assertEqual(asyncio.run(ask('portatiles gamer en oferta!')), ANSWER)
+
+        self.assertIsNone(groq.kwargs)
+        self.assertEqual(manager.encoded_on_loop, [False, False])
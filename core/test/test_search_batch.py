@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import tempfile
+import zlib
+from unittest import mock
+
+import faiss
+import numpy as np
+from django.test import TestCase, override_settings
+
+from core.chatbot.EmbeddingManager import EmbeddingManager
+from core.chatbot.MetadataStore import MetadataStore, MetadataStoreWriter
+
+PRODUCTS = [
+    ('Portátil HP Victus gamer', 'Portátiles', True),
+    ('Portátil Lenovo IdeaPad', 'Portátiles', True),
+    ('Celular Samsung Galaxy', 'Smartphones', True),
+    ('Funda celular Samsung Galaxy', 'Accesorios Electrónicos', False),
+    ('Audífonos Sony inalámbricos', 'Audífonos', True),
+    ('Televisor Samsung smart', 'Televisores', True),
+]
+
+
+class BagOfWordsModel:
+    """Modelo de embeddings determinista: bolsa de palabras en 64 dimensiones"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), 64), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode('utf-8')) % 64] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-6)
+
+
+@override_settings(EMBEDDINGS_QUERY_CACHE_ALIAS=None)
+class SearchProductsBatchTest(TestCase):
+    """Pruebas de la búsqueda de varias consultas en un solo lote"""
+
+    QUERIES = ['portátil gamer', 'celular samsung', 'audífonos', 'celular samsung', 'nevera']
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(self.tmp_dir, "product_metadata.bin")
+        writer = MetadataStoreWriter(path)
+        for i, (name, category, is_main) in enumerate(PRODUCTS):
+            writer.append({'vector_id': i, 'name': name, 'brand': name.split()[1], 'category': category,
+                           'price': 1000.0 * (i + 1), 'discount_percent': '10%', 'is_main_product': is_main})
+        writer.close()
+
+        with mock.patch.object(EmbeddingManager, '_load_model'), \
+                mock.patch.object(EmbeddingManager, '_load_or_create_index'):
+            self.manager = EmbeddingManager()
+
+        self.manager.model = BagOfWordsModel()
+        self.manager.product_metadata = MetadataStore(path)
+        self.manager.index = faiss.IndexIDMap(faiss.IndexFlatIP(64))
+        vectors = self.manager.model.encode([name for name, _, _ in PRODUCTS])
+        self.manager.index.add_with_ids(vectors, np.arange(len(PRODUCTS), dtype='int64'))
+
+    def tearDown(self):
+        self.manager.product_metadata.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_same_results_as_one_by_one(self):
+        expected = [self.manager.search_products(query, top_k=2, threshold=0.1) for query in self.QUERIES]
+        self.manager.query_cache.clear()
+        self.manager.model.calls.clear()
+
+        results = self.manager.search_products_batch(self.QUERIES, top_k=2, threshold=0.1)
+
+        self.assertEqual(results, expected)
+        self.assertEqual(results[-1], [])
+        # Una sola llamada al modelo, sin repetir la consulta duplicada
+        self.assertEqual(len(self.manager.model.calls), 1)
+        self.assertEqual(len(self.manager.model.calls[0]), 4)
+
+    def test_main_products_rank_before_accessories(self):
+        [results] = self.manager.search_products_batch(['funda celular samsung galaxy'], top_k=1, threshold=0.1)
+        self.assertEqual(results[0]['name'], 'Celular Samsung Galaxy')
+
+    def test_empty_batch(self):
+        self.assertEqual(self.manager.search_products_batch([]), [])
+
+
+class SearchProductsBatchViewTest(TestCase):
+    """Pruebas del endpoint JSON de búsqueda por lotes"""
+
+    def _post(self, payload):
+        return self.client.post('/products/search/batch', data=json.dumps(payload), content_type='application/json')
+
+    def test_returns_results_per_query(self):
+        manager = mock.Mock()
+        manager.search_products_batch.return_value = [[{'id': '1', 'name': 'Celular Samsung Galaxy'}], []]
+
+        with mock.patch('core.views.get_embedding_manager', return_value=manager):
+            response = self._post({'queries': ['celular samsung', 'nevera'], 'limit': 3})
+
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        manager.search_products_batch.assert_called_once_with(['celular samsung', 'nevera'], top_k=3, threshold=0.4)
+        self.assertEqual([r['total_results'] for r in data['results']], [1, 0])
+        self.assertEqual(data['results'][0]['products'][0]['name'], 'Celular Samsung Galaxy')
+
+    @override_settings(EMBEDDINGS_BATCH_MAX_QUERIES=2)
+    def test_rejects_invalid_batches(self):
+        self.assertEqual(self._post({'queries': []}).status_code, 400)
+        self.assertEqual(self._post({'queries': ['a', ' ']}).status_code, 400)
+        self.assertEqual(self._post({'queries': ['a', 'b', 'c']}).status_code, 400)
+
+    @override_settings(EMBEDDINGS_BATCH_MAX_LIMIT=10)
+    def test_rejects_invalid_limit_and_threshold(self):
+        manager = mock.Mock()
+        with mock.patch('core.views.get_embedding_manager', return_value=manager):
+            for options in ({'limit': 0}, {'limit': 11}, {'limit': '5'}, {'limit': 2.5}, {'limit': True},
+                            {'threshold': -0.1}, {'threshold': 1.5}, {'threshold': 'alto'}, {'threshold': None}):
+                with self.subTest(**options):
+                    self.assertEqual(self._post({'queries': ['celular'], **options}).status_code, 400)
+        manager.search_products_batch.assert_not_called()
@@ -1,30 +1,36 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from asgiref.sync import sync_to_async
 import json
 import os
 import uuid
 from datetime import datetime
-from core.chatbot.techchatbot import TechChatbot
+from core.chatbot.TechChatbot import TechChatbot
+from core.chatbot.EmbeddingManager import get_embedding_manager
+from core.chatbot.ConversationStore import ConversationStore
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Diccionario para almacenar instancias de chatbot por sesión
-_chatbot_instances = {}
+# Historial de conversación por sesión, compartido entre workers vía Redis.
+# El modelo de embeddings y el índice FAISS se comparten a nivel de proceso
+# (ver get_embedding_manager), así que un chatbot es barato de construir.
+_conversation_store = ConversationStore()
 
 
 def get_chatbot_for_session(session_id):
-    """Obtiene o crea una instancia de chatbot para una sesión específica"""
-    if session_id not in _chatbot_instances:
-        api_key = os.getenv('GROQ_API_KEY')
-        if not api_key:
-            raise ValueError("GROQ_API_KEY no está configurada en las variables de entorno")
+    """Construye un chatbot con el historial guardado de una sesión específica"""
+    api_key = os.getenv('GROQ_API_KEY')
+    if not api_key:
+        raise ValueError("GROQ_API_KEY no está configurada en las variables de entorno")
 
-        _chatbot_instances[session_id] = TechChatbot(api_key)
-        logger.info(f"✅ Nuevo chatbot inicializado para sesión: {session_id}")
+    history = _conversation_store.load(session_id)
+    if not history:
+        logger.info(f"✅ Nueva conversación para sesión: {session_id}")
 
-    return _chatbot_instances[session_id]
+    return TechChatbot(api_key, conversation_history=history)
 
 
 @csrf_exempt
@@ -61,6 +67,7 @@ def chatWithChatbotWithoutLogin(request):
 
         # Procesar el mensaje con el chatbot
         response = chatbot.chat(user_message)
+        _conversation_store.save(session_id, chatbot.conversation_history)
 
         # Log de la respuesta generada
         logger.info(f"🤖 Respuesta generada - Session: {session_id}, Length: {len(response)}")
@@ -95,6 +102,113 @@ def chatWithChatbotWithoutLogin(request):
         }, status=500)
 
 
+def _sse_event(event: str, data: dict) -> str:
+    """Formatea un evento Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def chatWithChatbotStreamWithoutLogin(request):
+    """
+    Versión en streaming (Server-Sent Events) del chat sin login
+
+    La búsqueda de productos corre fuera del event loop y la respuesta de Groq se
+    envía token a token, así que el primer byte llega apenas termina la búsqueda.
+    Eventos: session, products, token, replace (la validación final cambió la
+    respuesta), done y error.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        logger.error("❌ Error parsing JSON")
+        return JsonResponse({
+            'success': False,
+            'error': 'Formato JSON inválido'
+        }, status=400)
+
+    # JSON válido pero con otra forma (lista, texto, mensaje no textual)
+    if not isinstance(data, dict) or not isinstance(data.get('message', ''), str) \
+            or not isinstance(data.get('session_id') or '', str):
+        return JsonResponse({
+            'success': False,
+            'error': 'Se espera un objeto JSON con message y session_id de tipo texto'
+        }, status=400)
+
+    user_message = data.get('message', '').strip()
+    session_id = data.get('session_id')
+
+    # Validar que el mensaje no esté vacío
+    if not user_message:
+        return JsonResponse({
+            'success': False,
+            'error': 'El mensaje no puede estar vacío',
+            'session_id': session_id or 'none'
+        }, status=400)
+
+    # Generar session_id si no se proporciona (para nuevos usuarios)
+    if not session_id:
+        session_id = str(uuid.uuid4())
+        logger.info(f"🆕 Nueva sesión creada: {session_id}")
+
+    try:
+        chatbot = await sync_to_async(get_chatbot_for_session, thread_sensitive=False)(session_id)
+    except ValueError as e:
+        logger.error(f"❌ Error de configuración: {e}")
+        return JsonResponse({
+            'success': False,
+            'error': 'Error de configuración del chatbot'
+        }, status=500)
+
+    logger.info(f"💬 Mensaje recibido (stream) - Session: {session_id}, Length: {len(user_message)}")
+
+    async def event_stream():
+        yield _sse_event('session', {'session_id': session_id})
+        try:
+            async for event in chatbot.chat_stream(user_message):
+                if event['type'] == 'products':
+                    yield _sse_event('products', {'products': [_format_product(p) for p in event['products']]})
+                elif event['type'] == 'done':
+                    await sync_to_async(_conversation_store.save, thread_sensitive=False)(
+                        session_id, chatbot.conversation_history
+                    )
+                    logger.info(f"🤖 Respuesta generada (stream) - Session: {session_id}, "
+                                f"Length: {len(event['response'])}")
+                    yield _sse_event('done', {
+                        'response': event['response'],
+                        'session_id': session_id,
+                        'timestamp': datetime.now().isoformat()
+                    })
+                else:
+                    yield _sse_event(event['type'], {'text': event['text']})
+
+        except Exception as e:
+            logger.error(f"❌ Error en el chatbot (stream): {str(e)}")
+            yield _sse_event('error', {'error': 'Error interno del servidor. Por favor, intenta nuevamente.'})
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evita que un proxy (nginx) acumule la respuesta antes de enviarla
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _format_product(product: dict) -> dict:
+    """Campos de un producto que se devuelven al cliente"""
+    return {
+        'id': product.get('id'),
+        'name': product.get('name', 'Producto sin nombre'),
+        'brand': product.get('brand', 'Sin marca'),
+        'category': product.get('category', 'Sin categoría'),
+        'price': product.get('price', 0),
+        'discount_percent': product.get('discount_percent', '0%'),
+        'image_url': product.get('image_url'),
+        'product_url': product.get('product_url'),
+        'similarity_score': product.get('similarity_score', 0),
+        'specifications': product.get('specifications', {})
+    }
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def searchProducts(request):
@@ -117,28 +231,13 @@ def searchProducts(request):
         if not session_id:
             session_id = str(uuid.uuid4())
 
-        chatbot = get_chatbot_for_session(session_id)
-
         logger.info(f"🔍 Búsqueda de productos - Query: '{search_query}'")
 
-        # Buscar productos usando el embedding manager
-        products = chatbot.embedding_manager.search_products(search_query, top_k=top_k)
+        # Buscar productos usando el embedding manager compartido (no requiere chatbot)
+        products = get_embedding_manager().search_products(search_query, top_k=top_k)
 
         # Formatear resultados
-        formatted_products = []
-        for product in products:
-            formatted_products.append({
-                'id': product.get('id'),
-                'name': product.get('name', 'Producto sin nombre'),
-                'brand': product.get('brand', 'Sin marca'),
-                'category': product.get('category', 'Sin categoría'),
-                'price': product.get('price', 0),
-                'discount_percent': product.get('discount_percent', '0%'),
-                'image_url': product.get('image_url'),
-                'product_url': product.get('product_url'),
-                'similarity_score': product.get('similarity_score', 0),
-                'specifications': product.get('specifications', {})
-            })
+        formatted_products = [_format_product(product) for product in products]
 
         return JsonResponse({
             'success': True,
@@ -157,6 +256,78 @@ def searchProducts(request):
         }, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def searchProductsBatch(request):
+    """
+    Búsqueda de varias consultas en una sola petición (un solo forward del modelo y una búsqueda FAISS)
+    """
+    try:
+        data = json.loads(request.body)
+        queries = data.get('queries')
+        top_k = data.get('limit', 5)
+        threshold = data.get('threshold', 0.4)
+        max_queries = getattr(settings, 'EMBEDDINGS_BATCH_MAX_QUERIES', 50)
+        max_limit = getattr(settings, 'EMBEDDINGS_BATCH_MAX_LIMIT', 50)
+
+        if not isinstance(queries, list) or not queries:
+            return JsonResponse({
+                'success': False,
+                'error': 'queries debe ser una lista no vacía de consultas'
+            }, status=400)
+
+        queries = [str(query).strip() for query in queries]
+        if not all(queries):
+            return JsonResponse({
+                'success': False,
+                'error': 'Las consultas de búsqueda no pueden estar vacías'
+            }, status=400)
+
+        if len(queries) > max_queries:
+            return JsonResponse({
+                'success': False,
+                'error': f'Máximo {max_queries} consultas por petición'
+            }, status=400)
+
+        # bool es subclase de int: se descarta explícitamente
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= max_limit:
+            return JsonResponse({
+                'success': False,
+                'error': f'limit debe ser un entero entre 1 y {max_limit}'
+            }, status=400)
+
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0 <= threshold <= 1:
+            return JsonResponse({
+                'success': False,
+                'error': 'threshold debe ser un número entre 0 y 1'
+            }, status=400)
+
+        logger.info(f"🔍 Búsqueda de productos por lotes - {len(queries)} consultas")
+
+        results = get_embedding_manager().search_products_batch(queries, top_k=top_k, threshold=float(threshold))
+
+        return JsonResponse({
+            'success': True,
+            'results': [
+                {
+                    'query': query,
+                    'products': [_format_product(product) for product in products],
+                    'total_results': len(products)
+                }
+                for query, products in zip(queries, results)
+            ],
+            'total_queries': len(queries),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"❌ Error en búsqueda de productos por lotes: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'error': 'Error al buscar productos'
+        }, status=500)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def clearChatHistory(request):
@@ -173,9 +344,8 @@ def clearChatHistory(request):
                 'error': 'Session ID es requerido'
             }, status=400)
 
-        if session_id in _chatbot_instances:
-            _chatbot_instances[session_id].clear_history()
-            logger.info(f"🧹 Historial limpiado para sesión: {session_id}")
+        _conversation_store.clear(session_id)
+        logger.info(f"🧹 Historial limpiado para sesión: {session_id}")
 
         return JsonResponse({
             'success': True,